@@ -25,6 +25,8 @@ setup(name='tap-github',
       entry_points='''
           [console_scripts]
           tap-github=tap_github:main
+          tap-github-orchestrator=tap_github.orchestrator:main
+          tap-github-merge-state=tap_github.merge_state:main
       ''',
       packages=['tap_github'],
       package_data = {
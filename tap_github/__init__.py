@@ -1,9 +1,11 @@
+import argparse
 import json
 import sys
 import singer
 from tap_github.discover import discover as _discover
 from tap_github.client import GithubClient
-from tap_github.sync import sync as _sync
+from tap_github.sync import sync as _sync, SyncPlan
+from tap_github.deadline import stop_on_signals
 
 LOGGER = singer.get_logger()
 
@@ -17,12 +19,30 @@ def do_discover(client):
     # Dump catalog
     json.dump(catalog, sys.stdout, indent=2)
 
+def do_plan(config, catalog):
+    """
+    Print the sync plan compiled from the config and the catalog.
+    """
+    json.dump(SyncPlan(catalog, config).to_dict(), sys.stdout, indent=2)
+
+def parse_args():
+    """
+    Parse the `--plan` flag, and the Singer arguments with the remaining command line arguments.
+    """
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument('--plan', action='store_true', help='Print the sync plan instead of running the sync')
+    plan_args, sys.argv[1:] = parser.parse_known_args()
+
+    args = singer.utils.parse_args(REQUIRED_CONFIG_KEYS)
+    args.plan = plan_args.plan
+    return args
+
 @singer.utils.handle_top_exception(LOGGER)
 def main():
     """
     Run discover mode or sync mode.
     """
-    args = singer.utils.parse_args(REQUIRED_CONFIG_KEYS)
+    args = parse_args()
 
     config = args.config
 
@@ -36,7 +56,11 @@ def main():
         do_discover(client)
     else:
         catalog = args.properties if args.properties else _discover(client)
-        _sync(client, config, state, catalog)
+        if args.plan:
+            do_plan(config, catalog)
+        else:
+            with stop_on_signals(config):
+                _sync(client, config, state, catalog)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,187 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import queue
+import threading
+import singer
+from singer import (metrics, bookmarks)
+from tap_github.deadline import RUN_DEADLINE, DeadlineReached
+from tap_github.streams import ASCENDING, DATE_FORMAT, compile_stream, get_bookmark, get_schema
+
+LOGGER = singer.get_logger()
+
+# Number of windows fetched at the same time if `backfill_max_workers` is not in the config.
+DEFAULT_BACKFILL_MAX_WORKERS = 4
+# Number of pages of a window fetched ahead of the pages written, after which the worker of the window waits.
+BACKFILL_QUEUE_PAGES = 4
+# Seconds a worker waits for room in the queue of its window before checking whether the backfill is stopped.
+QUEUE_WAIT_SECONDS = 1
+# Marks the end of the pages in the queue of a window.
+END_OF_WINDOW = None
+
+def get_backfill_windows(since, until, window_days):
+    """
+    Split the [since, until) range into windows of `window_days` days.
+    """
+    windows = []
+    window_start = singer.utils.strptime_to_utc(since)
+    end = singer.utils.strptime_to_utc(until)
+    while window_start < end:
+        window_end = min(window_start + timedelta(days=window_days), end)
+        windows.append([window_start.strftime(DATE_FORMAT), window_end.strftime(DATE_FORMAT)])
+        window_start = window_end
+    return windows
+
+def can_backfill(stream_obj, config, state, repo_path, start_date):
+    """
+    Check whether the stream of the repository should be synced window by window. Only the streams
+    without children that define a `backfill_path` are synced in windows, when `backfill_window_days`
+    is in the config and the bookmark is older than one window.
+    """
+    window_days = config.get('backfill_window_days')
+    if not (window_days and stream_obj.backfill_path) or stream_obj.children:
+        return False
+
+    repo_bookmark = bookmarks.get_bookmark(state, stream_obj.tap_stream_id, repo_path) or {}
+    if repo_bookmark.get('backfill'):
+        # Resume the interrupted backfill
+        return True
+
+    bookmark = get_bookmark(state, repo_path, stream_obj.tap_stream_id, "since", start_date)
+    return singer.utils.strptime_to_utc(bookmark) < singer.utils.now() - timedelta(days=float(window_days))
+
+def fetch_window(client, stream_obj, repo_path, window):
+    """
+    Yield the records of the stream updated within the window, page by page, along with their extraction time.
+    The pages of an endpoint returning the records in the ascending order are read till the first page past the window.
+    """
+    window_start, window_end = window
+    full_url = '{}/repos/{}/{}'.format(client.base_url, repo_path, stream_obj.backfill_path.format(window_start, window_end))
+    LOGGER.info("Final url is: %s", full_url)
+
+    for response in client.authed_get_all_pages(
+            stream_obj.tap_stream_id,
+            full_url,
+            stream_obj.headers,
+            stream = stream_obj.tap_stream_id
+    ):
+        extraction_time = singer.utils.now()
+        passed_window_end = False
+        page_records = []
+        for record in response.json() or []:
+            record['_sdc_repository'] = repo_path
+            stream_obj.add_fields_at_1st_level(record = record, parent_record = None)
+            replication_value = record.get(stream_obj.replication_keys)
+            if not replication_value:
+                continue
+            if singer.utils.strptime_to_utc(replication_value) >= singer.utils.strptime_to_utc(window_end):
+                passed_window_end = True
+                continue
+            if singer.utils.strptime_to_utc(replication_value) >= singer.utils.strptime_to_utc(window_start):
+                page_records.append((record, extraction_time))
+
+        yield page_records
+        if passed_window_end and stream_obj.backfill_ordering == ASCENDING:
+            break
+
+def put_page(pages_queue, page_records, stopped):
+    """
+    Put the page in the bounded queue of its window, waiting while the queue is full unless the backfill is stopped.
+    Return False if the backfill is stopped.
+    """
+    while not stopped.is_set():
+        try:
+            pages_queue.put(page_records, timeout=QUEUE_WAIT_SECONDS)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def fetch_window_pages(client, stream_obj, repo_path, window, pages_queue, stopped):
+    """
+    Put the pages of the window in its queue, followed by the end of the window, even if the fetch fails.
+    The window is not started, and its next page is not fetched, once the deadline of the run or of the repository
+    is reached.
+    """
+    try:
+        RUN_DEADLINE.check(repo_path)
+        for page_records in fetch_window(client, stream_obj, repo_path, window):
+            if not put_page(pages_queue, page_records, stopped):
+                return
+            RUN_DEADLINE.check(repo_path)
+    finally:
+        put_page(pages_queue, END_OF_WINDOW, stopped)
+
+def write_backfill_state(state, stream_id, repo_path, since, until, finished_windows):
+    """
+    Write the end of the contiguous finished windows as the bookmark along with the windows finished after it.
+    """
+    repo_bookmark = dict(bookmarks.get_bookmark(state, stream_id, repo_path) or {})
+    repo_bookmark.pop('boundary_keys', None)
+    repo_bookmark['since'] = since
+    if since < until:
+        repo_bookmark['backfill'] = {'until': until, 'finished_windows': finished_windows}
+    else:
+        repo_bookmark.pop('backfill', None)
+    singer.write_bookmark(state, stream_id, repo_path, repo_bookmark)
+    singer.write_state(state)
+
+def sync_backfill(stream_obj, client, state, catalog, repo_path, start_date, selected_stream_ids):
+    """
+    Sync the stream of the repository by fetching the time windows between the bookmark and now concurrently.
+    The pages of each window go through a bounded queue and are written in the order of the windows, as soon as
+    they are fetched. The bookmark is advanced only past the windows that are finished without a gap from the
+    previous bookmark. Once the deadline of the run or of the repository is reached, the backfill stops with the
+    state of the windows written so far.
+    """
+    stream_id = stream_obj.tap_stream_id
+    since = singer.utils.strptime_to_utc(get_bookmark(state, repo_path, stream_id, "since", start_date)).strftime(DATE_FORMAT)
+    backfill_state = (bookmarks.get_bookmark(state, stream_id, repo_path) or {}).get('backfill') or {}
+    until = backfill_state.get('until') or datetime.today().strftime(DATE_FORMAT)
+    finished_windows = [window for window in backfill_state.get('finished_windows', []) if window[0] >= since]
+
+    windows = get_backfill_windows(since, until, float(client.config['backfill_window_days']))
+    pending_windows = [window for window in windows if window not in finished_windows]
+    max_workers = int(client.config.get('backfill_max_workers') or DEFAULT_BACKFILL_MAX_WORKERS)
+    LOGGER.info("Backfilling %s of the repository %s from %s to %s in %s windows.", stream_id, repo_path, since, until, len(pending_windows))
+
+    stream_catalog = compile_stream(stream_id, get_schema(catalog, stream_id))
+    # Set once the backfill ends or fails, so that the workers waiting for room in their queue stop.
+    stopped = threading.Event()
+    fetches = []
+    with metrics.record_counter(stream_id) as counter, singer.Transformer() as transformer, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for window in pending_windows:
+                pages_queue = queue.Queue(maxsize=BACKFILL_QUEUE_PAGES)
+                future = executor.submit(fetch_window_pages, client, stream_obj, repo_path, window, pages_queue, stopped)
+                fetches.append((window, pages_queue, future))
+
+            for window, pages_queue, future in fetches:
+                RUN_DEADLINE.check(repo_path)
+                for page_records in iter(pages_queue.get, END_OF_WINDOW):
+                    if stream_id in selected_stream_ids:
+                        for record, extraction_time in page_records:
+                            rec = transformer.transform(record, stream_catalog['schema'], metadata=stream_catalog.metadata_map)
+                            singer.write_record(stream_id, rec, time_extracted=extraction_time)
+                            counter.increment()
+                # Raise the error of a failed window
+                future.result()
+
+                # Advance the bookmark past the contiguous finished windows
+                finished_windows.append(window)
+                finished_by_start = {finished_window[0]: finished_window for finished_window in finished_windows}
+                while since in finished_by_start:
+                    finished_window = finished_by_start.pop(since)
+                    finished_windows.remove(finished_window)
+                    since = finished_window[1]
+                write_backfill_state(state, stream_id, repo_path, since, until, sorted(finished_windows))
+        except DeadlineReached:
+            # The next sync continues the backfill from the windows not written
+            write_backfill_state(state, stream_id, repo_path, since, until, sorted(finished_windows))
+            raise
+        finally:
+            stopped.set()
+            for _, _, future in fetches:
+                future.cancel()
+
+    return state
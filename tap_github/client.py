@@ -1,9 +1,11 @@
 import time
+from urllib.parse import urlparse, parse_qs
 import requests
 import backoff
 from simplejson import JSONDecodeError
 import singer
 from singer import metrics
+from tap_github.scheduler import get_request_scheduler
 
 LOGGER = singer.get_logger()
 DEFAULT_DOMAIN = "https://api.github.com"
@@ -171,6 +173,7 @@ class GithubClient:
         self.base_url = config['base_url'] if config.get('base_url') else DEFAULT_DOMAIN
         self.set_auth_in_session()
         self.not_accessible_repos = set()
+        self.scheduler = get_request_scheduler(config)
 
     def get_request_timeout(self):
         """
@@ -203,7 +206,9 @@ class GithubClient:
         """
         with metrics.http_request_timer(source) as timer:
             self.session.headers.update(headers)
-            resp = self.session.request(method='get', url=url, timeout=self.get_request_timeout())
+            with self.scheduler.request():
+                resp = self.session.request(method='get', url=url, timeout=self.get_request_timeout())
+            self.scheduler.update_rate_limit(resp)
             # Check for bad creds before checking rate throttling because a bad
             # creds response does not include rate limit headers
             if resp.status_code == 401:
@@ -238,6 +243,32 @@ class GithubClient:
             # Break the loop if all pages are fetched.
                 break
 
+    def authed_get_all_pages_reversed(self, source, url, headers={}, stream="", should_skip_404 = True, from_last_page = True):
+        """
+        Fetch all pages of records starting from the last page and return them from the last page to the first page.
+        If `from_last_page` is False, the pages are returned from the page of the url to the first page.
+        """
+        r = self.authed_get(source, url, headers, stream, should_skip_404)
+        first_page = None
+        if from_last_page:
+            first_page = r
+            if 'last' in r.links:
+                r = self.authed_get(source, r.links['last']['url'], headers, stream, should_skip_404)
+
+        while True:
+            yield r
+
+            # Fetch the previous page if prev found in the response.
+            if 'prev' not in r.links:
+                # Break the loop if all pages are fetched.
+                break
+            prev_url = r.links['prev']['url']
+            if first_page is not None and parse_qs(urlparse(prev_url).query).get('page') == ['1']:
+                # The first page is already fetched
+                yield first_page
+                break
+            r = self.authed_get(source, prev_url, headers, stream, should_skip_404)
+
     def verify_repo_access(self, url_for_repo, repo):
         """
         Call rest API to verify that the user has sufficient permissions to access this repository.
@@ -0,0 +1,158 @@
+import contextlib
+import os
+import signal
+import threading
+import time
+import singer
+
+LOGGER = singer.get_logger()
+
+# Part of `max_runtime_seconds` left to finish the pages in flight and write the state, if `runtime_grace_seconds`
+# is not in the config.
+DEFAULT_GRACE_RATIO = 0.1
+
+# Seconds left to stop after SIGTERM or SIGINT if `shutdown_grace_seconds` is not in the config, the time
+# Docker waits before killing a stopped container.
+DEFAULT_SHUTDOWN_GRACE_SECONDS = 10
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+class DeadlineReached(Exception):
+    """
+    Raised to stop the sync once the deadline of the run is reached. The state to resume from is saved before.
+    """
+
+class RepoDeadlineReached(DeadlineReached):
+    """
+    Raised to stop the sync of a repository once it ran for `max_repo_runtime_seconds`, or once its work item was
+    claimed by another process, so that the sync continues with the next repository.
+    """
+
+class Deadline:
+    """
+    Time after which the run does not start a new repository, stream or page, so that it ends within
+    `max_runtime_seconds` from its start, and time after which the sync of each repository does not start
+    a new stream or page, so that it runs for at most `max_repo_runtime_seconds`. The deadline of the run is also
+    reached when the process is asked to stop by a signal, and the deadline of a repository when the lease of its
+    work item is lost.
+    """
+    def __init__(self):
+        self.stop_time = None
+        self.stop_reason = None
+        self.repo_stop_times = {}
+        self.repo_stop_reasons = {}
+
+    def start(self, config):
+        """
+        Start counting the runtime of the sync, if `max_runtime_seconds` is in the config.
+        """
+        self.repo_stop_times = {}
+        self.repo_stop_reasons = {}
+        self.stop_reason = "max_runtime_seconds is reached"
+        max_runtime_seconds = float(config.get('max_runtime_seconds') or 0)
+        if not max_runtime_seconds:
+            self.stop_time = None
+            return
+        grace_seconds = float(config.get('runtime_grace_seconds') or max_runtime_seconds * DEFAULT_GRACE_RATIO)
+        self.stop_time = time.monotonic() + max(max_runtime_seconds - grace_seconds, 0)
+
+    def stop(self, reason):
+        """
+        Reach the deadline of the run now.
+        """
+        self.stop_reason = reason
+        self.stop_time = time.monotonic()
+
+    @contextlib.contextmanager
+    def limit_repo_runtime(self, repo, config):
+        """
+        Limit the runtime of the sync of the repository within the block to `max_repo_runtime_seconds`, if it is
+        in the config.
+        """
+        max_repo_runtime_seconds = float(config.get('max_repo_runtime_seconds') or 0)
+        if max_repo_runtime_seconds:
+            self.repo_stop_times[repo] = time.monotonic() + max_repo_runtime_seconds
+        try:
+            yield
+        finally:
+            self.clear_repo(repo)
+
+    def stop_repo(self, repo, reason):
+        """
+        Reach the deadline of the repository now, until it is cleared.
+        """
+        self.repo_stop_reasons[repo] = reason
+        self.repo_stop_times[repo] = time.monotonic()
+
+    def clear_repo(self, repo):
+        self.repo_stop_times.pop(repo, None)
+        self.repo_stop_reasons.pop(repo, None)
+
+    def is_run_reached(self):
+        return self.stop_time is not None and time.monotonic() >= self.stop_time
+
+    def is_repo_reached(self, repo):
+        repo_stop_time = self.repo_stop_times.get(repo)
+        return repo_stop_time is not None and time.monotonic() >= repo_stop_time
+
+    def is_reached(self, repo = None):
+        return self.is_run_reached() or self.is_repo_reached(repo)
+
+    def check(self, repo = None):
+        """
+        Raise DeadlineReached if the deadline of the run is reached, or RepoDeadlineReached if the deadline
+        of the repository is reached.
+        """
+        if self.is_run_reached():
+            raise DeadlineReached("The sync is stopped as {}.".format(self.stop_reason or "max_runtime_seconds is reached"))
+        if self.is_repo_reached(repo):
+            raise RepoDeadlineReached("The sync of the repository {} is stopped as {}.".format(
+                repo, self.repo_stop_reasons.get(repo, "max_repo_runtime_seconds is reached")))
+
+# Deadline of the sync run in this process, shared by all its threads
+RUN_DEADLINE = Deadline()
+
+@contextlib.contextmanager
+def stop_on_signals(config, on_stop = None, on_exit = None, grace_margin_seconds = 0):
+    """
+    Stop the run at its deadline on SIGTERM or SIGINT within the block, so that the records of the pages read are
+    written along with the state to resume from, and exit with the last state written if the run did not stop within
+    `shutdown_grace_seconds` and `grace_margin_seconds`. `on_stop` is called with the signal, to pass it on to the
+    worker processes, and `on_exit` is called before exiting, to end the worker processes and write their state.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        # Signal handlers can only be set in the main thread
+        yield
+        return
+
+    grace_seconds = float(config.get('shutdown_grace_seconds') or DEFAULT_SHUTDOWN_GRACE_SECONDS) + grace_margin_seconds
+    timers = []
+
+    def exit_after_grace():
+        LOGGER.critical("The sync did not stop within %s seconds, exiting with the last state written.", grace_seconds)
+        try:
+            if on_exit:
+                on_exit()
+        finally:
+            os._exit(1) # pylint: disable=protected-access
+
+    def handle_signal(signum, frame): # pylint: disable=unused-argument
+        signal_name = signal.Signals(signum).name
+        if timers:
+            LOGGER.warning("Received %s, the sync is already stopping.", signal_name)
+            return
+        LOGGER.warning("Received %s, stopping the sync within %s seconds.", signal_name, grace_seconds)
+        RUN_DEADLINE.stop("{} is received".format(signal_name))
+        if on_stop:
+            on_stop(signum)
+        timers.append(threading.Timer(grace_seconds, exit_after_grace))
+        timers[0].daemon = True
+        timers[0].start()
+
+    previous_handlers = {signum: signal.signal(signum, handle_signal) for signum in STOP_SIGNALS}
+    try:
+        yield
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        for timer in timers:
+            timer.cancel()
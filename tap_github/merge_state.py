@@ -0,0 +1,58 @@
+import argparse
+import json
+import sys
+from tap_github.sync import get_key_shard
+
+def merge_owned_values(merged, sections, shard_index, shard_count):
+    """
+    Copy the values of each repository or organization in the sections of a shard state, keeping the values of
+    the shard owning the repository or organization over the values of the other shards.
+    """
+    for section, section_values in sections.items():
+        for key, value in section_values.items():
+            if get_key_shard(key, shard_count) == shard_index:
+                merged.setdefault(section, {})[key] = value
+            else:
+                merged.setdefault(section, {}).setdefault(key, value)
+
+def merge_shard_states(states):
+    """
+    Merge the states of the shards, given in the order of their `shard_index`, into one state. The bookmarks
+    of a repository or an organization are taken from the state of the shard owning it, or from the first state
+    having them if no shard owns them anymore, and so are the streams in flight of the interrupted syncs. The latest
+    time at which the sync of each repository was completed is kept.
+    """
+    shard_count = len(states)
+    merged_bookmarks = {}
+    merged_resume = {}
+    last_completed = {}
+    for shard_index, state in enumerate(states):
+        for repo, completed_time in state.get('last_completed', {}).items():
+            last_completed[repo] = max(completed_time, last_completed.get(repo, completed_time))
+        merge_owned_values(merged_bookmarks, state.get('bookmarks', {}), shard_index, shard_count)
+        # The streams completed in an interrupted pass are synced again, as its table version is the version of its shard.
+        merge_owned_values(merged_resume, {'in_flight': state.get('resume', {}).get('in_flight', {})}, shard_index, shard_count)
+
+    merged_state = {'bookmarks': merged_bookmarks}
+    if merged_resume.get('in_flight'):
+        merged_state['resume'] = merged_resume
+    if last_completed:
+        merged_state['last_completed'] = last_completed
+    return merged_state
+
+def main():
+    """
+    Print the state merged from the state files of the shards.
+    """
+    parser = argparse.ArgumentParser(description='Merge the states of the shards into one state')
+    parser.add_argument('states', nargs='+', help='State files of the shards, in the order of their shard_index')
+    args = parser.parse_args()
+
+    states = []
+    for path in args.states:
+        with open(path) as file:
+            states.append(json.load(file))
+    json.dump(merge_shard_states(states), sys.stdout, indent=2)
+
+if __name__ == '__main__':
+    main()
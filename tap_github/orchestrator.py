@@ -0,0 +1,258 @@
+import argparse
+import copy
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import singer
+from tap_github import REQUIRED_CONFIG_KEYS, do_discover, _discover
+from tap_github.client import GithubClient
+from tap_github.deadline import stop_on_signals
+from tap_github.streams import is_activate_version_enabled
+from tap_github.sync import SyncPlan, STREAM_TO_SYNC_FOR_ORGS, end_resume_pass, filter_shard, merge_bookmarks, translate_state
+
+LOGGER = singer.get_logger()
+
+# Number of worker processes if `--workers` is not given.
+DEFAULT_WORKER_COUNT = os.cpu_count() or 1
+
+# Seconds the orchestrator waits for its workers after their `shutdown_grace_seconds`, to write their last states.
+SHUTDOWN_GRACE_MARGIN_SECONDS = 5
+
+# Command running the tap in a worker process, followed by the Singer arguments of the worker.
+WORKER_COMMAND = [sys.executable, '-c', 'from tap_github import main; main()']
+
+def split_repositories(repositories, worker_count):
+    """
+    Split the repositories into at most `worker_count` subsets of about the same size.
+    """
+    repositories = sorted(repositories)
+    subsets = [repositories[index::worker_count] for index in range(worker_count)]
+    return [subset for subset in subsets if subset]
+
+def get_worker_catalog(catalog, stream_ids):
+    """
+    Copy the catalog with only the given streams left selected.
+    """
+    worker_catalog = copy.deepcopy(catalog)
+    for stream in worker_catalog['streams']:
+        if stream['tap_stream_id'] not in stream_ids:
+            for entry in stream['metadata']:
+                if not entry['breadcrumb']:
+                    entry['metadata']['selected'] = False
+    return worker_catalog
+
+class Worker:
+    """
+    A tap process syncing the selected streams for a subset of the repositories or for the organizations.
+    The bookmarks of the repositories or organizations in `bookmark_keys` are owned by the worker.
+    """
+    def __init__(self, name, config, catalog, stream_ids, bookmark_keys):
+        self.name = name
+        self.config = config
+        self.catalog = get_worker_catalog(catalog, stream_ids)
+        self.stream_ids = set(stream_ids)
+        self.bookmark_keys = bookmark_keys
+        self.process = None
+
+    def start(self, directory, state, lines):
+        """
+        Start the tap process with its own config, catalog and state files, and put each line it writes
+        into the queue, followed by None once the process closed its output.
+        """
+        args = []
+        for option, value in [('--config', self.config), ('--properties', self.catalog), ('--state', state)]:
+            path = os.path.join(directory, '{}-{}.json'.format(self.name, option.strip('-')))
+            with open(path, 'w') as file:
+                json.dump(value, file)
+            args += [option, path]
+
+        LOGGER.info("Starting worker %s for %s.", self.name, ", ".join(self.bookmark_keys))
+        self.process = subprocess.Popen(WORKER_COMMAND + args, stdout=subprocess.PIPE, text=True, encoding='utf-8') # pylint: disable=consider-using-with
+        threading.Thread(target=self.read_lines, args=(lines,), daemon=True).start()
+
+    def stop(self, signum):
+        """
+        Pass the signal on to the tap process if it is still running, so that it stops at its next page.
+        """
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signum)
+
+    def kill(self):
+        """
+        Kill the tap process if it is still running.
+        """
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+
+    def read_lines(self, lines):
+        for line in self.process.stdout:
+            lines.put((self, line))
+        lines.put((self, None))
+
+def get_org_repos(repositories, organizations):
+    """
+    Get a repository of each organization, as one repository is enough for a worker to find the organization.
+    """
+    org_repos = {}
+    for repo in sorted(repositories, reverse=True):
+        if repo.split('/')[0] in organizations:
+            org_repos[repo.split('/')[0]] = repo
+    return org_repos
+
+def get_workers(plan, config, catalog, repositories, org_repos, worker_count):
+    """
+    Get a worker for each subset of the repositories, and one more for the organization streams, so that
+    the organizations are synced only once.
+    """
+    workers = []
+    repo_stream_ids = set(plan.selected_stream_ids) - set(STREAM_TO_SYNC_FOR_ORGS)
+    if repo_stream_ids:
+        for index, subset in enumerate(split_repositories(repositories, worker_count)):
+            worker_config = dict(config, repository=" ".join(subset))
+            workers.append(Worker("repos-{}".format(index), worker_config, catalog, repo_stream_ids, subset))
+
+    org_stream_ids = set(plan.selected_stream_ids).intersection(STREAM_TO_SYNC_FOR_ORGS)
+    if org_stream_ids and org_repos:
+        worker_config = dict(config, repository=" ".join(sorted(org_repos.values())))
+        workers.append(Worker("orgs", worker_config, catalog, org_stream_ids, sorted(org_repos)))
+
+    return workers
+
+class SingerMultiplexer:
+    """
+    Write the output of all the workers as one Singer stream. A schema is written again only if it changed,
+    the state of a worker is merged with the states of the other workers, and the table versions are activated
+    only once all the workers syncing the stream activated them.
+    """
+    def __init__(self, output, state):
+        self.output = output
+        self.state = state
+        self.schemas = {}
+        self.activations = {}
+        # The state is also written when the orchestrator exits after the grace period of a stop signal
+        self.lock = threading.Lock()
+
+    def write_line(self, worker, line):
+        with self.lock:
+            self.write_message(worker, line)
+
+    def write_message(self, worker, line):
+        # Messages are written as one line each, with the type first.
+        if line.startswith('{"type": "SCHEMA"'):
+            stream_id = json.loads(line)['stream']
+            if self.schemas.get(stream_id) == line:
+                return
+            self.schemas[stream_id] = line
+        elif line.startswith('{"type": "STATE"'):
+            worker_state = singer.parse_message(line).value
+            for key in worker.bookmark_keys:
+                merge_bookmarks(self.state, worker_state, key)
+                if key in worker_state.get('last_completed', {}):
+                    self.state.setdefault('last_completed', {})[key] = worker_state['last_completed'][key]
+            line = singer.format_message(singer.StateMessage(value=self.state)) + '\n'
+        elif line.startswith('{"type": "ACTIVATE_VERSION"'):
+            message = singer.parse_message(line)
+            self.activations.setdefault((message.stream, message.version), set()).add(worker.name)
+            return
+        self.output.write(line)
+
+    def activate_table_versions(self, workers):
+        for (stream_id, version), worker_names in sorted(self.activations.items()):
+            if worker_names == {worker.name for worker in workers if stream_id in worker.stream_ids}:
+                self.output.write(singer.format_message(singer.ActivateVersionMessage(stream=stream_id, version=version)) + '\n')
+            else:
+                LOGGER.warning("Skipping the activation of the table version of %s stream as it was not activated by all workers.", stream_id)
+
+    def write_state(self):
+        with self.lock:
+            self.output.write(singer.format_message(singer.StateMessage(value=self.state)) + '\n')
+            self.output.flush()
+
+def orchestrate(client, config, state, catalog, worker_count):
+    """
+    Sync the repositories with `worker_count` tap processes, and write their output as one Singer stream.
+    """
+    plan = SyncPlan(catalog, config)
+    all_repositories, organizations = client.extract_repos_from_config()
+    repositories, organizations = filter_shard(config, all_repositories, organizations)
+
+    state = translate_state(state, catalog, repositories)
+    # The workers sync in their own order
+    state.pop('currently_syncing', None)
+    state.pop('currently_syncing_repo', None)
+
+    # The records of all the workers are written with the same table version, kept by a resumed pass,
+    # and the repositories of the workers are already in the shard of this run.
+    table_version = int(state.get('resume', {}).get('table_version') or config.get('table_version') or time.time() * 1000)
+    if is_activate_version_enabled(config):
+        state.setdefault('resume', {})['table_version'] = table_version
+    config = dict(config, table_version=table_version)
+    config.pop('shard_index', None)
+    config.pop('shard_count', None)
+    workers = get_workers(plan, config, catalog, repositories, get_org_repos(all_repositories, organizations), worker_count)
+
+    multiplexer = SingerMultiplexer(sys.stdout, state)
+
+    def exit_workers():
+        for worker in workers:
+            worker.kill()
+        multiplexer.write_state()
+
+    lines = queue.Queue()
+    # The orchestrator waits longer than the workers, so that the last states of the workers are merged.
+    with tempfile.TemporaryDirectory() as directory, \
+            stop_on_signals(config, lambda signum: [worker.stop(signum) for worker in workers], exit_workers, SHUTDOWN_GRACE_MARGIN_SECONDS):
+        for worker in workers:
+            worker.start(directory, state, lines)
+
+        running = len(workers)
+        while running:
+            worker, line = lines.get()
+            if line is None:
+                running -= 1
+            else:
+                multiplexer.write_line(worker, line)
+
+    failed_workers = [worker.name for worker in workers if worker.process.wait() != 0]
+    if not failed_workers:
+        multiplexer.activate_table_versions(workers)
+        # The pass is over once no worker was stopped with streams completed, as by a deadline or a signal.
+        if not state.get('resume', {}).get('completed'):
+            end_resume_pass(state)
+    multiplexer.write_state()
+    if failed_workers:
+        raise RuntimeError("Workers {} failed, see their logs above.".format(", ".join(failed_workers)))
+
+def parse_args():
+    """
+    Parse the `--workers` option, and the Singer arguments with the remaining command line arguments.
+    """
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKER_COUNT, help='Number of tap processes')
+    orchestrator_args, sys.argv[1:] = parser.parse_known_args()
+
+    args = singer.utils.parse_args(REQUIRED_CONFIG_KEYS)
+    args.workers = max(orchestrator_args.workers, 1)
+    return args
+
+@singer.utils.handle_top_exception(LOGGER)
+def main():
+    """
+    Run discover mode, or sync mode with the repositories split across worker processes.
+    """
+    args = parse_args()
+    client = GithubClient(args.config)
+
+    if args.discover:
+        do_discover(client)
+    else:
+        catalog = args.properties if args.properties else _discover(client)
+        orchestrate(client, args.config, args.state or {}, catalog, args.workers)
+
+if __name__ == '__main__':
+    main()
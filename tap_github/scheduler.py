@@ -0,0 +1,118 @@
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+
+# Classes of requests. When the requests wait for their turn, the requests of a lower class are sent first:
+# the requests of child streams, whose parent records are already fetched, then the requests of cheap
+# incremental streams and finally the requests of full table streams.
+CHILD_REQUESTS = 0
+INCREMENTAL_REQUESTS = 1
+FULL_TABLE_REQUESTS = 2
+
+# Priority of the requests of a thread, as the class of the requests and the staleness of the synced repository,
+# which is the timestamp of its bookmark. Requests of an older bookmark are sent first within a class.
+_request_priority = threading.local()
+DEFAULT_PRIORITY = (INCREMENTAL_REQUESTS, 0)
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def get_request_priority():
+    return getattr(_request_priority, 'value', DEFAULT_PRIORITY)
+
+@contextlib.contextmanager
+def request_priority(request_class = None, staleness = None):
+    """
+    Set the class of the requests sent by the current thread within the block, or the staleness of the
+    repository they are sent for, keeping the other one from the enclosing block.
+    """
+    previous_priority = get_request_priority()
+    _request_priority.value = (previous_priority[0] if request_class is None else request_class,
+                               previous_priority[1] if staleness is None else staleness)
+    try:
+        yield
+    finally:
+        _request_priority.value = previous_priority
+
+class RequestScheduler: # pylint: disable=too-many-instance-attributes
+    """
+    Scheduler of all the requests sent with the same access token in the process. At most `max_concurrent_requests`
+    requests are sent at the same time, and when the rate limit has only `rate_limit_reserve` requests left, no
+    request is sent until the rate limit is reset. The waiting requests are sent in the order of their priority.
+    """
+    def __init__(self, max_concurrent_requests = None, rate_limit_reserve = 0):
+        self.max_concurrent_requests = max_concurrent_requests
+        self.rate_limit_reserve = rate_limit_reserve
+        self.condition = threading.Condition()
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.running = 0
+        # Requests left before the rate limit is reset, at the `reset_time` epoch
+        self.remaining = None
+        self.reset_time = None
+
+    def get_budget_wait_seconds(self):
+        """
+        Get the seconds until the rate limit is reset if the requests left are reserved, or 0.
+        """
+        if self.remaining is None or self.remaining > self.rate_limit_reserve:
+            return 0
+        wait_seconds = self.reset_time - time.time()
+        if wait_seconds <= 0:
+            self.remaining = None
+            return 0
+        return wait_seconds
+
+    def is_turn(self, entry):
+        if self.waiting[0] != entry or self.get_budget_wait_seconds():
+            return False
+        return not self.max_concurrent_requests or self.running < self.max_concurrent_requests
+
+    @contextlib.contextmanager
+    def request(self):
+        """
+        Wait for the turn of a request of the current thread, and hold its slot until the end of the block.
+        """
+        entry = (get_request_priority(), next(self.sequence))
+        with self.condition:
+            heapq.heappush(self.waiting, entry)
+            while not self.is_turn(entry):
+                self.condition.wait(self.get_budget_wait_seconds() or None)
+            heapq.heappop(self.waiting)
+            self.running += 1
+            if self.remaining is not None:
+                self.remaining -= 1
+            # The next request may be sent too
+            self.condition.notify_all()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.running -= 1
+                self.condition.notify_all()
+
+    def update_rate_limit(self, response):
+        """
+        Update the requests left from the rate limit headers of the response.
+        """
+        if 'X-RateLimit-Remaining' not in response.headers or 'X-RateLimit-Reset' not in response.headers:
+            return
+        with self.condition:
+            self.remaining = int(response.headers['X-RateLimit-Remaining']) - self.running
+            self.reset_time = int(response.headers['X-RateLimit-Reset'])
+            self.condition.notify_all()
+
+def get_request_scheduler(config):
+    """
+    Get the scheduler of the requests sent with the access token of the config, shared by all the clients
+    of the process.
+    """
+    max_concurrent_requests = int(config.get('max_concurrent_requests') or 0) or None
+    rate_limit_reserve = int(config.get('rate_limit_reserve') or 0)
+    key = (config.get('base_url'), config.get('access_token'), max_concurrent_requests, rate_limit_reserve)
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = RequestScheduler(max_concurrent_requests, rate_limit_reserve)
+        return _schedulers[key]
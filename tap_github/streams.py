@@ -1,57 +1,281 @@
 from datetime import datetime
+import contextlib
+from urllib.parse import urlencode
+import hashlib
+import json
+import time
 import singer
 from singer import (metrics, bookmarks, metadata)
+from tap_github.client import NotFoundException
+from tap_github.scheduler import request_priority, CHILD_REQUESTS
+from tap_github.deadline import RUN_DEADLINE
 
 LOGGER = singer.get_logger()
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
 
+# Maximum number of keys of the records at the bookmark value kept in the state for a repository.
+MAX_BOUNDARY_KEYS = 1000
+
+# Orders in which an endpoint returns the records by the replication key.
+ASCENDING = 'ascending'
+DESCENDING = 'descending'
+UNORDERED = None
+
+# Roles with which the team members are listed in the `role` sync mode of `team_memberships`.
+TEAM_MEMBER_ROLES = ['maintainer', 'member']
+
+# Number of pages after which the cursor of an incremental stream is saved if `pagination_checkpoint_pages` is not in the config.
+DEFAULT_PAGINATION_CHECKPOINT_PAGES = 10
+
+# Maximum number of pull requests tracked in the `pr_commits` head SHA cache of a repository.
+DEFAULT_PR_COMMITS_CACHE_SIZE = 1000
+
 def get_bookmark(state, repo, stream_name, bookmark_key, start_date):
     """
     Return bookmark value if available in the state otherwise return start date
     """
     repo_stream_dict = bookmarks.get_bookmark(state, stream_name, repo)
     if repo_stream_dict:
-        return repo_stream_dict.get(bookmark_key)
+        return repo_stream_dict.get(bookmark_key, start_date)
 
     return start_date
 
 def get_schema(catalog, stream_id):
     """
-    Return catalog of the specified stream.
+    Return catalog of the specified stream from the catalog entries of the sync plan, keyed by stream id.
     """
-    stream_catalog = [cat for cat in catalog if cat['tap_stream_id'] == stream_id ][0]
-    return stream_catalog
+    return catalog[stream_id]
 
-def get_child_full_url(domain, child_object, repo_path, parent_id, grand_parent_id):
+def get_child_url_template(child_object):
     """
-    Build the child stream's URL based on the parent and the grandparent's ids.
+    Get the url template of the child stream, filled in with the base url, the repository and the ids of the parents.
     """
-
     if child_object.use_repository:
         # The `use_repository` represents that the url contains /repos and the repository name.
-        child_full_url = '{}/repos/{}/{}'.format(
-            domain,
-            repo_path,
-            child_object.path).format(*parent_id)
+        return '{base_url}/repos/{repo_path}/' + child_object.path
+    return '{base_url}/' + child_object.path
 
+def format_child_url(url_template, child_object, domain, repo_path, parent_id, grand_parent_id):
+    """
+    Fill in the url template of the child stream with the parent and the grandparent's ids.
+    """
+    if child_object.use_repository:
+        ids = parent_id
     elif child_object.use_organization:
         # The `use_organization` represents that the url contains the organization name.
-        child_full_url = '{}/{}'.format(
-            domain,
-            child_object.path).format(repo_path, *parent_id, *grand_parent_id)
-
+        ids = (repo_path, *parent_id, *grand_parent_id)
     else:
-        # Build and return url that does not contain the repos or the organization name.
+        # The url does not contain the repos or the organization name.
         # Example: https://base_url/projects/{project_id}/columns
-        child_full_url = '{}/{}'.format(
-            domain,
-            child_object.path).format(*grand_parent_id)
+        ids = grand_parent_id
+    return url_template.format(*ids, base_url=domain, repo_path=repo_path)
+
+def get_child_full_url(domain, child_object, repo_path, parent_id, grand_parent_id):
+    """
+    Build the child stream's URL based on the parent and the grandparent's ids.
+    """
+    child_full_url = format_child_url(get_child_url_template(child_object), child_object, domain, repo_path, parent_id, grand_parent_id)
     LOGGER.info("Final url is: %s", child_full_url)
 
     return child_full_url
 
+class CompiledStream(dict):
+    """
+    Catalog entry of a stream along with what the sync derives from it, compiled once per run by the sync plan:
+    the metadata map, the extractor of the ids of a parent record for the url of the stream and its url template.
+    """
+    def __init__(self, stream_id, stream_catalog):
+        super().__init__(stream_catalog)
+        self.stream_id = stream_id
+        self.stream_class = STREAMS[stream_id]
+        self.metadata_map = metadata.to_map(stream_catalog['metadata'])
+        self.id_keys = tuple(self.stream_class.id_keys)
+        self.url_template = get_child_url_template(self.stream_class) if self.stream_class.parent and self.stream_class.path else None
+
+    def __reduce__(self):
+        return (CompiledStream, (self.stream_id, dict(self)))
+
+    def get_parent_id(self, parent_record):
+        """
+        Extract the ids of the parent record passed in the url of the stream.
+        """
+        return tuple(parent_record.get(key) for key in self.id_keys)
+
+    def get_child_url(self, domain, repo_path, parent_id, grand_parent_id):
+        return format_child_url(self.url_template, self.stream_class, domain, repo_path, parent_id, grand_parent_id)
+
+def compile_stream(stream_id, stream_catalog):
+    """
+    Return the compiled catalog entry of the stream, compiled now if the entry does not come from a sync plan.
+    """
+    if isinstance(stream_catalog, CompiledStream):
+        return stream_catalog
+    return CompiledStream(stream_id, stream_catalog)
+
+def get_stream_plan(catalog, stream_id):
+    """
+    Return the compiled catalog entry of the specified stream from the catalog entries of the sync plan.
+    """
+    return compile_stream(stream_id, get_schema(catalog, stream_id))
+
+@contextlib.contextmanager
+def reuse_transformer(transformer):
+    """
+    Yield the transformer of the stream sync, or a new transformer if the child records are not synced by a stream sync.
+    """
+    if transformer:
+        yield transformer
+    else:
+        with singer.Transformer() as new_transformer:
+            yield new_transformer
+
 
-class Stream:
+def get_record_key(record, key_properties):
+    """
+    Return the primary key of the record as a string.
+    """
+    return json.dumps([record.get(key) for key in key_properties])
+
+def get_record_hash(record):
+    """
+    Return a compact hash of the content of the record.
+    """
+    return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def is_activate_version_enabled(config):
+    """
+    Check if the records of full table streams are written with a table version.
+    """
+    return config.get('activate_version') in (True, 'true')
+
+class BoundaryKeys:
+    """
+    Keys of the records at the latest replication key value. They are saved along with the bookmark, so that
+    the records written in the previous sync at the bookmark value are not written again.
+    """
+    def __init__(self, state, stream_id, repo_path, bookmark_value):
+        repo_bookmark = bookmarks.get_bookmark(state, stream_id, repo_path) or {}
+        self.bookmark_value = bookmark_value
+        self.previous_keys = set(repo_bookmark.get("boundary_keys", [])) if repo_bookmark.get("since") == bookmark_value else set()
+        self.value = None
+        self.keys = set()
+
+    def is_duplicate(self, record_key, replication_value):
+        """
+        Check if the record was already written in the previous sync at the bookmark value.
+        """
+        return replication_value == self.bookmark_value and record_key in self.previous_keys
+
+    def add(self, record_key, replication_value):
+        """
+        Keep the key of the written record if it is at the latest replication key value.
+        """
+        if self.value is None or replication_value > self.value:
+            self.value = replication_value
+            self.keys = {record_key}
+        elif replication_value == self.value and len(self.keys) < MAX_BOUNDARY_KEYS:
+            self.keys.add(record_key)
+
+    def write(self, state, stream_id, repo_path, bookmark_value):
+        """
+        Save the keys of the records at the new bookmark value along with the bookmark.
+        """
+        keys = self.keys if self.value == bookmark_value else set()
+        if bookmark_value == self.bookmark_value:
+            keys = keys | self.previous_keys
+
+        repo_bookmark = dict(bookmarks.get_bookmark(state, stream_id, repo_path) or {})
+        if keys:
+            repo_bookmark["boundary_keys"] = sorted(keys)[:MAX_BOUNDARY_KEYS]
+        else:
+            repo_bookmark.pop("boundary_keys", None)
+        singer.write_bookmark(state, stream_id, repo_path, repo_bookmark)
+
+class PaginationCheckpoint:
+    """
+    Decide when the cursor of an incremental stream is saved: after `pagination_checkpoint_pages` pages,
+    `checkpoint_interval_records` records or `checkpoint_interval_seconds` seconds since the last checkpoint,
+    whichever comes first.
+    """
+    def __init__(self, config):
+        self.max_pages = int(config.get('pagination_checkpoint_pages') or DEFAULT_PAGINATION_CHECKPOINT_PAGES)
+        self.max_records = int(config.get('checkpoint_interval_records') or 0)
+        self.max_seconds = float(config.get('checkpoint_interval_seconds') or 0)
+        self.reset()
+
+    def reset(self):
+        """
+        Start counting from the last checkpoint.
+        """
+        self.pages = 0
+        self.records = 0
+        self.started_at = time.monotonic()
+
+    def is_due(self, record_count):
+        """
+        Count the page read with `record_count` records and return True if a checkpoint is due after it.
+        """
+        self.pages += 1
+        self.records += record_count
+        is_due = (self.pages >= self.max_pages
+                  or bool(self.max_records and self.records >= self.max_records)
+                  or bool(self.max_seconds and time.monotonic() - self.started_at >= self.max_seconds))
+        if is_due:
+            self.reset()
+        return is_due
+
+class SyncContext: # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    State of the sync of a stream for a repository, shared by the stages of the record pipeline.
+    """
+    def __init__(self, client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync):
+        self.client = client
+        self.state = state
+        self.catalog = catalog
+        self.repo_path = repo_path
+        self.start_date = start_date
+        self.selected_stream_ids = selected_stream_ids
+        self.stream_to_sync = stream_to_sync
+        self.stream_catalog = None
+        # Order of the records returned by the endpoint of the stream, based on which the sync stops reading pages.
+        self.ordering = UNORDERED
+        # Transformer of the records of the stream and its child streams, open for the sync of the stream.
+        self.transformer = None
+        # Set by the filter stage when the remaining records are older than the bookmark.
+        self.synced_all_records = False
+        # Bookmarks of incremental streams
+        self.parent_bookmark_value = None
+        self.min_bookmark_value = None
+        self.max_bookmark_value = None
+        self.boundary_keys = None
+        self.checkpoint = None
+        # Change detection of full table streams
+        self.detect_changes = False
+        self.previous_hashes = {}
+        self.record_hashes = {}
+
+class PipelineRecord: # pylint: disable=too-few-public-methods
+    """
+    A record passing through the stages of the record pipeline.
+    """
+    def __init__(self, record, extraction_time):
+        self.record = record
+        self.extraction_time = extraction_time
+        # Whether the record is written to the stream, set by the filter stage.
+        self.write = False
+        # Record transformed as per the schema, set by the transform stage for the records to write.
+        self.rec = None
+
+def add_url_params(url, url_params):
+    """
+    Add the query parameters to the url.
+    """
+    if not url_params:
+        return url
+    return '{}{}{}'.format(url, '&' if '?' in url else '?', urlencode(url_params))
+
+
+class Stream: # pylint: disable=too-many-public-methods
     """
     A base class representing tap-github streams.
     """
@@ -68,6 +292,24 @@ class Stream:
     use_repository = False
     headers = {'Accept': '*/*'}
     parent = None
+    # Path of the repository-level endpoint of a child stream, used when the child is synced on its own.
+    repository_path = None
+    # Path filtered by the start and the end of a time window, used to backfill the stream window by window.
+    backfill_path = None
+    # Order of the records returned by the backfill path, based on which a window stops reading pages.
+    backfill_ordering = UNORDERED
+    # Order of the records returned by the endpoint, based on which the sync stops reading pages.
+    ordering = UNORDERED
+    # Field by which the endpoint orders the records, if it is not the replication key.
+    ordering_key = None
+    # Whether the records keep their place in the pages between syncs. The records of an endpoint sorted by the time
+    # of their last update move to the first pages once updated, so that the records after them move to earlier pages
+    # and a sync continued from a saved page would skip them. Such streams are synced again from the bookmark.
+    stable_order = True
+    # Whether unchanged records of a full table stream can be skipped with the `change_detection` config.
+    change_detection = False
+    # Objects of the child streams, created on the first record of the parent stream.
+    child_objects = None
 
     def build_url(self, base_url, repo_path, bookmark):
         """
@@ -100,14 +342,13 @@ class Stream:
         Get the minimum bookmark from the parent and its corresponding child bookmarks.
         """
 
-        stream_obj = STREAMS[stream]()
         min_bookmark = bookmark
         if stream in selected_streams:
             # Get minimum of stream's bookmark(start date in case of no bookmark) and min_bookmark
             min_bookmark = min(min_bookmark, get_bookmark(state, repo_path, stream, "since", start_date))
             LOGGER.debug("New minimum bookmark is %s", min_bookmark)
 
-        for child in stream_obj.children:
+        for child in STREAMS[stream].children:
             # Iterate through all children and return minimum bookmark among all.
             min_bookmark = min(min_bookmark, self.get_min_bookmark(child, selected_streams, min_bookmark, repo_path, start_date, state))
 
@@ -115,14 +356,19 @@ class Stream:
 
     def write_bookmarks(self, stream, selected_streams, bookmark_value, repo_path, state):
         """Write the bookmark in the state corresponding to the stream."""
-        stream_obj = STREAMS[stream]()
 
         # If the stream is selected, write the bookmark.
         if stream in selected_streams:
-            singer.write_bookmark(state, stream_obj.tap_stream_id, repo_path, {"since": bookmark_value})
+            # Keep any other keys (e.g. caches) stored along with the bookmark of the repository.
+            repo_bookmark = dict(bookmarks.get_bookmark(state, stream, repo_path) or {})
+            if repo_bookmark.get("since") != bookmark_value:
+                # The keys of the records at the previous bookmark value are not valid for the new bookmark value.
+                repo_bookmark.pop("boundary_keys", None)
+            repo_bookmark["since"] = bookmark_value
+            singer.write_bookmark(state, stream, repo_path, repo_bookmark)
 
         # For the each child, write the bookmark if it is selected.
-        for child in stream_obj.children:
+        for child in STREAMS[stream].children:
             self.write_bookmarks(child, selected_streams, bookmark_value, repo_path, state)
 
     def get_child_records(self,
@@ -137,63 +383,88 @@ class Stream:
                           stream_to_sync,
                           selected_stream_ids,
                           parent_id = None,
-                          parent_record = None):
+                          parent_record = None,
+                          transformer = None):
         """
         Retrieve and write all the child records for each updated parent based on the parent record and its ids.
+        Once the deadline of the run or of the repository is reached, stop before the child records, so that the
+        parent stream continues from its last checkpoint instead of advancing its bookmark.
         """
-        child_object = STREAMS[child_stream]()
+        RUN_DEADLINE.check(repo_path)
+        child_object = self.get_child_object(child_stream)
+
+        if child_object.is_parent_unchanged(client, state, repo_path, parent_record):
+            # Child records of this parent were already synced and can not have changed since then.
+            LOGGER.debug("Skipping %s for unchanged parent record of the repository %s", child_object.tap_stream_id, repo_path)
+            return
 
         child_bookmark_value = get_bookmark(state, repo_path, child_object.tap_stream_id, "since", start_date)
 
         if not parent_id:
             parent_id = grand_parent_id
 
-        child_full_url = get_child_full_url(client.base_url, child_object, repo_path, parent_id, grand_parent_id)
-        stream_catalog = get_schema(catalog, child_object.tap_stream_id)
-
-        with metrics.record_counter(child_object.tap_stream_id) as counter:
-            for response in client.authed_get_all_pages(
-                child_object.tap_stream_id,
-                child_full_url,
-                stream = child_object.tap_stream_id
-            ):
-                records = response.json()
-                extraction_time = singer.utils.now()
-
-                if isinstance(records, list):
-                    # Loop through all the records of response
-                    for record in records:
-                        record['_sdc_repository'] = repo_path
-                        child_object.add_fields_at_1st_level(record = record, parent_record = parent_record)
-
-                        with singer.Transformer() as transformer:
-
-                            rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
+        stream_catalog = get_stream_plan(catalog, child_object.tap_stream_id)
+        child_full_url = stream_catalog.get_child_url(client.base_url, repo_path, parent_id, grand_parent_id)
+        LOGGER.info("Final url is: %s", child_full_url)
+        nested_child_plans = {nested_child: get_stream_plan(catalog, nested_child)
+                              for nested_child in child_object.children if nested_child in stream_to_sync}
+
+        with metrics.record_counter(child_object.tap_stream_id) as counter, reuse_transformer(transformer) as record_transformer:
+            for url_params in child_object.get_url_partitions(client, stream_to_sync):
+                for response in client.authed_get_all_pages(
+                    child_object.tap_stream_id,
+                    add_url_params(child_full_url, url_params),
+                    stream = child_object.tap_stream_id
+                ):
+                    records = response.json()
+                    extraction_time = singer.utils.now()
+
+                    if isinstance(records, list):
+                        # Loop through all the records of response
+                        for record in records:
+                            record['_sdc_repository'] = repo_path
+                            # Keep the filter with which the record was listed, e.g. the `role` of a team member
+                            record.update(url_params)
+                            child_object.add_fields_at_1st_level(record = record, parent_record = parent_record)
+
+                            rec = record_transformer.transform(record, stream_catalog['schema'], metadata=stream_catalog.metadata_map)
 
                             if child_object.tap_stream_id in selected_stream_ids and record.get(child_object.replication_keys, start_date) >= child_bookmark_value:
-                                singer.write_record(child_object.tap_stream_id, rec, time_extracted=extraction_time)
+                                child_object.write_record(client, state, repo_path, rec, time_extracted=extraction_time)
                                 counter.increment()
 
-                        # Loop thru each child and nested child in the parent and fetch all the child records.
-                        for nested_child in child_object.children:
-                            if nested_child in stream_to_sync:
+                            # Loop thru each child and nested child in the parent and fetch all the child records.
+                            for nested_child, nested_child_plan in nested_child_plans.items():
                                 # Collect id of child record to pass in the API of its sub-child.
-                                child_id = tuple(record.get(key) for key in STREAMS[nested_child]().id_keys)
+                                child_id = nested_child_plan.get_parent_id(record)
                                 # Here, grand_parent_id is the id of 1st level parent(main parent) which is required to
                                 # pass in the API of the current child's sub-child.
-                                child_object.get_child_records(client, catalog, nested_child, child_id, repo_path, state, start_date, bookmark_dttm, stream_to_sync, selected_stream_ids, grand_parent_id, record)
-
-                else:
-                    # Write JSON response directly if it is a single record only.
-                    records['_sdc_repository'] = repo_path
-                    child_object.add_fields_at_1st_level(record = records, parent_record = parent_record)
+                                child_object.get_child_records(client, catalog, nested_child, child_id, repo_path, state, start_date, bookmark_dttm, stream_to_sync, selected_stream_ids, grand_parent_id, record, record_transformer)
 
-                    with singer.Transformer() as transformer:
+                    else:
+                        # Write JSON response directly if it is a single record only.
+                        records['_sdc_repository'] = repo_path
+                        child_object.add_fields_at_1st_level(record = records, parent_record = parent_record)
 
-                        rec = transformer.transform(records, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
+                        rec = record_transformer.transform(records, stream_catalog['schema'], metadata=stream_catalog.metadata_map)
                         if child_object.tap_stream_id in selected_stream_ids and records.get(child_object.replication_keys, start_date) >= child_bookmark_value :
 
-                            singer.write_record(child_object.tap_stream_id, rec, time_extracted=extraction_time)
+                            child_object.write_record(client, state, repo_path, rec, time_extracted=extraction_time)
+
+                    # Do not read the next page of the child records once the deadline is reached
+                    RUN_DEADLINE.check(repo_path)
+
+        child_object.update_parent_cache(client, state, repo_path, parent_record)
+
+    def get_child_object(self, child_stream):
+        """
+        Return the object of the child stream, created once for all the records of the parent stream.
+        """
+        if self.child_objects is None:
+            self.child_objects = {}
+        if child_stream not in self.child_objects:
+            self.child_objects[child_stream] = STREAMS[child_stream]()
+        return self.child_objects[child_stream]
 
     # pylint: disable=unnecessary-pass
     def add_fields_at_1st_level(self, record, parent_record = None):
@@ -202,6 +473,218 @@ class Stream:
         """
         pass
 
+    def get_table_version(self, client, state, repo_path):
+        """
+        Return the table version of the repository's full table load, if full table streams are versioned.
+        """
+        if self.replication_method != "FULL_TABLE" or not is_activate_version_enabled(client.config):
+            return None
+        return (bookmarks.get_bookmark(state, self.tap_stream_id, repo_path) or {}).get("version")
+
+    def write_record(self, client, state, repo_path, record, time_extracted = None):
+        """
+        Write the record along with the table version of the repository's full table load, if any.
+        """
+        version = self.get_table_version(client, state, repo_path)
+        if version is None:
+            singer.write_record(self.tap_stream_id, record, time_extracted=time_extracted)
+        else:
+            singer.write_message(singer.RecordMessage(stream=self.tap_stream_id, record=record, version=version, time_extracted=time_extracted))
+
+    # pylint: disable=unused-argument
+    def get_ordering(self, config):
+        """
+        Return the order of the records returned by the endpoint of the stream.
+        """
+        return self.ordering
+
+    def get_ordering_value(self, record):
+        """
+        Return the value of the field by which the endpoint orders the records.
+        """
+        return record.get(self.ordering_key or self.replication_keys)
+
+    def get_all_pages(self, client, full_url, resume = False):
+        """
+        Return the pages of the stream's endpoint. Endpoints returning the records in the ascending order are read
+        from the last page, so that the newest records are read first. If `resume` is True, the url is the next page
+        saved in the cursor of an interrupted sync.
+        """
+        if self.get_ordering(client.config) == ASCENDING:
+            return client.authed_get_all_pages_reversed(self.tap_stream_id, full_url, self.headers, stream = self.tap_stream_id,
+                                                        from_last_page = not resume)
+        return client.authed_get_all_pages(self.tap_stream_id, full_url, self.headers, stream = self.tap_stream_id)
+
+    def get_pagination_cursor(self, state, repo_path, since):
+        """
+        Return the cursor saved by an interrupted sync of the repository if the sync started from the same bookmark.
+        """
+        if not self.stable_order:
+            return None
+        cursor = (bookmarks.get_bookmark(state, self.tap_stream_id, repo_path) or {}).get("cursor")
+        if cursor and cursor.get("since") == since:
+            LOGGER.info("Resuming %s of the repository %s from %s", self.tap_stream_id, repo_path, cursor["url"])
+            return cursor
+        return None
+
+    def write_pagination_cursor(self, state, repo_path, cursor):
+        """
+        Save the cursor of the stream of the repository, or remove it if the cursor is None.
+        """
+        repo_bookmark = dict(bookmarks.get_bookmark(state, self.tap_stream_id, repo_path) or {})
+        if cursor is None and "cursor" not in repo_bookmark:
+            return
+        if cursor is None:
+            repo_bookmark.pop("cursor")
+        else:
+            repo_bookmark["cursor"] = cursor
+        singer.write_bookmark(state, self.tap_stream_id, repo_path, repo_bookmark)
+
+    def checkpoint_pagination(self, state, repo_path, response, since, max_bookmark_value, ordering = UNORDERED):
+        """
+        Save the url of the next page along with the maximum bookmark value of the pages read so far and emit the
+        state, so that an interrupted sync continues from the next page. The bookmark itself is not advanced, as the
+        remaining pages of an unordered endpoint can contain records older than the maximum bookmark value.
+        Return False if there is no next page.
+        """
+        next_page = response.links.get('prev' if ordering == ASCENDING else 'next')
+        if next_page:
+            self.write_pagination_cursor(state, repo_path, {"url": next_page['url'], "since": since, "max_bookmark": max_bookmark_value})
+            singer.write_state(state)
+        return bool(next_page)
+
+    # pylint: disable=unused-argument
+    def get_url_partitions(self, client, stream_to_sync):
+        """
+        Return the query parameters of each partition in which the child stream's records are listed.
+        """
+        return [{}]
+
+    # pylint: disable=unused-argument
+    def is_parent_unchanged(self, client, state, repo_path, parent_record):
+        """
+        Return True if the child records of the parent record can be skipped as they did not change since the last sync.
+        """
+        return False
+
+    # pylint: disable=unnecessary-pass
+    def update_parent_cache(self, client, state, repo_path, parent_record):
+        """
+        Save whatever is required by `is_parent_unchanged` after the child records of a parent record are synced.
+        """
+        pass
+
+    def sync_records(self, pages, context):
+        """
+        Drive the record pipeline of the stream over the pages of the endpoint, with one transformer for the records
+        of the stream and its child streams.
+        """
+        with singer.Transformer() as transformer:
+            context.transformer = transformer
+            self.emit_records(self.get_record_pipeline(pages, context), context)
+
+    def get_record_pipeline(self, pages, context):
+        """
+        Chain the stages of the record pipeline: fetch -> decorate -> filter -> transform. The emit stage
+        consumes the records coming out of the pipeline.
+        """
+        records = self.fetch_records(pages, context)
+        records = self.decorate_records(records, context)
+        records = self.filter_records(records, context)
+        return self.transform_records(records, context)
+
+    def fetch_records(self, pages, context):
+        """
+        Fetch stage of the record pipeline. Yield the records of each page. Once all the records of a page went
+        through the pipeline, stop if the filter stage found the end of the new records, or save a checkpoint if due.
+        Once the deadline of the run or of the repository is reached, save a checkpoint and stop before the next page,
+        or stop a stream without checkpoints, which is synced again from its first page by the next sync.
+        """
+        for response in pages:
+            records = response.json()
+            extraction_time = singer.utils.now()
+            for record in records:
+                yield PipelineRecord(record, extraction_time)
+
+            if context.synced_all_records:
+                break
+
+            if context.checkpoint and RUN_DEADLINE.is_reached(context.repo_path):
+                if self.checkpoint_pagination(context.state, context.repo_path, response, context.min_bookmark_value, context.max_bookmark_value, context.ordering):
+                    RUN_DEADLINE.check(context.repo_path)
+            elif not context.checkpoint and RUN_DEADLINE.is_reached(context.repo_path) and response.links.get('next'):
+                RUN_DEADLINE.check(context.repo_path)
+            elif context.checkpoint and context.checkpoint.is_due(len(records)):
+                self.checkpoint_pagination(context.state, context.repo_path, response, context.min_bookmark_value, context.max_bookmark_value, context.ordering)
+
+    def decorate_records(self, records, context):
+        """
+        Decorate stage of the record pipeline. Add the repository and the fields of nested objects to the records.
+        """
+        for item in records:
+            item.record['_sdc_repository'] = context.repo_path
+            self.add_fields_at_1st_level(record = item.record, parent_record = None)
+            yield item
+
+    def filter_records(self, records, context):
+        """
+        Filter stage of the record pipeline. Write the records only if the stream is selected.
+        """
+        for item in records:
+            item.write = self.tap_stream_id in context.selected_stream_ids
+            yield item
+
+    def is_new_record(self, record, replication_value, context):
+        """
+        Check if the record of an incremental stream should be written: the stream is selected, the record is updated
+        after the stream's bookmark and it was not written by the previous sync at the bookmark value.
+        """
+        if self.tap_stream_id not in context.selected_stream_ids or replication_value < context.parent_bookmark_value:
+            return False
+
+        record_key = get_record_key(record, self.key_properties)
+        context.boundary_keys.add(record_key, replication_value)
+        return not context.boundary_keys.is_duplicate(record_key, replication_value)
+
+    def transform_records(self, records, context):
+        """
+        Transform stage of the record pipeline. Transform the records to write as per the schema and the metadata.
+        """
+        for item in records:
+            if item.write:
+                item.rec = context.transformer.transform(item.record, context.stream_catalog['schema'], metadata=context.stream_catalog.metadata_map)
+            yield item
+
+    def emit_records(self, records, context):
+        """
+        Emit stage of the record pipeline. Write the transformed records and sync the child streams of each record.
+        """
+        child_plans = {child: get_stream_plan(context.catalog, child) for child in self.children if child in context.stream_to_sync}
+        with metrics.record_counter(self.tap_stream_id) as counter:
+            for item in records:
+                if item.write:
+                    self.write_record(context.client, context.state, context.repo_path, item.rec, time_extracted=item.extraction_time)
+                    counter.increment()
+
+                # The requests of the child streams are sent first, as their parent record is already fetched.
+                with request_priority(CHILD_REQUESTS):
+                    for child, child_plan in child_plans.items():
+                        parent_id = child_plan.get_parent_id(item.record)
+
+                        # Sync child stream, if it is selected or its nested child is selected.
+                        self.get_child_records(context.client,
+                                               context.catalog,
+                                               child,
+                                               parent_id,
+                                               context.repo_path,
+                                               context.state,
+                                               context.start_date,
+                                               item.record.get(self.replication_keys),
+                                               context.stream_to_sync,
+                                               context.selected_stream_ids,
+                                               parent_record = item.record,
+                                               transformer = context.transformer)
+
 class FullTableStream(Stream):
     def sync_endpoint(self,
                       client,
@@ -213,57 +696,81 @@ class FullTableStream(Stream):
                       stream_to_sync
                       ):
         """
-        A common function sync full table streams.
+        A common function sync full table streams. With change detection, write only the records which are
+        new or changed since the last sync, based on the hashes of the records saved in the state.
         """
 
         # build full url
         full_url = self.build_url(client.base_url, repo_path, None)
 
-        stream_catalog = get_schema(catalog, self.tap_stream_id)
-
-        with metrics.record_counter(self.tap_stream_id) as counter:
-            for response in client.authed_get_all_pages(
-                    self.tap_stream_id,
-                    full_url,
-                    self.headers,
-                    stream = self.tap_stream_id
-            ):
-                records = response.json()
-                extraction_time = singer.utils.now()
-                # Loop through all records
-                for record in records:
-
-                    record['_sdc_repository'] = repo_path
-                    self.add_fields_at_1st_level(record = record, parent_record = None)
-
-                    with singer.Transformer() as transformer:
-                        rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-                        if self.tap_stream_id in selected_stream_ids:
-
-                            singer.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
-
-                            counter.increment()
-
-                    for child in self.children:
-                        if child in stream_to_sync:
-
-                            parent_id = tuple(record.get(key) for key in STREAMS[child]().id_keys)
-
-                            # Sync child stream, if it is selected or its nested child is selected.
-                            self.get_child_records(client,
-                                                catalog,
-                                                child,
-                                                parent_id,
-                                                repo_path,
-                                                state,
-                                                start_date,
-                                                record.get(self.replication_keys),
-                                                stream_to_sync,
-                                                selected_stream_ids,
-                                                parent_record = record)
+        context = SyncContext(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync)
+        context.stream_catalog = get_stream_plan(catalog, self.tap_stream_id)
+        context.detect_changes = self.tap_stream_id in selected_stream_ids and self.is_change_detection_enabled(client)
+        context.previous_hashes = self.get_record_hashes(state, repo_path) if context.detect_changes else {}
+
+        pages = client.authed_get_all_pages(
+            self.tap_stream_id,
+            full_url,
+            self.headers,
+            stream = self.tap_stream_id
+        )
+        self.sync_records(pages, context)
+
+        # Records are not available if the stream is not accessible for the repository.
+        if context.detect_changes and self.tap_stream_id not in client.not_accessible_repos:
+            if client.config.get('change_detection_deletes') in (True, 'true'):
+                self.write_deleted_records(context.previous_hashes, context.record_hashes, repo_path)
+            repo_bookmark = dict(bookmarks.get_bookmark(state, self.tap_stream_id, repo_path) or {})
+            repo_bookmark["record_hashes"] = context.record_hashes
+            singer.write_bookmark(state, self.tap_stream_id, repo_path, repo_bookmark)
 
         return state
 
+    def get_record_pipeline(self, pages, context):
+        """
+        Chain the stages of the record pipeline, with the unchanged records filtered after the transform stage
+        as the hash of a record is computed on the transformed record.
+        """
+        records = super().get_record_pipeline(pages, context)
+        return self.filter_unchanged_records(records, context)
+
+    def filter_unchanged_records(self, records, context):
+        """
+        Filter stage of the record pipeline. With change detection, write only the new or changed records.
+        """
+        for item in records:
+            if item.write and context.detect_changes:
+                record_key = get_record_key(item.rec, self.key_properties)
+                context.record_hashes[record_key] = get_record_hash(item.rec)
+                item.write = context.previous_hashes.get(record_key) != context.record_hashes[record_key]
+            yield item
+
+    def is_change_detection_enabled(self, client):
+        """
+        Check if the unchanged records of the stream should be skipped. Records can not be skipped if
+        full table loads are versioned, as the target keeps only the records of the activated version.
+        """
+        return (self.change_detection and client.config.get('change_detection') in (True, 'true')
+                and not is_activate_version_enabled(client.config))
+
+    def get_record_hashes(self, state, repo_path):
+        """
+        Return the `primary key -> record hash` map of the repository saved along with the stream's bookmark.
+        """
+        return (bookmarks.get_bookmark(state, self.tap_stream_id, repo_path) or {}).get("record_hashes", {})
+
+    def write_deleted_records(self, previous_hashes, record_hashes, repo_path):
+        """
+        Write a record with the primary key and `_sdc_deleted_at` for each record which is not returned anymore.
+        """
+        deleted_at = singer.utils.strftime(singer.utils.now())
+        for record_key in previous_hashes:
+            if record_key not in record_hashes:
+                deleted_record = dict(zip(self.key_properties, json.loads(record_key)))
+                deleted_record['_sdc_repository'] = repo_path
+                deleted_record['_sdc_deleted_at'] = deleted_at
+                singer.write_record(self.tap_stream_id, deleted_record)
+
 class IncrementalStream(Stream):
     def sync_endpoint(self,
                       client,
@@ -278,80 +785,76 @@ class IncrementalStream(Stream):
         """
         A common function sync incremental streams. Sync an incremental stream for which records are not
         in descending order. For, incremental streams iterate all records, write only newly updated records and
-        write the latest bookmark value.
+        write the latest bookmark value. If the endpoint returns records in the descending order, stop reading
+        pages at the first record older than the bookmark. If it returns records in the ascending order, read the
+        pages from the last one and stop after the page that contains a record older than the bookmark.
         """
 
-        parent_bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
+        context = SyncContext(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync)
+        context.stream_catalog = get_stream_plan(catalog, self.tap_stream_id)
+        context.ordering = self.get_ordering(client.config)
+        context.parent_bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
         current_time = datetime.today().strftime(DATE_FORMAT)
-        min_bookmark_value = self.get_min_bookmark(self.tap_stream_id, selected_stream_ids, current_time, repo_path, start_date, state)
+        context.min_bookmark_value = self.get_min_bookmark(self.tap_stream_id, selected_stream_ids, current_time, repo_path, start_date, state)
 
-        max_bookmark_value = min_bookmark_value
+        context.max_bookmark_value = context.min_bookmark_value
 
         # build full url
-        full_url = self.build_url(client.base_url, repo_path, min_bookmark_value)
+        full_url = self.build_url(client.base_url, repo_path, context.min_bookmark_value)
 
-        stream_catalog = get_schema(catalog, self.tap_stream_id)
+        # Continue from the next page of an interrupted sync
+        cursor = self.get_pagination_cursor(state, repo_path, context.min_bookmark_value)
+        if cursor:
+            full_url = cursor["url"]
+            context.max_bookmark_value = cursor["max_bookmark"]
 
-        with metrics.record_counter(self.tap_stream_id) as counter:
-            for response in client.authed_get_all_pages(
-                    self.tap_stream_id,
-                    full_url,
-                    self.headers,
-                    stream = self.tap_stream_id
-            ):
-                records = response.json()
-                extraction_time = singer.utils.now()
-                # Loop through all records
-                for record in records:
-
-                    record['_sdc_repository'] = repo_path
-                    self.add_fields_at_1st_level(record = record, parent_record = None)
-
-                    with singer.Transformer() as transformer:
-                        if record.get(self.replication_keys):
-                            if record[self.replication_keys] >= max_bookmark_value:
-                                # Update max_bookmark_value
-                                max_bookmark_value = record[self.replication_keys]
-
-                            bookmark_dttm = record[self.replication_keys]
-
-                            # Keep only records whose bookmark is after the last_datetime
-                            if bookmark_dttm >= min_bookmark_value:
-
-                                if self.tap_stream_id in selected_stream_ids and bookmark_dttm >= parent_bookmark_value:
-                                    rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-
-                                    singer.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
-                                    counter.increment()
-
-                                for child in self.children:
-                                    if child in stream_to_sync:
-
-                                        parent_id = tuple(record.get(key) for key in STREAMS[child]().id_keys)
-
-                                        # Sync child stream, if it is selected or its nested child is selected.
-                                        self.get_child_records(client,
-                                                            catalog,
-                                                            child,
-                                                            parent_id,
-                                                            repo_path,
-                                                            state,
-                                                            start_date,
-                                                            record.get(self.replication_keys),
-                                                            stream_to_sync,
-                                                            selected_stream_ids,
-                                                            parent_record = record)
-                        else:
-                            LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
-                                        self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
-
-
-            # Write bookmark for incremental stream.
-            self.write_bookmarks(self.tap_stream_id, selected_stream_ids, max_bookmark_value, repo_path, state)
+        context.boundary_keys = BoundaryKeys(state, self.tap_stream_id, repo_path, context.parent_bookmark_value)
+        context.checkpoint = PaginationCheckpoint(client.config) if self.stable_order else None
+
+        self.sync_records(self.get_all_pages(client, full_url, resume = bool(cursor)), context)
+
+        # Write bookmark for incremental stream.
+        self.write_pagination_cursor(state, repo_path, None)
+        self.write_bookmarks(self.tap_stream_id, selected_stream_ids, context.max_bookmark_value, repo_path, state)
+        if self.tap_stream_id in selected_stream_ids:
+            context.boundary_keys.write(state, self.tap_stream_id, repo_path, context.max_bookmark_value)
 
         return state
 
+    def filter_records(self, records, context):
+        """
+        Filter stage of the record pipeline. Keep the records updated after the minimum bookmark of the stream and its
+        children, and write only the records updated after the stream's bookmark. Track the maximum bookmark value.
+        """
+        for item in records:
+            record = item.record
+
+            ordering_value = self.get_ordering_value(record)
+            if context.ordering and ordering_value and ordering_value < context.min_bookmark_value:
+                # Records of the remaining pages are older than the bookmark, as records are in the descending
+                # order, or in the ascending order with pages read from the last one.
+                context.synced_all_records = True
+                if context.ordering == DESCENDING:
+                    return
+
+            bookmark_dttm = record.get(self.replication_keys)
+            if not bookmark_dttm:
+                LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
+                               self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
+                continue
+
+            # Update max_bookmark_value
+            context.max_bookmark_value = max(context.max_bookmark_value, bookmark_dttm)
+
+            # Keep only records whose bookmark is after the last_datetime
+            if bookmark_dttm < context.min_bookmark_value:
+                continue
+
+            item.write = self.is_new_record(record, bookmark_dttm, context)
+            yield item
+
 class IncrementalOrderedStream(Stream):
+    ordering = DESCENDING
 
     def sync_endpoint(self,
                       client,
@@ -366,83 +869,75 @@ class IncrementalOrderedStream(Stream):
         A sync function for streams that have records in the descending order of replication key value. For such streams,
         iterate only the latest records.
         """
-        bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
+        context = SyncContext(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync)
+        context.stream_catalog = get_stream_plan(catalog, self.tap_stream_id)
+        context.parent_bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
         current_time = datetime.today().strftime(DATE_FORMAT)
 
-        min_bookmark_value = self.get_min_bookmark(self.tap_stream_id, selected_stream_ids, current_time, repo_path, start_date, state)
-        bookmark_time = singer.utils.strptime_to_utc(min_bookmark_value)
+        context.min_bookmark_value = self.get_min_bookmark(self.tap_stream_id, selected_stream_ids, current_time, repo_path, start_date, state)
+        context.max_bookmark_value = context.parent_bookmark_value
 
         # Build full url
-        full_url = self.build_url(client.base_url, repo_path, bookmark_value)
-        synced_all_records = False
-        stream_catalog = get_schema(catalog, self.tap_stream_id)
+        full_url = self.build_url(client.base_url, repo_path, context.parent_bookmark_value)
 
-        parent_bookmark_value = bookmark_value
-        record_counter = 0
-        with metrics.record_counter(self.tap_stream_id) as counter:
-            for response in client.authed_get_all_pages(
-                    self.tap_stream_id,
-                    full_url,
-                    stream = self.tap_stream_id
-            ):
-                records = response.json()
-                extraction_time = singer.utils.now()
-                for record in records:
-                    record['_sdc_repository'] = repo_path
-                    self.add_fields_at_1st_level(record = record, parent_record = None)
-
-                    updated_at = record.get(self.replication_keys)
-
-                    if record_counter == 0 and updated_at > bookmark_value:
-                        # Consider replication key value of 1st record as bookmark value.
-                        # Because all records are in descending order of replication key value
-                        bookmark_value = updated_at
-                    record_counter = record_counter + 1
-
-                    if updated_at:
-                        if bookmark_time and singer.utils.strptime_to_utc(updated_at) < bookmark_time:
-                            # Skip all records from now onwards because the bookmark value of the current record is less than
-                            # last saved bookmark value and all records from now onwards will have bookmark value less than last
-                            # saved bookmark value.
-                            synced_all_records = True
-                            break
-
-                        if self.tap_stream_id in selected_stream_ids and updated_at >= parent_bookmark_value:
-
-                            # Transform and write record
-                            with singer.Transformer() as transformer:
-                                rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-                                singer.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
-                                counter.increment()
+        context.boundary_keys = BoundaryKeys(state, self.tap_stream_id, repo_path, context.parent_bookmark_value)
 
-                        for child in self.children:
-                            if child in stream_to_sync:
-                                parent_id = tuple(record.get(key) for key in STREAMS[child]().id_keys)
-
-                                # Sync child stream, if it is selected or its nested child is selected.
-                                self.get_child_records(client,
-                                                    catalog,
-                                                    child,
-                                                    parent_id,
-                                                    repo_path,
-                                                    state,
-                                                    start_date,
-                                                    record.get(self.replication_keys),
-                                                    stream_to_sync,
-                                                    selected_stream_ids,
-                                                    parent_record = record)
-                    else:
-                        LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
-                                    self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
+        # Continue from the next page of an interrupted sync
+        cursor = self.get_pagination_cursor(state, repo_path, context.min_bookmark_value)
+        if cursor:
+            full_url = cursor["url"]
+            context.max_bookmark_value = cursor["max_bookmark"]
+
+        # The url of the next page is saved only if the pages are in a stable order.
+        context.checkpoint = PaginationCheckpoint(client.config) if self.stable_order else None
 
-                if synced_all_records:
-                    break
+        pages = client.authed_get_all_pages(
+            self.tap_stream_id,
+            full_url,
+            stream = self.tap_stream_id
+        )
+        self.sync_records(pages, context)
 
-            # Write bookmark for incremental stream.
-            self.write_bookmarks(self.tap_stream_id, selected_stream_ids, bookmark_value, repo_path, state)
+        # Write bookmark for incremental stream.
+        self.write_pagination_cursor(state, repo_path, None)
+        self.write_bookmarks(self.tap_stream_id, selected_stream_ids, context.max_bookmark_value, repo_path, state)
+        if self.tap_stream_id in selected_stream_ids:
+            context.boundary_keys.write(state, self.tap_stream_id, repo_path, context.max_bookmark_value)
 
         return state
 
+    def filter_records(self, records, context):
+        """
+        Filter stage of the record pipeline. Stop at the first record older than the minimum bookmark of the stream
+        and its children, and write only the records updated after the stream's bookmark.
+        """
+        bookmark_time = singer.utils.strptime_to_utc(context.min_bookmark_value)
+        record_counter = 0
+        for item in records:
+            record = item.record
+            updated_at = record.get(self.replication_keys)
+
+            if record_counter == 0 and updated_at > context.max_bookmark_value:
+                # Consider replication key value of 1st record as bookmark value.
+                # Because all records are in descending order of replication key value
+                context.max_bookmark_value = updated_at
+            record_counter = record_counter + 1
+
+            if not updated_at:
+                LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
+                               self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
+                continue
+
+            if bookmark_time and singer.utils.strptime_to_utc(updated_at) < bookmark_time:
+                # Skip all records from now onwards because the bookmark value of the current record is less than
+                # last saved bookmark value and all records from now onwards will have bookmark value less than last
+                # saved bookmark value.
+                context.synced_all_records = True
+                return
+
+            item.write = self.is_new_record(record, updated_at, context)
+            yield item
+
 class Reviews(IncrementalStream):
     '''
     https://docs.github.com/en/rest/reference/pulls#list-reviews-for-a-pull-request
@@ -465,21 +960,100 @@ class Reviews(IncrementalStream):
 class ReviewComments(IncrementalOrderedStream):
     '''
     https://docs.github.com/en/rest/pulls/comments#get-a-review-comment-for-a-pull-request
+    https://docs.github.com/en/rest/pulls/comments#list-review-comments-in-a-repository
     '''
     tap_stream_id = "review_comments"
     replication_method = "INCREMENTAL"
     replication_keys = "updated_at"
     key_properties = ["id"]
     path = "pulls/{}/comments?sort=updated_at&direction=desc"
+    stable_order = False
+    repository_path = "pulls/comments?sort=updated&direction=desc"
     use_repository = True
     id_keys = ['number']
     parent = 'pull_requests'
 
+    def __init__(self):
+        self.client = None
+        self.repo_path = None
+        # Map of pull request number to pull request id used to fill `pr_id` in the repository-level mode.
+        self.pr_ids = {}
+        self.pr_pages = None
+        # Bookmark of the stream, before which the pull requests are not listed.
+        self.since = None
+
+    def build_url(self, base_url, repo_path, bookmark):
+        """
+        Build the url of the repository-level endpoint filtered by the bookmark.
+        """
+        full_url = '{}/repos/{}/{}&since={}'.format(
+            base_url,
+            repo_path,
+            self.repository_path,
+            bookmark)
+
+        LOGGER.info("Final url is: %s", full_url)
+        return full_url
+
+    def sync_endpoint(self,
+                      client,
+                      state,
+                      catalog,
+                      repo_path,
+                      start_date,
+                      selected_stream_ids,
+                      stream_to_sync
+                      ):
+        """
+        Sync the review comments of all the pull requests of the repository from the repository-level endpoint.
+        """
+        self.client = client
+        self.repo_path = repo_path
+        self.pr_ids = {}
+        self.pr_pages = None
+        self.since = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
+
+        return super().sync_endpoint(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync)
+
+    def get_pr_id(self, pr_number, pr_url):
+        """
+        Return the id of the pull request from the number. Pull requests updated since the bookmark are listed in the
+        descending order of `updated_at` until the number is found, as a new comment updates its pull request. The
+        pull request of a comment edited on an older pull request is requested on its own from its url.
+        """
+        if self.pr_pages is None:
+            self.pr_pages = self.client.authed_get_all_pages(
+                "pull_requests",
+                '{}/repos/{}/pulls?state=all&sort=updated&direction=desc&per_page=100'.format(self.client.base_url, self.repo_path),
+                stream = "pull_requests"
+            )
+
+        for response in self.pr_pages:
+            pull_requests = response.json() or []
+            for pull_request in pull_requests:
+                self.pr_ids[pull_request['number']] = pull_request['id']
+            if any(pull_request.get('updated_at', self.since) < self.since for pull_request in pull_requests):
+                # The remaining pull requests were not updated since the bookmark
+                self.pr_pages = iter([])
+                break
+            if pr_number in self.pr_ids:
+                break
+
+        if pr_number not in self.pr_ids:
+            response = self.client.authed_get("pull_requests", pr_url, stream = "pull_requests")
+            self.pr_ids[pr_number] = response.json().get('id')
+
+        return self.pr_ids[pr_number]
+
     def add_fields_at_1st_level(self, record, parent_record = None):
         """
         Add fields in the record explicitly at the 1st level of JSON.
         """
-        record['pr_id'] = parent_record['id']
+        if parent_record:
+            record['pr_id'] = parent_record['id']
+        else:
+            pr_number = int(record['pull_request_url'].rstrip('/').split('/')[-1])
+            record['pr_id'] = self.pr_ids.get(pr_number) or self.get_pr_id(pr_number, record['pull_request_url'])
 
 class PRCommits(IncrementalStream):
     '''
@@ -504,6 +1078,47 @@ class PRCommits(IncrementalStream):
         record['pr_id'] = parent_record.get('id')
         record['id'] = '{}-{}'.format(parent_record.get('id'), record.get('sha'))
 
+    @staticmethod
+    def get_head_sha_cache(state, repo_path):
+        """
+        Return the `pr_id -> head.sha` cache of the repository stored along with the stream's bookmark.
+        """
+        repo_bookmark = bookmarks.get_bookmark(state, "pr_commits", repo_path) or {}
+        return repo_bookmark.get("head_shas", {})
+
+    def is_parent_unchanged(self, client, state, repo_path, parent_record):
+        """
+        The commits of a pull request change only when its head SHA changes, so skip the pull request
+        if its head SHA is the same as the one seen in the previous sync.
+        """
+        head_sha = (parent_record.get('head') or {}).get('sha')
+        if not head_sha:
+            return False
+        return self.get_head_sha_cache(state, repo_path).get(str(parent_record.get('id'))) == head_sha
+
+    def update_parent_cache(self, client, state, repo_path, parent_record):
+        """
+        Save the head SHA of the synced pull request. Closed pull requests are evicted from the cache and the
+        least recently synced pull requests are evicted once the cache is full.
+        """
+        head_sha = (parent_record.get('head') or {}).get('sha')
+        if not head_sha:
+            return
+
+        head_shas = dict(self.get_head_sha_cache(state, repo_path))
+        pr_id = str(parent_record.get('id'))
+        head_shas.pop(pr_id, None)
+
+        if parent_record.get('state') != 'closed':
+            head_shas[pr_id] = head_sha
+            cache_size = int(client.config.get('pr_commits_cache_size') or DEFAULT_PR_COMMITS_CACHE_SIZE)
+            for evicted_pr_id in list(head_shas)[:max(len(head_shas) - cache_size, 0)]:
+                del head_shas[evicted_pr_id]
+
+        repo_bookmark = dict(bookmarks.get_bookmark(state, "pr_commits", repo_path) or {})
+        repo_bookmark["head_shas"] = head_shas
+        singer.write_bookmark(state, "pr_commits", repo_path, repo_bookmark)
+
 class PullRequests(IncrementalOrderedStream):
     '''
     https://developer.github.com/v3/pulls/#list-pull-requests
@@ -513,6 +1128,7 @@ class PullRequests(IncrementalOrderedStream):
     replication_keys = "updated_at"
     key_properties = ["id"]
     path = "pulls?state=all&sort=updated&direction=desc"
+    stable_order = False
     children = ['reviews', 'review_comments', 'pr_commits']
     pk_child_fields = ["number"]
 
@@ -555,6 +1171,58 @@ class TeamMembers(FullTableStream):
         Add fields in the record explicitly at the 1st level of JSON.
         """
         record['team_slug'] = parent_record['slug']
+        record['team_url'] = parent_record.get('url')
+
+    def get_url_partitions(self, client, stream_to_sync):
+        """
+        In the `role` sync mode of `team_memberships`, list the team members once per role so that
+        the memberships can be built from the listed members.
+        """
+        if 'team_memberships' in stream_to_sync and client.config.get('team_memberships_sync_mode') == 'role':
+            return [{'role': role} for role in TEAM_MEMBER_ROLES]
+        return [{}]
+
+    def get_child_records(self,
+                          client,
+                          catalog,
+                          child_stream,
+                          grand_parent_id,
+                          repo_path,
+                          state,
+                          start_date,
+                          bookmark_dttm,
+                          stream_to_sync,
+                          selected_stream_ids,
+                          parent_id = None,
+                          parent_record = None,
+                          transformer = None):
+        """
+        Build the team membership from the team member listed with a role, and request it only if
+        the membership can not be built.
+        """
+        if child_stream != 'team_memberships' or not (parent_record.get('role') and parent_record.get('team_url')):
+            super().get_child_records(client, catalog, child_stream, grand_parent_id, repo_path, state, start_date,
+                                      bookmark_dttm, stream_to_sync, selected_stream_ids, parent_id, parent_record, transformer)
+            return
+
+        if child_stream not in selected_stream_ids:
+            return
+
+        # The team members listing returns only the active members of the team.
+        record = {
+            'url': '{}/memberships/{}'.format(parent_record['team_url'], parent_record['login']),
+            'role': parent_record['role'],
+            'state': 'active',
+            'login': parent_record['login'],
+            '_sdc_repository': repo_path
+        }
+        stream_catalog = get_stream_plan(catalog, child_stream)
+
+        with metrics.record_counter(child_stream) as counter:
+            with reuse_transformer(transformer) as record_transformer:
+                rec = record_transformer.transform(record, stream_catalog['schema'], metadata=stream_catalog.metadata_map)
+                self.get_child_object(child_stream).write_record(client, state, repo_path, rec, time_extracted=singer.utils.now())
+                counter.increment()
 
 class Teams(FullTableStream):
     '''
@@ -563,6 +1231,7 @@ class Teams(FullTableStream):
     tap_stream_id = "teams"
     replication_method = "FULL_TABLE"
     key_properties = ["id"]
+    change_detection = True
     path = "orgs/{}/teams"
     use_organization = True
     children= ["team_members"]
@@ -577,6 +1246,8 @@ class Commits(IncrementalStream):
     replication_keys = "updated_at"
     key_properties = ["sha"]
     path = "commits"
+    # The commits of a window are bounded by `until`.
+    backfill_path = "commits?since={}&until={}"
     filter_param = True
 
     def add_fields_at_1st_level(self, record, parent_record = None):
@@ -595,6 +1266,9 @@ class Comments(IncrementalOrderedStream):
     key_properties = ["id"]
     filter_param = True
     path = "issues/comments?sort=updated&direction=desc"
+    stable_order = False
+    backfill_path = "issues/comments?sort=updated&direction=asc&since={}"
+    backfill_ordering = ASCENDING
 
 class Issues(IncrementalOrderedStream):
     '''
@@ -606,6 +1280,9 @@ class Issues(IncrementalOrderedStream):
     key_properties = ["id"]
     filter_param = True
     path = "issues?state=all&sort=updated&direction=desc"
+    stable_order = False
+    backfill_path = "issues?state=all&sort=updated&direction=asc&since={}"
+    backfill_ordering = ASCENDING
 
 class Assignees(FullTableStream):
     '''
@@ -614,17 +1291,89 @@ class Assignees(FullTableStream):
     tap_stream_id = "assignees"
     replication_method = "FULL_TABLE"
     key_properties = ["id"]
+    change_detection = True
     path = "assignees"
 
-class Releases(FullTableStream):
+class Releases(IncrementalOrderedStream):
     '''
     https://docs.github.com/en/rest/releases/releases#list-releases
     '''
     tap_stream_id = "releases"
-    replication_method = "FULL_TABLE"
+    replication_method = "INCREMENTAL"
+    replication_keys = "created_at"
     key_properties = ["id"]
     path = "releases?sort=created_at&direction=desc"
 
+    def __init__(self):
+        # Map of the id of the releases read by the sync to whether the release is a draft.
+        self.drafts_read = {}
+
+    def sync_endpoint(self,
+                      client,
+                      state,
+                      catalog,
+                      repo_path,
+                      start_date,
+                      selected_stream_ids,
+                      stream_to_sync
+                      ):
+        """
+        Sync the releases created after the bookmark, then request again the drafts written by the previous syncs,
+        as a draft is published later without a new release being created.
+        """
+        self.drafts_read = {}
+        state = super().sync_endpoint(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync)
+        self.sync_drafts(client, state, catalog, repo_path)
+        return state
+
+    def filter_records(self, records, context):
+        """
+        Keep track of the drafts read by the sync.
+        """
+        for item in super().filter_records(records, context):
+            self.drafts_read[item.record['id']] = bool(item.record.get('draft'))
+            yield item
+
+    def sync_drafts(self, client, state, catalog, repo_path):
+        """
+        Write the drafts of the previous syncs which were published since, and keep the ids of the drafts in the
+        bookmark of the repository. A deleted draft is forgotten.
+        """
+        repo_bookmark = dict(bookmarks.get_bookmark(state, self.tap_stream_id, repo_path) or {})
+        previous_drafts = [release_id for release_id in repo_bookmark.get('drafts', []) if release_id not in self.drafts_read]
+        drafts = {release_id for release_id, draft in self.drafts_read.items() if draft}
+
+        stream_catalog = get_stream_plan(catalog, self.tap_stream_id)
+        with metrics.record_counter(self.tap_stream_id) as counter, singer.Transformer() as transformer:
+            for release_id in previous_drafts:
+                if RUN_DEADLINE.is_reached(repo_path):
+                    # The next sync requests the remaining drafts
+                    drafts.add(release_id)
+                    continue
+                try:
+                    response = client.authed_get(self.tap_stream_id,
+                                                 '{}/repos/{}/releases/{}'.format(client.base_url, repo_path, release_id),
+                                                 stream = self.tap_stream_id,
+                                                 should_skip_404 = False)
+                except NotFoundException:
+                    LOGGER.info("The draft release %s of %s was deleted.", release_id, repo_path)
+                    continue
+
+                record = response.json()
+                if record.get('draft'):
+                    drafts.add(release_id)
+                    continue
+                record['_sdc_repository'] = repo_path
+                rec = transformer.transform(record, stream_catalog['schema'], metadata=stream_catalog.metadata_map)
+                self.write_record(client, state, repo_path, rec, time_extracted=singer.utils.now())
+                counter.increment()
+
+        if drafts:
+            repo_bookmark['drafts'] = sorted(drafts)
+        else:
+            repo_bookmark.pop('drafts', None)
+        singer.write_bookmark(state, self.tap_stream_id, repo_path, repo_bookmark)
+
 class IssueLabels(FullTableStream):
     '''
     https://docs.github.com/en/rest/issues/labels#list-labels-for-a-repository
@@ -632,6 +1381,7 @@ class IssueLabels(FullTableStream):
     tap_stream_id = "issue_labels"
     replication_method = "FULL_TABLE"
     key_properties = ["id"]
+    change_detection = True
     path = "labels"
 
 class IssueEvents(IncrementalOrderedStream):
@@ -653,6 +1403,7 @@ class Events(IncrementalStream):
     replication_keys = "created_at"
     key_properties = ["id"]
     path = "events"
+    ordering = DESCENDING
 
 class CommitComments(IncrementalStream):
     '''
@@ -663,6 +1414,17 @@ class CommitComments(IncrementalStream):
     replication_keys = "updated_at"
     key_properties = ["id"]
     path = "comments"
+    # Commit comments are listed in the order of creation.
+    ordering_key = "created_at"
+
+    def get_ordering(self, config):
+        """
+        Read the pages from the last one only if `commit_comments_reverse_pagination` is enabled, as the edits of the
+        comments created before the bookmark are then not read again. Otherwise, all the pages are read.
+        """
+        if config.get('commit_comments_reverse_pagination') in (True, 'true'):
+            return ASCENDING
+        return self.ordering
 
 class IssueMilestones(IncrementalOrderedStream):
     '''
@@ -673,6 +1435,7 @@ class IssueMilestones(IncrementalOrderedStream):
     replication_keys = "updated_at"
     key_properties = ["id"]
     path = "milestones?direction=desc&sort=updated_at"
+    stable_order = False
 
 class Collaborators(FullTableStream):
     '''
@@ -681,17 +1444,21 @@ class Collaborators(FullTableStream):
     tap_stream_id = "collaborators"
     replication_method = "FULL_TABLE"
     key_properties = ["id"]
+    change_detection = True
     path = "collaborators"
 
-class StarGazers(FullTableStream):
+class StarGazers(IncrementalStream):
     '''
     https://docs.github.com/en/rest/activity/starring#list-stargazers
     '''
     tap_stream_id = "stargazers"
-    replication_method = "FULL_TABLE"
+    replication_method = "INCREMENTAL"
+    replication_keys = "starred_at"
     key_properties = ["user_id"]
     path = "stargazers"
     headers = {'Accept': 'application/vnd.github.v3.star+json'}
+    # Stargazers are listed in the ascending order of `starred_at`, so only the last pages are read.
+    ordering = ASCENDING
 
     def add_fields_at_1st_level(self, record, parent_record = None):
         """
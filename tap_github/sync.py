@@ -1,7 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import collections
+import contextlib
+import copy
+import hashlib
+import sys
+import threading
+import time
 import singer
 from singer import bookmarks
-from tap_github.streams import STREAMS
+from tap_github.client import GithubClient, GithubException
+from tap_github.streams import STREAMS, CompiledStream, get_bookmark, is_activate_version_enabled
+from tap_github.backfill import can_backfill, sync_backfill
+from tap_github.work_queue import WorkQueue, DEFAULT_LEASE_SECONDS
+from tap_github.scheduler import request_priority, FULL_TABLE_REQUESTS, INCREMENTAL_REQUESTS
+from tap_github.deadline import RUN_DEADLINE, DeadlineReached, RepoDeadlineReached
 
 LOGGER = singer.get_logger()
 STREAM_TO_SYNC_FOR_ORGS = ['teams', 'team_members', 'team_memberships']
@@ -55,13 +67,95 @@ def get_ordered_stream_list(currently_syncing, streams_to_sync):
 
 def get_ordered_repos(state, repositories):
     """
-    Get an ordered list of remaining repos to sync followed by synced repos.
+    Get an ordered list of remaining repos to sync followed by synced repos. The repository of the interrupted sync
+    comes first, and then the repositories whose last completed sync is the oldest, so that no repository is left
+    behind when the syncs keep ending early.
     """
     syncing_repo = state.get("currently_syncing_repo")
     if syncing_repo in repositories:
         index = repositories.index(syncing_repo)
         repositories = repositories[index:] + repositories[:index]
-    return repositories
+    last_completed = state.get("last_completed", {})
+    in_flight = state.get("resume", {}).get("in_flight", {})
+    return sorted(repositories, key=lambda repo: (repo != syncing_repo, repo not in in_flight, last_completed.get(repo, "")))
+
+def write_last_completed(state, repo):
+    """
+    Save the time at which the sync of all the streams of the repository was completed.
+    """
+    state.setdefault("last_completed", {})[repo] = singer.utils.strftime(singer.utils.now())
+
+def get_resume_items(state, section, key):
+    """
+    Get the streams of the repository or organization in a section of the resume state: "in_flight" for the streams
+    whose sync was started and not completed, and "completed" for the streams synced in the current pass over all the
+    repositories. The page to continue an incremental stream from is saved in the cursor of its bookmark.
+    """
+    return state.get("resume", {}).get(section, {}).get(key, [])
+
+def set_resume_items(state, section, key, stream_ids):
+    if stream_ids:
+        state.setdefault("resume", {}).setdefault(section, {})[key] = sorted(stream_ids)
+    elif key in state.get("resume", {}).get(section, {}):
+        del state["resume"][section][key]
+        if not state["resume"][section]:
+            del state["resume"][section]
+
+def start_resume_item(state, key, stream_id):
+    """
+    Save the stream of the repository or organization as in flight.
+    """
+    set_resume_items(state, "in_flight", key, set(get_resume_items(state, "in_flight", key)) | {stream_id})
+
+def complete_resume_item(state, key, stream_id):
+    """
+    Save the stream of the repository or organization as completed in the current pass.
+    """
+    set_resume_items(state, "in_flight", key, set(get_resume_items(state, "in_flight", key)) - {stream_id})
+    set_resume_items(state, "completed", key, set(get_resume_items(state, "completed", key)) | {stream_id})
+
+def end_resume_pass(state):
+    """
+    Forget the streams completed and the table version of the pass over all the repositories once it is over.
+    The streams still in flight, as their repository was stopped by `max_repo_runtime_seconds`, are kept.
+    """
+    resume = state.pop("resume", {})
+    if resume.get("in_flight"):
+        state["resume"] = {"in_flight": resume["in_flight"]}
+
+def get_shard(config):
+    """
+    Get the index of the shard synced by this run and the number of shards from the config.
+    """
+    shard_count = int(config.get('shard_count') or 1)
+    shard_index = int(config.get('shard_index') or 0)
+    if not 0 <= shard_index < shard_count:
+        raise GithubException("Please provide a shard_index from 0 to {}.".format(shard_count - 1))
+    return shard_index, shard_count
+
+def get_key_shard(key, shard_count):
+    """
+    Get the shard owning the bookmarks of a repository or an organization. A repository is owned by the shard
+    given by the hash of its name, the same on every node, and an organization is owned by the first shard.
+    """
+    if '/' not in key:
+        return 0
+    return int(hashlib.sha256(key.encode('utf-8')).hexdigest(), 16) % shard_count
+
+def filter_shard(config, repositories, organizations):
+    """
+    Keep the repositories and the organizations of the shard synced by this run.
+    """
+    shard_index, shard_count = get_shard(config)
+    if shard_count == 1:
+        return repositories, organizations
+    if is_activate_version_enabled(config) and not config.get('table_version'):
+        # The activation of a table version of one shard would delete the records loaded by the other shards.
+        raise GithubException("Please provide the same table_version to all the shards to sync with activate_version and shard_count.")
+    repositories = [repo for repo in repositories if get_key_shard(repo, shard_count) == shard_index]
+    organizations = [org for org in organizations if get_key_shard(org, shard_count) == shard_index]
+    LOGGER.info("Syncing %s repositories and %s organizations of shard %s of %s.", len(repositories), len(organizations), shard_index, shard_count)
+    return repositories, organizations
 
 def translate_state(state, catalog, repositories):
     '''
@@ -138,16 +232,30 @@ def translate_state(state, catalog, repositories):
         if key != "bookmarks":
             new_state[key] = value
 
+    # The stream and the repository of an interrupted sync of an older version are the only item in flight.
+    if "resume" not in state and state.get("currently_syncing_repo") and state.get("currently_syncing"):
+        new_state["resume"] = {"in_flight": {state["currently_syncing_repo"]: [state["currently_syncing"]]}}
+
     return new_state
 
-def get_stream_to_sync(catalog):
+def get_detached_streams(config):
+    """
+    Get the child streams which are configured to be synced from their repository-level endpoint
+    instead of once per parent record.
+    """
+    return {stream_name for stream_name, stream_obj in STREAMS.items()
+            if stream_obj.repository_path and config.get('{}_sync_mode'.format(stream_name)) == 'repository'}
+
+def get_stream_to_sync(catalog, detached_streams = ()):
     """
     Get the streams for which the sync function should be called(the parent in case of selected child streams).
     """
     streams_to_sync = []
     selected_streams = get_selected_streams(catalog)
+    # Detached child streams are synced on their own and do not require the sync of their parent.
+    attached_selected_streams = [stream for stream in selected_streams if stream not in detached_streams]
     for stream_name, stream_obj in STREAMS.items():
-        if stream_name in selected_streams or is_any_child_selected(stream_obj, selected_streams):
+        if stream_name in selected_streams or is_any_child_selected(stream_obj, attached_selected_streams):
             # Append the selected stream or deselected parent stream into the list, if its child or nested child is selected.
             streams_to_sync.append(stream_name)
     return streams_to_sync
@@ -167,81 +275,479 @@ def is_any_child_selected(stream_obj,selected_streams):
 
 def write_schemas(stream_id, catalog, selected_streams):
     """
-    Write the schemas for each stream.
+    Write the schemas for each stream. The catalog is the catalog entries of the sync plan, keyed by stream id.
     """
-    stream_obj = STREAMS[stream_id]()
-
     if stream_id in selected_streams:
         # Get catalog object for particular stream.
-        stream = [cat for cat in catalog['streams'] if cat['tap_stream_id'] == stream_id ][0]
+        stream = catalog[stream_id]
         singer.write_schema(stream_id, stream['schema'], stream['key_properties'])
 
-    for child in stream_obj.children:
+    for child in STREAMS[stream_id].children:
         write_schemas(child, catalog, selected_streams)
 
+def get_tree_streams(stream_id, stream_to_sync, detached_streams):
+    """
+    Get the stream and its descendant streams which are synced as a part of it.
+    """
+    tree_streams = [stream_id]
+    for child in STREAMS[stream_id].children:
+        if child in stream_to_sync and child not in detached_streams:
+            tree_streams += get_tree_streams(child, stream_to_sync, detached_streams)
+    return tree_streams
+
+class SyncPlan: # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """
+    The sync plan compiled once per run from the catalog and the config: the streams to sync for the organizations
+    and the repositories, the compiled catalog entries keyed by stream id and, for each stream synced on its own, the streams
+    selected and to sync in its tree, and the streams synced as a part of it.
+    """
+    def __init__(self, catalog, config):
+        # Get selected streams, make sure stream dependencies are met
+        self.selected_stream_ids = get_selected_streams(catalog)
+        self.detached_streams = get_detached_streams(config)
+        self.streams_to_sync = get_stream_to_sync(catalog, self.detached_streams)
+
+        # Sync `teams`, `team_members`and `team_memberships` streams just single time for any organization.
+        self.streams_to_sync_for_orgs = set(self.streams_to_sync).intersection(STREAM_TO_SYNC_FOR_ORGS)
+        self.streams_to_sync_for_repos = set(self.streams_to_sync) - self.streams_to_sync_for_orgs
+
+        # The metadata map, the parent id extractor and the url template of each stream are compiled once per run.
+        self.catalog = {stream['tap_stream_id']: CompiledStream(stream['tap_stream_id'], stream) if stream['tap_stream_id'] in STREAMS else stream
+                        for stream in catalog['streams']}
+        self.max_parallel_streams = int(config.get('max_parallel_streams') or 1)
+
+        # A "sub_stream" is synced as part of the parent stream unless it is detached from its parent.
+        self.stream_trees = {}
+        for stream_id in self.streams_to_sync:
+            if not STREAMS[stream_id].parent or stream_id in self.detached_streams:
+                # Detached streams are synced only on their own and not as a part of their parent stream
+                self.stream_trees[stream_id] = {
+                    "selected_stream_ids": [stream for stream in self.selected_stream_ids
+                                            if stream not in self.detached_streams or stream == stream_id],
+                    "stream_to_sync": [stream for stream in self.streams_to_sync
+                                       if stream not in self.detached_streams or stream == stream_id],
+                    "streams": get_tree_streams(stream_id, self.streams_to_sync, self.detached_streams)
+                }
+
+    def to_dict(self):
+        """
+        Return the plan without the catalog entries in a JSON serializable form.
+        """
+        streams = {}
+        for stream_id in self.streams_to_sync:
+            stream_class = STREAMS[stream_id]
+            streams[stream_id] = {
+                "selected": stream_id in self.selected_stream_ids,
+                "parent": stream_class.parent,
+                "children": [child for child in stream_class.children if child in self.streams_to_sync],
+                "replication_method": stream_class.replication_method,
+                "replication_keys": stream_class.replication_keys,
+                "path": stream_class.path,
+                "synced_on_its_own": stream_id in self.stream_trees,
+            }
+        return {
+            "selected_streams": sorted(self.selected_stream_ids),
+            "detached_streams": sorted(self.detached_streams),
+            "organization_streams": sorted(self.streams_to_sync_for_orgs),
+            "repository_streams": sorted(self.streams_to_sync_for_repos),
+            "streams": streams
+        }
+
+def get_table_versions(config, selected_stream_ids, state = None):
+    """
+    Get a new table version for each selected full table stream, if full table loads are versioned.
+    The version is shared by all the repositories, as the records of all repositories go to the same table,
+    and is given by the orchestrator in `table_version` when the repositories are split across processes.
+    A resumed pass keeps the version of the interrupted pass, as the repositories completed by it are not synced again.
+    """
+    if not is_activate_version_enabled(config):
+        return {}
+    version = int((state or {}).get('resume', {}).get('table_version') or config.get('table_version') or time.time() * 1000)
+    return {stream_id: version for stream_id in selected_stream_ids if STREAMS[stream_id].replication_method == "FULL_TABLE"}
+
+def write_table_versions(state, table_versions, streams_to_sync, repo_path):
+    """
+    Save the table version of the repository's full table load in the state.
+    """
+    for stream_id, version in table_versions.items():
+        if stream_id in streams_to_sync:
+            repo_bookmark = dict(bookmarks.get_bookmark(state, stream_id, repo_path) or {})
+            repo_bookmark["version"] = version
+            singer.write_bookmark(state, stream_id, repo_path, repo_bookmark)
+
+def activate_table_versions(table_versions, not_accessible_streams, stopped_streams = ()):
+    """
+    Activate the table version of the full table streams once the streams are loaded for all the repositories.
+    """
+    for stream_id, version in table_versions.items():
+        if stream_id in not_accessible_streams:
+            # The records of the repositories which were not accessible would be deleted by the activation.
+            LOGGER.warning("Skipping the activation of the table version of %s stream as it was not accessible for all repositories.", stream_id)
+            continue
+        if stream_id in stopped_streams:
+            # The records of the repositories stopped before the stream was loaded would be deleted by the activation.
+            LOGGER.warning("Skipping the activation of the table version of %s stream as it was not loaded for all repositories.", stream_id)
+            continue
+        singer.write_version(stream_id, version)
+
+def get_stopped_streams(plan, state, repositories):
+    """
+    Get the streams, along with their child streams, which were not completed in the current pass for a repository,
+    as the sync of the repository was stopped by `max_repo_runtime_seconds`.
+    """
+    stopped_streams = set()
+    for repo in repositories:
+        completed = get_resume_items(state, "completed", repo)
+        for stream_id in plan.streams_to_sync_for_repos:
+            if stream_id in plan.stream_trees and stream_id not in completed:
+                stopped_streams.update(plan.stream_trees[stream_id]["streams"])
+    return stopped_streams
+
+def merge_bookmarks(state, worker_state, repo, stream_ids = None):
+    """
+    Copy the bookmarks and the streams in flight and completed of the repository from the state of a worker into
+    the state, for all the streams or only for the streams synced by the worker.
+    """
+    for stream_id, stream_bookmarks in worker_state.get('bookmarks', {}).items():
+        if repo in stream_bookmarks and (stream_ids is None or stream_id in stream_ids):
+            state.setdefault('bookmarks', {}).setdefault(stream_id, {})[repo] = stream_bookmarks[repo]
+
+    for section in ("in_flight", "completed"):
+        worker_items = get_resume_items(worker_state, section, repo)
+        if stream_ids is not None:
+            worker_items = [stream_id for stream_id in get_resume_items(state, section, repo) if stream_id not in stream_ids] \
+                + [stream_id for stream_id in worker_items if stream_id in stream_ids]
+        set_resume_items(state, section, repo, worker_items)
+
+def get_worker_state(run_state, repo, stream_ids = None):
+    """
+    Copy the bookmarks and the streams in flight and completed of the repository into the state of a worker, for all
+    the streams or only for the streams synced by the worker, without the bookmarks of the other repositories.
+    """
+    repo_state = {}
+    merge_bookmarks(repo_state, run_state, repo, stream_ids)
+    return copy.deepcopy(repo_state)
+
+class SerializedWriter:
+    """
+    Standard output shared by the repository and stream workers. Each message is written whole, and the state emitted
+    by a worker is merged into the state of the sync before it is written, so that every emitted state holds the latest
+    bookmarks of all the repositories and streams. The records only wait for the write of a message, while the states
+    are merged and written one at a time.
+    """
+    def __init__(self, output, state):
+        self.output = output
+        self.state = state
+        self.lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        # Repository, and the streams if only some streams of it, synced by the current worker thread
+        self.worker = threading.local()
+
+    def start_worker(self, repo, state, stream_ids = None):
+        """
+        Register what the current worker thread syncs and return a copy of the bookmarks of the repository, or of the
+        streams synced by the worker, for the worker.
+        """
+        self.worker.repo = repo
+        self.worker.stream_ids = stream_ids
+        with self.state_lock:
+            return get_worker_state(state, repo, stream_ids)
+
+    def write(self, text):
+        repo = getattr(self.worker, 'repo', None)
+        # Messages are written as one line each, with the type first.
+        if not repo or not text.startswith('{"type": "STATE"'):
+            with self.lock:
+                return self.output.write(text)
+
+        # The state of a worker only holds the bookmarks of its repository
+        worker_state = singer.parse_message(text).value
+        with self.state_lock:
+            merge_bookmarks(self.state, worker_state, repo, self.worker.stream_ids)
+            text = singer.format_message(singer.StateMessage(value=self.state)) + '\n'
+            with self.lock:
+                return self.output.write(text)
+
+    def flush(self):
+        with self.lock:
+            self.output.flush()
+
+def run_workers(max_workers, worker_args, writer):
+    """
+    Run the workers with the arguments in a pool of `max_workers` threads, and yield the arguments and the result
+    of each worker as it finishes. The messages of the workers are written through the serialized writer.
+    """
+    with contextlib.ExitStack() as stack:
+        if not isinstance(sys.stdout, SerializedWriter):
+            stack.enter_context(contextlib.redirect_stdout(writer))
+        executor = stack.enter_context(ThreadPoolExecutor(max_workers=max_workers))
+        futures = {executor.submit(*args): args for args in worker_args}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        except Exception:
+            # Do not start the workers which are not started yet
+            for future in futures:
+                future.cancel()
+            raise
+
+def log_not_accessible_streams(repo, not_accessible_streams):
+    """
+    Give warning messages for a repo that is not accessible by a stream or is invalid.
+    """
+    message = "Please check the repository name \'{}\' or you do not have sufficient permissions to access this repository for following streams {}.".format(repo, ", ".join(not_accessible_streams))
+    LOGGER.warning(message)
+
+def sync_repo(plan, config, start_date, writer, table_versions, repo):
+    """
+    Sync the streams of the repository in a worker thread, with its own client and a copy of its bookmarks.
+    Return the streams which were not accessible for the repository.
+    """
+    repo_client = GithubClient(config)
+    repo_state = writer.start_worker(repo, writer.state)
+    LOGGER.info("Starting sync of repository: %s", repo)
+    write_table_versions(repo_state, table_versions, plan.streams_to_sync_for_repos, repo)
+    try:
+        with RUN_DEADLINE.limit_repo_runtime(repo, config):
+            do_sync(plan, plan.streams_to_sync_for_repos, repo_client, start_date, repo_state, repo, writer)
+        write_last_completed(repo_state, repo)
+    except RepoDeadlineReached as exc:
+        LOGGER.warning(exc)
+    finally:
+        # Keep the bookmarks saved before the sync of the repository is stopped by a deadline
+        with writer.state_lock:
+            merge_bookmarks(writer.state, repo_state, repo)
+            if repo in repo_state.get("last_completed", {}):
+                writer.state.setdefault("last_completed", {})[repo] = repo_state["last_completed"][repo]
+    return repo_client.not_accessible_repos
+
+def sync_repos_in_parallel(plan, config, start_date, state, table_versions, repositories):
+    """
+    Sync the repositories with a pool of `max_parallel_repos` workers, writing the messages of all the workers
+    through a serialized writer. Return the streams which were not accessible for any repository.
+    """
+    not_accessible_streams = set()
+    writer = SerializedWriter(sys.stdout, state)
+    worker_args = [(sync_repo, plan, config, start_date, writer, table_versions, repo) for repo in repositories]
+    for args, repo_not_accessible_streams in run_workers(int(config['max_parallel_repos']), worker_args, writer):
+        if repo_not_accessible_streams:
+            log_not_accessible_streams(args[-1], repo_not_accessible_streams)
+            not_accessible_streams.update(repo_not_accessible_streams)
+
+    return not_accessible_streams
+
+def get_work_items(plan, repositories, organizations):
+    """
+    Get a work item for each stream synced on its own and each repository, or organization for the
+    organization streams.
+    """
+    work_items = []
+    for stream_id in sorted(plan.stream_trees):
+        keys = organizations if stream_id in plan.streams_to_sync_for_orgs else repositories
+        work_items += [(key, stream_id) for key in sorted(keys)]
+    return work_items
+
+def get_item_bookmarks(state, key, tree_streams):
+    """
+    Get the bookmarks of the streams of a work item.
+    """
+    return {stream_id: state['bookmarks'][stream_id][key] for stream_id in tree_streams
+            if key in state.get('bookmarks', {}).get(stream_id, {})}
+
+def sync_work_queue(plan, client, config, start_date, state, repositories, organizations):
+    """
+    Sync the work items claimed from the work queue shared with the other tap processes, until no item is left.
+    The sync of an item starts from the bookmarks committed in the queue by its last sync, and an item whose lease
+    is lost is abandoned.
+    """
+    if is_activate_version_enabled(config):
+        raise GithubException("Please disable activate_version to sync with work_queue_path, as the table versions of the processes would differ.")
+
+    work_queue = WorkQueue(config['work_queue_path'], float(config.get('work_queue_lease_seconds') or DEFAULT_LEASE_SECONDS))
+    work_queue.start_round()
+    work_queue.add_items(get_work_items(plan, repositories, organizations))
+    # The queue keeps the items done in the current pass, a claimed item is synced even if this process completed it before.
+    state.get("resume", {}).pop("completed", None)
+
+    for key, stream_id, item_bookmarks in iter(work_queue.claim, None):
+        LOGGER.info("Starting sync of %s stream of %s from the work queue.", stream_id, key)
+        for tree_stream_id, bookmark in item_bookmarks.items():
+            singer.write_bookmark(state, tree_stream_id, key, bookmark)
+
+        tree_streams = plan.stream_trees[stream_id]["streams"]
+        try:
+            with work_queue.heartbeat(key, stream_id):
+                state = sync_stream(plan, stream_id, client, start_date, state, key)
+        except RepoDeadlineReached as exc:
+            # The lease of the item was lost, the process which claimed it syncs the item from the committed bookmarks
+            LOGGER.warning(exc)
+            update_currently_syncing(state, None)
+            set_resume_items(state, "in_flight", key, set(get_resume_items(state, "in_flight", key)) - {stream_id})
+            continue
+        except DeadlineReached:
+            # The next process continues the item from the bookmarks saved before the deadline of the run
+            work_queue.release(key, stream_id, get_item_bookmarks(state, key, tree_streams))
+            raise
+        update_currently_syncing(state, None)
+        work_queue.complete(key, stream_id, get_item_bookmarks(state, key, tree_streams))
+
+        if client.not_accessible_repos:
+            log_not_accessible_streams(key, client.not_accessible_repos)
+            client.not_accessible_repos = set()
+
 def sync(client, config, state, catalog):
     """
     Sync selected streams.
     """
 
     start_date = config['start_date']
+    RUN_DEADLINE.start(config)
 
-    # Get selected streams, make sure stream dependencies are met
-    selected_stream_ids = get_selected_streams(catalog)
+    plan = SyncPlan(catalog, config)
+    LOGGER.info('Sync stream %s', plan.streams_to_sync)
 
-    streams_to_sync = get_stream_to_sync(catalog)
-    LOGGER.info('Sync stream %s', streams_to_sync)
-
-    repositories, organizations = client.extract_repos_from_config()
+    repositories, organizations = filter_shard(config, *client.extract_repos_from_config())
 
     state = translate_state(state, catalog, repositories)
+    table_versions = get_table_versions(config, plan.selected_stream_ids, state)
+    if table_versions:
+        state.setdefault("resume", {})["table_version"] = max(table_versions.values())
     singer.write_state(state)
 
-    # Sync `teams`, `team_members`and `team_memberships` streams just single time for any organization.
-    streams_to_sync_for_orgs = set(streams_to_sync).intersection(STREAM_TO_SYNC_FOR_ORGS)
-    # Loop through all organizations
-    if selected_stream_ids:
-        for orgs in organizations:
-            LOGGER.info("Starting sync of organization: %s", orgs)
-            do_sync(catalog, streams_to_sync_for_orgs, selected_stream_ids, client, start_date, state, orgs)
-
-        # Sync other streams for all repos
-        streams_to_sync_for_repos = set(streams_to_sync) - streams_to_sync_for_orgs
-        # pylint: disable=too-many-nested-blocks
-        # Sync repositories only if any streams are selected
-        for repo in get_ordered_repos(state, repositories):
-            update_currently_syncing_repo(state, repo)
-            LOGGER.info("Starting sync of repository: %s", repo)
-            do_sync(catalog, streams_to_sync_for_repos, selected_stream_ids, client, start_date, state, repo)
-
-            if client.not_accessible_repos:
-                # Give warning messages for a repo that is not accessible by a stream or is invalid.
-                message = "Please check the repository name \'{}\' or you do not have sufficient permissions to access this repository for following streams {}.".format(repo, ", ".join(client.not_accessible_repos))
-                LOGGER.warning(message)
-                client.not_accessible_repos = set()
-        update_currently_syncing_repo(state, None)
-
-def do_sync(catalog, streams_to_sync, selected_stream_ids, client, start_date, state, repo):
+    not_accessible_streams = set()
+    try:
+        if plan.selected_stream_ids and config.get('work_queue_path'):
+            sync_work_queue(plan, client, config, start_date, state, repositories, organizations)
+            end_resume_pass(state)
+            singer.write_state(state)
+        # Loop through all organizations
+        elif plan.selected_stream_ids:
+            for orgs in organizations:
+                LOGGER.info("Starting sync of organization: %s", orgs)
+                write_table_versions(state, table_versions, plan.streams_to_sync_for_orgs, orgs)
+                do_sync(plan, plan.streams_to_sync_for_orgs, client, start_date, state, orgs)
+                not_accessible_streams.update(client.not_accessible_repos)
+
+            # Sync other streams for all repos
+            repositories = get_ordered_repos(state, repositories)
+            if int(config.get('max_parallel_repos') or 1) > 1:
+                not_accessible_streams.update(sync_repos_in_parallel(plan, config, start_date, state, table_versions, repositories))
+            else:
+                for repo in repositories:
+                    update_currently_syncing_repo(state, repo)
+                    LOGGER.info("Starting sync of repository: %s", repo)
+                    write_table_versions(state, table_versions, plan.streams_to_sync_for_repos, repo)
+                    try:
+                        with RUN_DEADLINE.limit_repo_runtime(repo, config):
+                            do_sync(plan, plan.streams_to_sync_for_repos, client, start_date, state, repo)
+                        write_last_completed(state, repo)
+                    except RepoDeadlineReached as exc:
+                        # The next sync continues the repository first, as its last completed sync is the oldest.
+                        LOGGER.warning(exc)
+                        update_currently_syncing(state, None)
+
+                    if client.not_accessible_repos:
+                        log_not_accessible_streams(repo, client.not_accessible_repos)
+                        not_accessible_streams.update(client.not_accessible_repos)
+                        client.not_accessible_repos = set()
+            stopped_streams = get_stopped_streams(plan, state, repositories)
+            if stopped_streams.intersection(table_versions):
+                # The pass continues with the same table versions, so that the streams are activated once loaded for
+                # all the repositories.
+                LOGGER.warning("The table versions of %s are kept for the next sync, as the streams were not loaded for all repositories.",
+                               ", ".join(sorted(stopped_streams.intersection(table_versions))))
+            else:
+                end_resume_pass(state)
+            update_currently_syncing_repo(state, None)
+            activate_table_versions(table_versions, not_accessible_streams, stopped_streams)
+    except DeadlineReached as exc:
+        # The state keeps the repository and the stream being synced, and the page to continue from.
+        LOGGER.warning("%s The next sync resumes from the state.", exc)
+        singer.write_state(state)
+
+def do_sync(plan, streams_to_sync, client, start_date, state, repo, writer = None):
     """
     Sync all other streams except teams, team_members and team_memberships for each repo.
     """
+    if plan.max_parallel_streams > 1:
+        sync_streams_in_parallel(plan, streams_to_sync, client, start_date, state, repo, writer)
+        return
+
     currently_syncing = singer.get_currently_syncing(state)
     for stream_id in get_ordered_stream_list(currently_syncing, streams_to_sync):
-        stream_obj = STREAMS[stream_id]()
+        # If it is a "sub_stream", it will be synced as part of the parent stream unless it is detached from its parent
+        if stream_id in plan.stream_trees:
+            state = sync_stream(plan, stream_id, client, start_date, state, repo)
+        update_currently_syncing(state, None)
 
-        # If it is a "sub_stream", it will be synced as part of the parent stream
-        if stream_id in streams_to_sync and not stream_obj.parent:
-            write_schemas(stream_id, catalog, selected_stream_ids)
-            update_currently_syncing(state, stream_id)
+def sync_stream(plan, stream_id, client, start_date, state, repo):
+    """
+    Sync the stream, along with its child streams, for the repository.
+    """
+    if stream_id in get_resume_items(state, "completed", repo):
+        LOGGER.info("Skipping %s of %s, as it was completed by the interrupted sync.", stream_id, repo)
+        return state
 
+    stream_obj = STREAMS[stream_id]()
+    stream_tree = plan.stream_trees[stream_id]
+    stream_selected_ids = stream_tree["selected_stream_ids"]
+
+    write_schemas(stream_id, plan.catalog, stream_selected_ids)
+    update_currently_syncing(state, stream_id)
+    # Do not start the stream once the deadline of the run or of the repository is reached, the next sync starts with it.
+    RUN_DEADLINE.check(repo)
+    start_resume_item(state, repo, stream_id)
+
+    # The requests of the repositories synced the longest time ago are sent first, cheap incremental streams first.
+    request_class = FULL_TABLE_REQUESTS if stream_obj.replication_method == "FULL_TABLE" else INCREMENTAL_REQUESTS
+    bookmark = get_bookmark(state, repo, stream_id, "since", start_date)
+    staleness = singer.utils.strptime_to_utc(bookmark).timestamp() if bookmark else 0
+
+    with request_priority(request_class, staleness):
+        if can_backfill(stream_obj, client.config, state, repo, start_date):
+            state = sync_backfill(stream_obj, client, state, plan.catalog, repo, start_date, stream_selected_ids)
+        else:
             state = stream_obj.sync_endpoint(client = client,
                                               state = state,
-                                              catalog = catalog['streams'],
+                                              catalog = plan.catalog,
                                               repo_path = repo,
                                               start_date = start_date,
-                                              selected_stream_ids = selected_stream_ids,
-                                              stream_to_sync = streams_to_sync
+                                              selected_stream_ids = stream_selected_ids,
+                                              stream_to_sync = stream_tree["stream_to_sync"]
                                             )
 
-            singer.write_state(state)
-        update_currently_syncing(state, None)
+    complete_resume_item(state, repo, stream_id)
+    singer.write_state(state)
+    return state
+
+def sync_stream_worker(plan, stream_id, config, start_date, writer, state, repo):
+    """
+    Sync the stream of the repository in a worker thread, with its own client and a copy of its bookmarks, and merge
+    the bookmarks of the stream and its children into the state. Return the streams which were not accessible
+    for the repository.
+    """
+    stream_client = GithubClient(config)
+    tree_streams = plan.stream_trees[stream_id]["streams"]
+    stream_state = writer.start_worker(repo, state, tree_streams)
+    try:
+        stream_state = sync_stream(plan, stream_id, stream_client, start_date, stream_state, repo)
+        update_currently_syncing(stream_state, None)
+    finally:
+        # Keep the bookmarks saved before the sync of the stream is stopped by the deadline of the run
+        with writer.state_lock:
+            merge_bookmarks(state, stream_state, repo, tree_streams)
+    return stream_client.not_accessible_repos
+
+def sync_streams_in_parallel(plan, streams_to_sync, client, start_date, state, repo, writer = None):
+    """
+    Sync the top-level streams of the repository with a pool of `max_parallel_streams` workers. Each top-level stream
+    and its child streams have their own bookmarks, so the streams do not depend on each other.
+    """
+    writer = writer or SerializedWriter(sys.stdout, state)
+    # The streams in flight in the interrupted sync are continued first
+    in_flight = get_resume_items(state, "in_flight", repo)
+    worker_args = [(sync_stream_worker, plan, stream_id, client.config, start_date, writer, state, repo)
+                   for stream_id in sorted(streams_to_sync, key=lambda stream_id: (stream_id not in in_flight, stream_id))
+                   if stream_id in plan.stream_trees]
+    for _, not_accessible_streams in run_workers(plan.max_parallel_streams, worker_args, writer):
+        client.not_accessible_repos.update(not_accessible_streams)
@@ -0,0 +1,155 @@
+import contextlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import singer
+from tap_github.deadline import RUN_DEADLINE
+
+LOGGER = singer.get_logger()
+
+# Seconds a claimed work item stays leased without a heartbeat if `work_queue_lease_seconds` is not in the config.
+DEFAULT_LEASE_SECONDS = 300
+
+class WorkQueue:
+    """
+    Work items shared by the tap processes of a host in a SQLite file. A work item is a stream, along with its
+    child streams, of a repository or an organization. A process claims an item with a lease, which it renews
+    with heartbeats while syncing the item, and commits the bookmarks of the item once it is synced. An item whose
+    lease expired, as its process stopped, can be claimed by another process. The items are synced in rounds, each
+    started by the first process of a sync and finished once all its items are done.
+    """
+    def __init__(self, path, lease_seconds = DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+        # Time this process opened the queue, after which a finished round is over for it.
+        self.opened = time.time()
+        with self.connect() as connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS rounds (
+                                      round INTEGER PRIMARY KEY AUTOINCREMENT,
+                                      started REAL NOT NULL,
+                                      finished REAL)""")
+            connection.execute("""CREATE TABLE IF NOT EXISTS work_items (
+                                      key TEXT NOT NULL,
+                                      stream_id TEXT NOT NULL,
+                                      status TEXT NOT NULL DEFAULT 'pending',
+                                      lease_owner TEXT,
+                                      lease_expires REAL,
+                                      bookmarks TEXT,
+                                      PRIMARY KEY (key, stream_id))""")
+
+    @contextlib.contextmanager
+    def connect(self):
+        """
+        Open a connection in autocommit mode, used only by the current thread, and lock the database
+        for writing until the end of the block.
+        """
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    def start_round(self):
+        """
+        Join the current round, or start a new round in which all the items are pending again if the current round
+        finished before this process opened the queue. A process which started while the round was running, but
+        joins it after all its items are done, does not sync the items again. Return the number of the round.
+        """
+        with self.connect() as connection:
+            row = connection.execute("SELECT round, finished FROM rounds ORDER BY round DESC LIMIT 1").fetchone()
+            if row and (row[1] is None or row[1] >= self.opened):
+                return row[0]
+            connection.execute("UPDATE work_items SET status = 'pending', lease_owner = NULL, lease_expires = NULL")
+            cursor = connection.execute("INSERT INTO rounds (started) VALUES (?)", (time.time(),))
+        LOGGER.info("Started the round %s of the work queue.", cursor.lastrowid)
+        return cursor.lastrowid
+
+    def add_items(self, items):
+        """
+        Add the work items which are not in the queue yet, as pending in the current round.
+        """
+        with self.connect() as connection:
+            connection.executemany("INSERT OR IGNORE INTO work_items (key, stream_id) VALUES (?, ?)", items)
+
+    def claim(self):
+        """
+        Lease a pending work item, or an item whose lease expired, and return its key, stream and the bookmarks
+        committed by its last sync. Return None when there is no item left to claim.
+        """
+        now = time.time()
+        with self.connect() as connection:
+            row = connection.execute("""SELECT key, stream_id, bookmarks FROM work_items
+                                        WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                                        ORDER BY status = 'leased', rowid LIMIT 1""", (now,)).fetchone()
+            if not row:
+                return None
+            connection.execute("""UPDATE work_items SET status = 'leased', lease_owner = ?, lease_expires = ?
+                                  WHERE key = ? AND stream_id = ?""", (self.owner, now + self.lease_seconds, row[0], row[1]))
+        return row[0], row[1], json.loads(row[2] or '{}')
+
+    def renew(self, key, stream_id):
+        """
+        Extend the lease of the work item, and return False if the item is leased by another process.
+        """
+        with self.connect() as connection:
+            cursor = connection.execute("""UPDATE work_items SET lease_expires = ?
+                                           WHERE key = ? AND stream_id = ? AND status = 'leased' AND lease_owner = ?""",
+                                        (time.time() + self.lease_seconds, key, stream_id, self.owner))
+        return cursor.rowcount == 1
+
+    @contextlib.contextmanager
+    def heartbeat(self, key, stream_id):
+        """
+        Renew the lease of the work item in the background while the block is running. Once the lease is lost, as the
+        item was claimed by another process, the deadline of the key of the item is reached, so that its sync stops
+        at the next page and the item is abandoned.
+        """
+        stopped = threading.Event()
+
+        def renew_lease():
+            while not stopped.wait(self.lease_seconds / 3):
+                if not self.renew(key, stream_id):
+                    LOGGER.warning("The lease of %s stream of %s was taken by another process.", stream_id, key)
+                    RUN_DEADLINE.stop_repo(key, "the lease of its {} work item was taken by another process".format(stream_id))
+                    return
+
+        thread = threading.Thread(target=renew_lease, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+            RUN_DEADLINE.clear_repo(key)
+
+    def complete(self, key, stream_id, bookmarks):
+        """
+        Mark the work item as done with the bookmarks of its streams, if it is still leased by this process.
+        """
+        with self.connect() as connection:
+            cursor = connection.execute("""UPDATE work_items SET status = 'done', lease_owner = NULL, lease_expires = NULL, bookmarks = ?
+                                           WHERE key = ? AND stream_id = ? AND lease_owner = ?""",
+                                        (json.dumps(bookmarks), key, stream_id, self.owner))
+            # The round is finished once all its items are done
+            if not connection.execute("SELECT 1 FROM work_items WHERE status != 'done' LIMIT 1").fetchone():
+                connection.execute("UPDATE rounds SET finished = ? WHERE finished IS NULL", (time.time(),))
+        if cursor.rowcount != 1:
+            LOGGER.warning("The bookmarks of %s stream of %s are not committed as the item was taken by another process.", stream_id, key)
+
+    def release(self, key, stream_id, bookmarks):
+        """
+        Make the work item pending again with the bookmarks saved so far, if it is still leased by this process.
+        """
+        with self.connect() as connection:
+            connection.execute("""UPDATE work_items SET status = 'pending', lease_owner = NULL, lease_expires = NULL, bookmarks = ?
+                                  WHERE key = ? AND stream_id = ? AND lease_owner = ?""",
+                               (json.dumps(bookmarks), key, stream_id, self.owner))
@@ -139,8 +139,9 @@ class TestGithubBase(unittest.TestCase):
             },
             "releases": {
                 self.PRIMARY_KEYS: {"id"},
-                self.REPLICATION_METHOD: self.FULL,
-                self.OBEYS_START_DATE: False
+                self.REPLICATION_METHOD: self.INCREMENTAL,
+                self.BOOKMARK: {"created_at"},
+                self.OBEYS_START_DATE: True
             },
             "review_comments": {
                 self.PRIMARY_KEYS: {"id"},
@@ -156,8 +157,9 @@ class TestGithubBase(unittest.TestCase):
             },
             "stargazers": {
                 self.PRIMARY_KEYS: {"user_id"},
-                self.REPLICATION_METHOD: self.FULL,
-                self.OBEYS_START_DATE: False
+                self.REPLICATION_METHOD: self.INCREMENTAL,
+                self.BOOKMARK: {"starred_at"},
+                self.OBEYS_START_DATE: True
             },
             "team_members": {
                 self.PRIMARY_KEYS: {"id", "team_slug"},
@@ -72,19 +72,25 @@ KNOWN_MISSING_FIELDS = {
     },
     'collaborators': {
         'email',
-        'name'
+        'name',
+        '_sdc_deleted_at'
     },
     'reviews': {
         'body_text',
         'body_html'
     },
     'teams': {
-        'permissions'
+        'permissions',
+        '_sdc_deleted_at'
     },
     'assignees': {
         'email',
         'starred_at',
-        'name'
+        'name',
+        '_sdc_deleted_at'
+    },
+    'issue_labels': {
+        '_sdc_deleted_at'
     },
     'pull_requests': {
         'issues_url'
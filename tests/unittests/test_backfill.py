@@ -0,0 +1,180 @@
+import unittest
+from unittest import mock
+import singer
+from tap_github.backfill import get_backfill_windows, can_backfill, fetch_window, sync_backfill
+from tap_github.streams import Commits, Issues, Events
+from tap_github.deadline import RUN_DEADLINE, DeadlineReached
+
+
+class MockResponse():
+    """Mock response object class."""
+    def __init__(self, json_data):
+        self.json_data = json_data
+
+    def json(self):
+        return self.json_data
+
+
+class TestGetBackfillWindows(unittest.TestCase):
+    """
+    Test `get_backfill_windows` function
+    """
+
+    def test_windows(self):
+        """Verify the range is split into windows and the last window ends at the end of the range"""
+        windows = get_backfill_windows("2022-01-01T00:00:00Z", "2022-01-25T00:00:00Z", 10)
+
+        self.assertEqual(windows, [["2022-01-01T00:00:00Z", "2022-01-11T00:00:00Z"],
+                                   ["2022-01-11T00:00:00Z", "2022-01-21T00:00:00Z"],
+                                   ["2022-01-21T00:00:00Z", "2022-01-25T00:00:00Z"]])
+
+
+class TestCanBackfill(unittest.TestCase):
+    """
+    Test `can_backfill` function
+    """
+
+    def test_backfill_disabled(self):
+        """Verify the stream is not backfilled if `backfill_window_days` is not in the config"""
+        self.assertFalse(can_backfill(Commits(), {}, {}, "org/repo", "2020-01-01T00:00:00Z"))
+
+    def test_stream_without_backfill_path(self):
+        """Verify the stream is not backfilled if the stream can not be filtered by a time window"""
+        self.assertFalse(can_backfill(Events(), {"backfill_window_days": 30}, {}, "org/repo", "2020-01-01T00:00:00Z"))
+
+    def test_recent_bookmark(self):
+        """Verify the stream is not backfilled if the bookmark is within one window"""
+        state = {"bookmarks": {"issues": {"org/repo": {"since": singer.utils.strftime(singer.utils.now())}}}}
+        self.assertFalse(can_backfill(Issues(), {"backfill_window_days": 30}, state, "org/repo", "2020-01-01T00:00:00Z"))
+
+    def test_old_bookmark(self):
+        """Verify the stream is backfilled if the bookmark is older than one window"""
+        self.assertTrue(can_backfill(Issues(), {"backfill_window_days": 30}, {}, "org/repo", "2020-01-01T00:00:00Z"))
+
+
+@mock.patch("singer.write_state")
+@mock.patch("singer.write_record")
+@mock.patch("tap_github.backfill.get_schema", return_value = {"schema": {}, "metadata": {}})
+class TestSyncBackfill(unittest.TestCase):
+    """
+    Test `sync_backfill` function
+    """
+
+    def get_client(self, pages_by_window_start, max_workers = 2):
+        """Return a client returning the pages of the window from its `since` parameter"""
+        client = mock.Mock(config = {"backfill_window_days": 10, "backfill_max_workers": max_workers}, base_url = "https://api.github.com")
+        client.authed_get_all_pages.side_effect = lambda source, url, headers, stream: pages_by_window_start[url.split("since=")[1][:20]]
+        return client
+
+    def test_bookmark_after_all_windows(self, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify the records of all the windows are written and the bookmark is the end of the range"""
+        client = self.get_client({
+            "2022-01-01T00:00:00Z": [MockResponse([{"id": 1, "updated_at": "2022-01-02T00:00:00Z"},
+                                                   {"id": 2, "updated_at": "2022-01-12T00:00:00Z"}])],
+            "2022-01-11T00:00:00Z": [MockResponse([{"id": 2, "updated_at": "2022-01-12T00:00:00Z"}])],
+            "2022-01-21T00:00:00Z": [MockResponse([])],
+        })
+        state = {"bookmarks": {"issues": {"org/repo": {"since": "2022-01-01T00:00:00Z",
+                                                       "backfill": {"until": "2022-01-25T00:00:00Z", "finished_windows": []}}}}}
+
+        sync_backfill(Issues(), client, state, [], "org/repo", "2020-01-01T00:00:00Z", ["issues"])
+
+        # Verify every record is written once, by the window it belongs to
+        self.assertEqual(mock_write_record.call_count, 2)
+        self.assertEqual(state["bookmarks"]["issues"]["org/repo"], {"since": "2022-01-25T00:00:00Z"})
+
+    def test_resume_finished_windows(self, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify the finished windows are not fetched again and a failed window keeps the bookmark at its start"""
+        client = self.get_client({
+            "2022-01-01T00:00:00Z": [MockResponse([{"id": 1, "updated_at": "2022-01-02T00:00:00Z"}])],
+        }, max_workers = 1)
+        state = {"bookmarks": {"issues": {"org/repo": {"since": "2022-01-01T00:00:00Z",
+                                                       "backfill": {"until": "2022-01-25T00:00:00Z",
+                                                                    "finished_windows": [["2022-01-21T00:00:00Z", "2022-01-25T00:00:00Z"]]}}}}}
+
+        with self.assertRaises(KeyError):
+            sync_backfill(Issues(), client, state, [], "org/repo", "2020-01-01T00:00:00Z", ["issues"])
+
+        # Verify the bookmark advanced past the first window only
+        self.assertEqual(state["bookmarks"]["issues"]["org/repo"]["since"], "2022-01-11T00:00:00Z")
+        self.assertEqual(state["bookmarks"]["issues"]["org/repo"]["backfill"]["finished_windows"],
+                         [["2022-01-21T00:00:00Z", "2022-01-25T00:00:00Z"]])
+        self.assertEqual(client.authed_get_all_pages.call_count, 2)
+
+    def test_stop_at_deadline(self, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify the backfill stops once the deadline is reached, with the state of the windows written"""
+        def reach_deadline():
+            RUN_DEADLINE.stop_repo("org/repo", "max_repo_runtime_seconds is reached")
+            yield MockResponse([{"id": 2, "updated_at": "2022-01-12T00:00:00Z"}])
+
+        client = self.get_client({
+            "2022-01-01T00:00:00Z": [MockResponse([{"id": 1, "updated_at": "2022-01-02T00:00:00Z"}])],
+            "2022-01-11T00:00:00Z": reach_deadline(),
+        }, max_workers = 1)
+        state = {"bookmarks": {"issues": {"org/repo": {"since": "2022-01-01T00:00:00Z",
+                                                       "backfill": {"until": "2022-01-25T00:00:00Z", "finished_windows": []}}}}}
+
+        try:
+            with self.assertRaises(DeadlineReached):
+                sync_backfill(Issues(), client, state, [], "org/repo", "2020-01-01T00:00:00Z", ["issues"])
+        finally:
+            RUN_DEADLINE.clear_repo("org/repo")
+
+        # Verify the next window is not fetched and the next sync continues after the first window
+        self.assertEqual(client.authed_get_all_pages.call_count, 2)
+        self.assertEqual(state["bookmarks"]["issues"]["org/repo"],
+                         {"since": "2022-01-11T00:00:00Z", "backfill": {"until": "2022-01-25T00:00:00Z", "finished_windows": []}})
+        self.assertEqual(mock_write_state.call_args[0][0], state)
+
+    def test_windows_written_in_order(self, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify the records are written in the order of the windows and each state advances the bookmark"""
+        client = self.get_client({
+            "2022-01-01T00:00:00Z": [MockResponse([{"id": 1, "updated_at": "2022-01-02T00:00:00Z"}]),
+                                     MockResponse([{"id": 2, "updated_at": "2022-01-03T00:00:00Z"}])],
+            "2022-01-11T00:00:00Z": [MockResponse([{"id": 3, "updated_at": "2022-01-12T00:00:00Z"}])],
+            "2022-01-21T00:00:00Z": [MockResponse([{"id": 4, "updated_at": "2022-01-22T00:00:00Z"}])],
+        }, max_workers = 3)
+        state = {"bookmarks": {"issues": {"org/repo": {"since": "2022-01-01T00:00:00Z",
+                                                       "backfill": {"until": "2022-01-25T00:00:00Z", "finished_windows": []}}}}}
+
+        sync_backfill(Issues(), client, state, [], "org/repo", "2020-01-01T00:00:00Z", ["issues"])
+
+        self.assertEqual([mock_call[0][1]["id"] for mock_call in mock_write_record.call_args_list], [1, 2, 3, 4])
+        self.assertEqual(mock_write_state.call_count, 3)
+        self.assertEqual(state["bookmarks"]["issues"]["org/repo"], {"since": "2022-01-25T00:00:00Z"})
+
+
+class TestFetchWindow(unittest.TestCase):
+    """
+    Test `fetch_window` function
+    """
+    window = ["2022-01-01T00:00:00Z", "2022-01-11T00:00:00Z"]
+
+    def get_client(self, pages):
+        """Return a client returning the pages"""
+        client = mock.Mock(base_url = "https://api.github.com")
+        client.authed_get_all_pages.return_value = iter(pages)
+        return client
+
+    def test_ascending_stops_past_window(self):
+        """Verify the pages of an ascending endpoint are read till the first page past the window"""
+        pages = [MockResponse([{"id": 1, "updated_at": "2022-01-02T00:00:00Z"}]),
+                 MockResponse([{"id": 2, "updated_at": "2022-01-10T00:00:00Z"}, {"id": 3, "updated_at": "2022-01-12T00:00:00Z"}]),
+                 MockResponse([{"id": 4, "updated_at": "2022-01-13T00:00:00Z"}])]
+        client = self.get_client(pages)
+
+        window_pages = list(fetch_window(client, Issues(), "org/repo", self.window))
+
+        self.assertEqual([[record["id"] for record, _ in page_records] for page_records in window_pages], [[1], [2]])
+        self.assertEqual(next(client.authed_get_all_pages.return_value), pages[2])
+
+    def test_commits_bounded_by_until(self):
+        """Verify the window of commits is requested with `until` and all its pages are read"""
+        pages = [MockResponse([{"sha": "b", "commit": {"committer": {"date": "2022-01-12T00:00:00Z"}}}]),
+                 MockResponse([{"sha": "a", "commit": {"committer": {"date": "2022-01-02T00:00:00Z"}}}])]
+        client = self.get_client(pages)
+
+        window_pages = list(fetch_window(client, Commits(), "org/repo", self.window))
+
+        self.assertEqual([[record["sha"] for record, _ in page_records] for page_records in window_pages], [[], ["a"]])
+        self.assertIn("until=2022-01-11T00:00:00Z", client.authed_get_all_pages.call_args[0][1])
@@ -70,6 +70,25 @@ class TestGetOrderedRepos(unittest.TestCase):
         # Verify with expected ordered list of repos
         self.assertEqual(final_repo_list, self.repo_list)
 
+    def test_stale_repos_first(self):
+        """Test the repositories whose last completed sync is the oldest come first, after the repository of the interrupted sync."""
+        state = {"currently_syncing_repo": "org/repo3",
+                 "last_completed": {"org/repo1": "2022-01-03T00:00:00.000000Z", "org/repo2": "2022-01-01T00:00:00.000000Z",
+                                    "org/repo4": "2022-01-02T00:00:00.000000Z", "org/repo5": "2022-01-04T00:00:00.000000Z"}}
+        expected_list = ["org/repo3", "org/repo2", "org/repo4", "org/repo1", "org/repo5"]
+        final_repo_list = get_ordered_repos(state, self.repo_list)
+
+        # Verify with expected ordered list of repos
+        self.assertEqual(final_repo_list, expected_list)
+
+    def test_never_completed_repos_first(self):
+        """Test the repositories never completed come first, in the order of the config."""
+        state = {"last_completed": {"org/repo1": "2022-01-01T00:00:00.000000Z", "org/repo3": "2022-01-01T00:00:00.000000Z"}}
+        final_repo_list = get_ordered_repos(state, self.repo_list)
+
+        # Verify with expected ordered list of repos
+        self.assertEqual(final_repo_list, ["org/repo2", "org/repo4", "org/repo5", "org/repo1", "org/repo3"])
+
 @mock.patch("tap_github.sync.update_currently_syncing")
 class TestUpdateCurrentlySyncingRepo(unittest.TestCase):
 
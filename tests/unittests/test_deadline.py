@@ -0,0 +1,199 @@
+import io
+import json
+import os
+import signal
+import time
+import unittest
+from unittest import mock
+import singer
+from tap_github.deadline import Deadline, DeadlineReached, RUN_DEADLINE, stop_on_signals
+from tap_github.sync import sync
+
+def get_stream_catalog(stream_name, is_selected = False):
+    """Return catalog for stream"""
+    return {
+        "schema": {},
+        "tap_stream_id": stream_name,
+        "metadata": [{"breadcrumb": [], "metadata": {"selected": is_selected}}],
+        "key_properties": []
+    }
+
+class TestDeadline(unittest.TestCase):
+    """
+    Test the deadline of the run computed from the config.
+    """
+
+    @mock.patch("time.monotonic", return_value = 1000)
+    def test_stop_time(self, mock_monotonic):
+        """Verify the run stops starting new work a part of `max_runtime_seconds` before its end"""
+        deadline = Deadline()
+        deadline.start({"max_runtime_seconds": "600"})
+        self.assertEqual(deadline.stop_time, 1540)
+
+        deadline.start({"max_runtime_seconds": 600, "runtime_grace_seconds": 120})
+        self.assertEqual(deadline.stop_time, 1480)
+
+        mock_monotonic.return_value = 1480
+        self.assertTrue(deadline.is_reached())
+
+    def test_no_deadline(self):
+        """Verify the deadline is never reached without `max_runtime_seconds`"""
+        deadline = Deadline()
+        deadline.start({})
+        self.assertFalse(deadline.is_reached())
+
+
+def sync_endpoint_until_deadline(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync):
+    """Write the bookmark of the repository and reach the deadline of the run"""
+    singer.write_bookmark(state, "commits", repo_path, {"since": "2022-01-01T00:00:00Z"})
+    RUN_DEADLINE.stop_time = 0
+    return state
+
+
+@mock.patch("tap_github.streams.IncrementalStream.sync_endpoint", side_effect = sync_endpoint_until_deadline)
+class TestSyncUntilDeadline(unittest.TestCase):
+    """
+    Test the sync stopped at the deadline of the run.
+    """
+    catalog = {"streams": [get_stream_catalog("commits", True), get_stream_catalog("events", True)]}
+    config = {"start_date": "2021-01-01T00:00:00Z", "max_runtime_seconds": 3600}
+
+    def tearDown(self):
+        RUN_DEADLINE.start({})
+
+    def test_resumable_state(self, mock_sync_endpoint):
+        """Verify no stream is started after the deadline, and the final state keeps where the next sync resumes"""
+        client = mock.Mock(config = self.config, not_accessible_repos = set())
+        client.extract_repos_from_config.return_value = (["org/repo1", "org/repo2"], {"org"})
+
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout:
+            sync(client, self.config, {}, self.catalog)
+
+        self.assertEqual(mock_sync_endpoint.call_count, 1)
+        last_message = json.loads(mock_stdout.getvalue().splitlines()[-1])
+        self.assertEqual(last_message["type"], "STATE")
+        self.assertEqual(last_message["value"]["currently_syncing_repo"], "org/repo1")
+        self.assertEqual(last_message["value"]["currently_syncing"], "events")
+        self.assertEqual(last_message["value"]["bookmarks"]["commits"], {"org/repo1": {"since": "2022-01-01T00:00:00Z"}})
+
+
+def sync_endpoint_until_repo_deadline(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync):
+    """Write the bookmark of the repository and reach the deadline of the first repository"""
+    singer.write_bookmark(state, "commits", repo_path, {"since": "2022-01-01T00:00:00Z"})
+    if repo_path == "org/repo1":
+        RUN_DEADLINE.repo_stop_times[repo_path] = 0
+    return state
+
+
+@mock.patch("tap_github.streams.IncrementalStream.sync_endpoint", side_effect = sync_endpoint_until_repo_deadline)
+class TestRepoRuntimeLimit(unittest.TestCase):
+    """
+    Test the sync of a repository stopped after `max_repo_runtime_seconds`.
+    """
+    catalog = {"streams": [get_stream_catalog("commits", True), get_stream_catalog("events", True)]}
+    config = {"start_date": "2021-01-01T00:00:00Z", "max_repo_runtime_seconds": 3600}
+
+    def test_next_repo_synced(self, mock_sync_endpoint):
+        """Verify the sync continues with the next repository, and only the completed repository is marked completed"""
+        client = mock.Mock(config = self.config, not_accessible_repos = set())
+        client.extract_repos_from_config.return_value = (["org/repo1", "org/repo2"], {"org"})
+
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout:
+            sync(client, self.config, {}, self.catalog)
+
+        synced = [(call[1]["repo_path"]) for call in mock_sync_endpoint.call_args_list]
+        self.assertEqual(synced, ["org/repo1", "org/repo2", "org/repo2"])
+
+        last_state = json.loads(mock_stdout.getvalue().splitlines()[-1])["value"]
+        self.assertEqual(list(last_state["last_completed"]), ["org/repo2"])
+        self.assertNotIn("currently_syncing", last_state)
+        self.assertNotIn("currently_syncing_repo", last_state)
+
+
+class TestStopOnSignals(unittest.TestCase):
+    """
+    Test the run stopped by SIGTERM or SIGINT.
+    """
+
+    def tearDown(self):
+        RUN_DEADLINE.start({})
+
+    def test_deadline_reached(self):
+        """Verify the deadline of the run is reached on SIGTERM, and the previous handler is restored after the block"""
+        previous_handler = signal.getsignal(signal.SIGTERM)
+        on_stop = mock.Mock()
+        with stop_on_signals({}, on_stop):
+            self.assertFalse(RUN_DEADLINE.is_reached())
+            os.kill(os.getpid(), signal.SIGTERM)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+            self.assertTrue(RUN_DEADLINE.is_reached())
+            with self.assertRaisesRegex(DeadlineReached, "SIGTERM is received"):
+                RUN_DEADLINE.check()
+
+        # Verify the signal is passed on only once
+        on_stop.assert_called_once_with(signal.SIGTERM)
+        self.assertEqual(signal.getsignal(signal.SIGTERM), previous_handler)
+
+    @mock.patch("tap_github.deadline.os._exit")
+    def test_exit_after_grace(self, mock_exit):
+        """Verify the process exits if the run did not stop within `shutdown_grace_seconds`"""
+        with stop_on_signals({"shutdown_grace_seconds": 0.01}):
+            os.kill(os.getpid(), signal.SIGINT)
+            time.sleep(0.5)
+
+        mock_exit.assert_called_once_with(1)
+
+    @mock.patch("tap_github.deadline.os._exit")
+    def test_exit_after_grace_margin(self, mock_exit):
+        """Verify the process waits for the grace margin, and ends its workers before it exits"""
+        on_exit = mock.Mock()
+        with stop_on_signals({"shutdown_grace_seconds": 0.01}, on_exit = on_exit, grace_margin_seconds = 0.3):
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(0.1)
+            self.assertFalse(mock_exit.called)
+            time.sleep(0.6)
+
+        on_exit.assert_called_once_with()
+        mock_exit.assert_called_once_with(1)
+
+    @mock.patch("tap_github.deadline.os._exit")
+    def test_no_exit_once_stopped(self, mock_exit):
+        """Verify the process does not exit once the run stopped within `shutdown_grace_seconds`"""
+        with stop_on_signals({"shutdown_grace_seconds": 0.1}):
+            os.kill(os.getpid(), signal.SIGINT)
+        time.sleep(0.3)
+
+        self.assertFalse(mock_exit.called)
+
+
+def sync_endpoint_until_signal(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync):
+    """Write the bookmark of the repository and receive SIGTERM"""
+    singer.write_bookmark(state, "commits", repo_path, {"since": "2022-01-01T00:00:00Z"})
+    os.kill(os.getpid(), signal.SIGTERM)
+    return state
+
+
+@mock.patch("tap_github.streams.IncrementalStream.sync_endpoint", side_effect = sync_endpoint_until_signal)
+class TestSyncUntilSignal(unittest.TestCase):
+    """
+    Test the sync stopped by SIGTERM.
+    """
+    catalog = {"streams": [get_stream_catalog("commits", True), get_stream_catalog("events", True)]}
+    config = {"start_date": "2021-01-01T00:00:00Z"}
+
+    def tearDown(self):
+        RUN_DEADLINE.start({})
+
+    def test_resumable_state(self, mock_sync_endpoint):
+        """Verify no stream is started after the signal, and the final state keeps where the next sync resumes"""
+        client = mock.Mock(config = self.config, not_accessible_repos = set())
+        client.extract_repos_from_config.return_value = (["org/repo1", "org/repo2"], set())
+
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout, stop_on_signals(self.config):
+            sync(client, self.config, {}, self.catalog)
+
+        self.assertEqual(mock_sync_endpoint.call_count, 1)
+        last_state = json.loads(mock_stdout.getvalue().splitlines()[-1])["value"]
+        self.assertEqual(last_state["bookmarks"]["commits"], {"org/repo1": {"since": "2022-01-01T00:00:00Z"}})
+        self.assertEqual(last_state["resume"], {"completed": {"org/repo1": ["commits"]}})
@@ -1,5 +1,5 @@
 import unittest
-from tap_github.sync import get_selected_streams, translate_state, get_stream_to_sync
+from tap_github.sync import get_selected_streams, translate_state, get_stream_to_sync, get_detached_streams
 from parameterized import parameterized
 
 def get_stream_catalog(stream_name, selected_in_metadata = False):
@@ -145,6 +145,21 @@ class TestTranslateState(unittest.TestCase):
         final_state = translate_state(older_format_state, self.catalog, ["org/test-repo3", "org/test-repo4"])
         self.assertEqual(expected_state, dict(final_state))
 
+    def test_currently_syncing_migrated_in_flight(self):
+        """Verify that `translate_state` migrates the stream and the repository of an interrupted sync into the items in flight"""
+        state = {"currently_syncing_repo": "org/test-repo", "currently_syncing": "comments"}
+
+        final_state = translate_state(state, self.catalog, ["org/test-repo", "org/test-repo2"])
+        self.assertEqual(final_state["resume"], {"in_flight": {"org/test-repo": ["comments"]}})
+
+    def test_resume_state_not_migrated(self):
+        """Verify that `translate_state` keeps the items in flight of a newer format state"""
+        state = {"currently_syncing_repo": "org/test-repo", "currently_syncing": "comments",
+                 "resume": {"in_flight": {"org/test-repo": ["comments", "releases"], "org/test-repo2": ["comments"]}}}
+
+        final_state = translate_state(state, self.catalog, ["org/test-repo", "org/test-repo2"])
+        self.assertEqual(final_state["resume"], state["resume"])
+
 class TestGetStreamsToSync(unittest.TestCase):
     """
     Testcase for `get_stream_to_sync` in sync
@@ -171,3 +186,15 @@ class TestGetStreamsToSync(unittest.TestCase):
         sync_streams = get_stream_to_sync(catalog)
         
         self.assertEqual(sync_streams, expected_streams)
+
+    def test_detached_child_selected(self):
+        """Test that the parent of a detached child stream is not synced if only the child is selected"""
+        catalog = {
+            "streams": [
+                get_stream_catalog("pull_requests"),
+                get_stream_catalog("review_comments", selected_in_metadata=True),
+            ]
+        }
+
+        self.assertEqual(get_stream_to_sync(catalog), ["pull_requests", "review_comments"])
+        self.assertEqual(get_stream_to_sync(catalog, get_detached_streams({"review_comments_sync_mode": "repository"})), ["review_comments"])
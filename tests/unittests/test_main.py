@@ -1,3 +1,6 @@
+import io
+import json
+import sys
 import unittest
 from unittest import mock
 from tap_github import main
@@ -81,6 +84,30 @@ class TestSyncMode(unittest.TestCase):
         # Verify `_sync` is called with expected arguments
         mock_sync.assert_called_with("mock_client", self.mock_config, mock_state, self.mock_catalog)
 
+@mock.patch("tap_github.GithubClient")
+@mock.patch("singer.utils.parse_args")
+@mock.patch("tap_github._sync")
+class TestPlanMode(unittest.TestCase):
+    """
+    Test main function with the `--plan` flag
+    """
+
+    mock_config = {"start_date": "", "access_token": ""}
+    mock_catalog = {"streams": [{"tap_stream_id": "commits", "schema": {}, "metadata": [{"breadcrumb": [], "metadata": {"selected": True}}]}]}
+
+    @mock.patch("sys.stdout", new_callable = io.StringIO)
+    @mock.patch("sys.argv", ["tap-github", "--config", "config.json", "--plan"])
+    def test_print_plan(self, mock_stdout, mock_sync, mock_args, mock_client):
+        """Verify that the plan is printed and the streams are not synced"""
+        mock_args.return_value = MockArgs(config=self.mock_config, properties=self.mock_catalog)
+        main()
+
+        self.assertFalse(mock_sync.called)
+        self.assertEqual(json.loads(mock_stdout.getvalue())["repository_streams"], ["commits"])
+
+        # Verify the Singer arguments are parsed without the `--plan` flag
+        self.assertEqual(sys.argv, ["tap-github", "--config", "config.json"])
+
 @mock.patch("tap_github.GithubClient")
 class TestDiscover(unittest.TestCase):
     """Test `discover` function."""
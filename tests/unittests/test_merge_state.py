@@ -0,0 +1,52 @@
+import unittest
+from tap_github.merge_state import merge_shard_states
+from tap_github.sync import get_key_shard
+
+class TestMergeShardStates(unittest.TestCase):
+    """
+    Test the merge of the states of the shards.
+    """
+    repositories = ["org/repo{}".format(index) for index in range(10)]
+
+    def get_shard_state(self, shard_index, since):
+        """Return the state of a shard with its own repositories synced until `since`"""
+        bookmarks = {}
+        for repo in self.repositories:
+            synced = get_key_shard(repo, 2) == shard_index
+            bookmarks[repo] = {"since": since if synced else "2020-01-01T00:00:00Z"}
+        return {"bookmarks": {"commits": bookmarks, "teams": {"org": {"since": since}}}, "currently_syncing_repo": "org/repo0"}
+
+    def test_bookmarks_of_owner_shard(self):
+        """Verify the bookmarks of each repository are taken from the shard syncing it"""
+        states = [self.get_shard_state(0, "2022-01-01T00:00:00Z"), self.get_shard_state(1, "2023-01-01T00:00:00Z")]
+        merged_state = merge_shard_states(states)
+
+        for repo in self.repositories:
+            expected_since = "2022-01-01T00:00:00Z" if get_key_shard(repo, 2) == 0 else "2023-01-01T00:00:00Z"
+            self.assertEqual(merged_state["bookmarks"]["commits"][repo], {"since": expected_since})
+
+        # Verify the organizations are owned by the first shard
+        self.assertEqual(merged_state["bookmarks"]["teams"]["org"], {"since": "2022-01-01T00:00:00Z"})
+        # Verify the shard specific keys are not kept
+        self.assertNotIn("currently_syncing_repo", merged_state)
+
+    def test_bookmarks_without_owner(self):
+        """Verify the bookmarks of a repository not synced by its shard are kept"""
+        states = [{"bookmarks": {"commits": {"org/removed-repo": {"since": "2021-01-01T00:00:00Z"}}}}, {}]
+        self.assertEqual(merge_shard_states(states), states[0])
+
+    def test_latest_completed_time(self):
+        """Verify the latest time at which each repository was completed is kept"""
+        states = [{"last_completed": {"org/repo1": "2022-01-02T00:00:00.000000Z", "org/repo2": "2022-01-01T00:00:00.000000Z"}},
+                  {"last_completed": {"org/repo1": "2022-01-01T00:00:00.000000Z", "org/repo2": "2022-01-03T00:00:00.000000Z"}}]
+
+        self.assertEqual(merge_shard_states(states)["last_completed"],
+                         {"org/repo1": "2022-01-02T00:00:00.000000Z", "org/repo2": "2022-01-03T00:00:00.000000Z"})
+
+    def test_streams_in_flight_of_owner_shard(self):
+        """Verify the streams in flight of each repository are taken from the shard syncing it, and the completed streams are not kept"""
+        repo0, repo1 = [next(repo for repo in self.repositories if get_key_shard(repo, 2) == index) for index in range(2)]
+        states = [{"resume": {"in_flight": {repo0: ["commits"], repo1: ["events"]}, "completed": {repo0: ["events"]}, "table_version": 1}},
+                  {"resume": {"in_flight": {repo1: ["commits"]}, "table_version": 2}}]
+
+        self.assertEqual(merge_shard_states(states)["resume"], {"in_flight": {repo0: ["commits"], repo1: ["commits"]}})
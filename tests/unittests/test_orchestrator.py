@@ -0,0 +1,196 @@
+import io
+import json
+import signal
+import sys
+import unittest
+from unittest import mock
+from tap_github.orchestrator import split_repositories, get_worker_catalog, get_org_repos, get_workers, orchestrate, SingerMultiplexer, Worker
+from tap_github.sync import SyncPlan
+
+# Fake tap writing a schema, a record, a state and a table version for each repository of its config
+FAKE_TAP = """
+import json, sys
+config = json.load(open(sys.argv[sys.argv.index('--config') + 1]))
+state = json.load(open(sys.argv[sys.argv.index('--state') + 1]))
+for repo in config['repository'].split(' '):
+    print(json.dumps({"type": "SCHEMA", "stream": "commits", "schema": {}, "key_properties": ["sha"]}))
+    print(json.dumps({"type": "RECORD", "stream": "commits", "record": {"sha": repo}, "version": config['table_version']}))
+    state.setdefault('bookmarks', {}).setdefault('commits', {})[repo] = {"since": "2022-01-01T00:00:00Z"}
+    print(json.dumps({"type": "STATE", "value": state}))
+print(json.dumps({"type": "ACTIVATE_VERSION", "stream": "commits", "version": config['table_version']}))
+sys.exit(config.get('exit_code', 0))
+"""
+
+def get_stream_catalog(stream_name, selected = False):
+    """Return catalog for stream"""
+    return {
+        "schema": {},
+        "tap_stream_id": stream_name,
+        "metadata": [{"breadcrumb": [], "metadata": {"selected": selected}}],
+        "key_properties": []
+    }
+
+
+class TestWorkers(unittest.TestCase):
+    """
+    Test the split of the repositories and the organization streams across the workers.
+    """
+    catalog = {"streams": [get_stream_catalog("commits", True), get_stream_catalog("teams", True), get_stream_catalog("events")]}
+    repositories = ["org1/repo1", "org1/repo2", "org2/repo1", "org2/repo2", "org2/repo3"]
+
+    def test_split_repositories(self):
+        """Verify the repositories are split into subsets of about the same size"""
+        self.assertEqual(split_repositories(self.repositories, 2), [["org1/repo1", "org2/repo1", "org2/repo3"], ["org1/repo2", "org2/repo2"]])
+        # Verify no worker is left without repositories
+        self.assertEqual(len(split_repositories(self.repositories, 8)), 5)
+
+    def test_worker_catalog(self):
+        """Verify only the streams of the worker are left selected"""
+        worker_catalog = get_worker_catalog(self.catalog, {"commits"})
+
+        self.assertEqual(SyncPlan(worker_catalog, {}).selected_stream_ids, ["commits"])
+        # Verify the catalog is not changed
+        self.assertEqual(SyncPlan(self.catalog, {}).selected_stream_ids, ["commits", "teams"])
+
+    def test_organization_worker(self):
+        """Verify the organization streams are synced by one worker with a repository of each organization"""
+        org_repos = get_org_repos(self.repositories, {"org1", "org2"})
+        workers = get_workers(SyncPlan(self.catalog, {}), {"repository": "org1/*"}, self.catalog, self.repositories, org_repos, 2)
+
+        self.assertEqual([worker.name for worker in workers], ["repos-0", "repos-1", "orgs"])
+        self.assertEqual(workers[0].config["repository"], "org1/repo1 org2/repo1 org2/repo3")
+        self.assertEqual(workers[2].config["repository"], "org1/repo1 org2/repo1")
+        self.assertEqual(workers[2].bookmark_keys, ["org1", "org2"])
+        self.assertEqual(workers[2].stream_ids, {"teams"})
+
+
+class TestWorker(unittest.TestCase):
+    """
+    Test the signals passed on to a worker process.
+    """
+
+    def get_worker(self, returncode):
+        """Return a worker whose process ended with the return code, or is still running if None"""
+        worker = Worker("repos-0", {}, {"streams": []}, ["commits"], ["org/repo1"])
+        worker.process = mock.Mock()
+        worker.process.poll.return_value = returncode
+        return worker
+
+    def test_running_worker_stopped(self):
+        """Verify the signal is passed on to a running worker"""
+        worker = self.get_worker(None)
+        worker.stop(signal.SIGTERM)
+        worker.process.send_signal.assert_called_once_with(signal.SIGTERM)
+
+    def test_ended_worker_not_stopped(self):
+        """Verify no signal is sent to a worker which already ended"""
+        worker = self.get_worker(0)
+        worker.stop(signal.SIGTERM)
+        self.assertFalse(worker.process.send_signal.called)
+
+    def test_running_worker_killed(self):
+        """Verify a running worker is killed once the grace period of the orchestrator is over"""
+        worker = self.get_worker(None)
+        worker.kill()
+        worker.process.kill.assert_called_once_with()
+
+    def test_ended_worker_not_killed(self):
+        """Verify a worker which already ended is not killed"""
+        worker = self.get_worker(0)
+        worker.kill()
+        self.assertFalse(worker.process.kill.called)
+
+
+class TestSingerMultiplexer(unittest.TestCase):
+    """
+    Test the output of the workers written as one Singer stream.
+    """
+
+    def get_worker(self, name, bookmark_keys):
+        """Return a worker owning the bookmarks of the repositories"""
+        worker = mock.Mock(bookmark_keys = bookmark_keys, stream_ids = {"commits"})
+        worker.name = name
+        return worker
+
+    def test_schema_written_once(self):
+        """Verify the same schema of a stream is written only once"""
+        output = io.StringIO()
+        multiplexer = SingerMultiplexer(output, {})
+        schema = '{"type": "SCHEMA", "stream": "commits", "schema": {}, "key_properties": ["sha"]}\n'
+        new_schema = '{"type": "SCHEMA", "stream": "commits", "schema": {"type": "object"}, "key_properties": ["sha"]}\n'
+        for line in [schema, schema, new_schema]:
+            multiplexer.write_line(self.get_worker("repos-0", ["org/repo1"]), line)
+
+        self.assertEqual(output.getvalue(), schema + new_schema)
+
+    def test_merged_state(self):
+        """Verify a worker state only changes the bookmarks of the worker"""
+        output = io.StringIO()
+        multiplexer = SingerMultiplexer(output, {"bookmarks": {"commits": {"org/repo1": {"since": "2020"}, "org/repo2": {"since": "2020"}}}})
+        worker_state = {"bookmarks": {"commits": {"org/repo1": {"since": "2020"}, "org/repo2": {"since": "2022"}}}}
+        multiplexer.write_line(self.get_worker("repos-0", ["org/repo1"]), '{"type": "STATE", "value": {"bookmarks": {"commits": {"org/repo1": {"since": "2021"}}}}}\n')
+        multiplexer.write_line(self.get_worker("repos-1", ["org/repo2"]), json.dumps({"type": "STATE", "value": worker_state}) + '\n')
+
+        last_state = json.loads(output.getvalue().splitlines()[-1])["value"]
+        self.assertEqual(last_state, {"bookmarks": {"commits": {"org/repo1": {"since": "2021"}, "org/repo2": {"since": "2022"}}}})
+
+    def test_activate_version_of_all_workers(self):
+        """Verify the table version is activated only once it is activated by every worker syncing the stream"""
+        output = io.StringIO()
+        multiplexer = SingerMultiplexer(output, {})
+        workers = [self.get_worker("repos-0", ["org/repo1"]), self.get_worker("repos-1", ["org/repo2"])]
+        multiplexer.write_line(workers[0], '{"type": "ACTIVATE_VERSION", "stream": "commits", "version": 1}\n')
+
+        multiplexer.activate_table_versions(workers)
+        self.assertEqual(output.getvalue(), "")
+
+        multiplexer.write_line(workers[1], '{"type": "ACTIVATE_VERSION", "stream": "commits", "version": 1}\n')
+        multiplexer.activate_table_versions(workers)
+        self.assertEqual(json.loads(output.getvalue()), {"type": "ACTIVATE_VERSION", "stream": "commits", "version": 1})
+
+
+@mock.patch("tap_github.orchestrator.WORKER_COMMAND", [sys.executable, "-c", FAKE_TAP])
+class TestOrchestrate(unittest.TestCase):
+    """
+    Test the sync of the repositories with worker processes.
+    """
+    catalog = {"streams": [get_stream_catalog("commits", True)]}
+    repositories = ["org/repo{}".format(index) for index in range(5)]
+
+    def orchestrate(self, config):
+        """Run the orchestrator and return the written messages"""
+        client = mock.Mock()
+        client.extract_repos_from_config.return_value = (self.repositories, {"org"})
+        state = {"bookmarks": {"commits": {"org/old-repo": {"since": "2020-01-01T00:00:00Z"}}}}
+
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout:
+            orchestrate(client, config, state, self.catalog, 3)
+
+        return [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+
+    def test_one_singer_stream(self):
+        """Verify the output of all the workers is written as one Singer stream"""
+        messages = self.orchestrate({"start_date": "2021-01-01T00:00:00Z"})
+
+        self.assertEqual(len([message for message in messages if message["type"] == "SCHEMA"]), 1)
+        records = [message["record"]["sha"] for message in messages if message["type"] == "RECORD"]
+        self.assertEqual(sorted(records), self.repositories)
+        # Verify all the workers write the records with the same table version
+        self.assertEqual(len({message["version"] for message in messages if message["type"] == "RECORD"}), 1)
+
+        # Verify the final state holds the bookmarks of all the workers
+        self.assertEqual(messages[-1]["type"], "STATE")
+        self.assertEqual(set(messages[-1]["value"]["bookmarks"]["commits"]), set(self.repositories + ["org/old-repo"]))
+        self.assertEqual(messages[-2]["type"], "ACTIVATE_VERSION")
+
+    def test_failed_worker(self):
+        """Verify the final state is written but the table version is not activated if a worker fails"""
+        client = mock.Mock()
+        client.extract_repos_from_config.return_value = (self.repositories, {"org"})
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout:
+            with self.assertRaises(RuntimeError):
+                orchestrate(client, {"exit_code": 1}, {}, self.catalog, 3)
+
+        messages = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        self.assertNotIn("ACTIVATE_VERSION", [message["type"] for message in messages])
+        self.assertEqual(set(messages[-1]["value"]["bookmarks"]["commits"]), set(self.repositories))
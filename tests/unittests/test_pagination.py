@@ -0,0 +1,73 @@
+import unittest
+from unittest import mock
+from tap_github.client import GithubClient
+
+
+class MockResponse():
+    """Mock response object class."""
+    def __init__(self, json_data, links = None):
+        self.json_data = json_data
+        self.links = links or {}
+
+    def json(self):
+        return self.json_data
+
+
+def get_link(page):
+    """Return the link of the page"""
+    return {"url": "https://api.github.com/repos/org/repo/comments?page={}".format(page)}
+
+
+@mock.patch("tap_github.client.GithubClient.authed_get")
+class TestReversedPagination(unittest.TestCase):
+    """
+    Test `authed_get_all_pages_reversed` method of the client.
+    """
+
+    config = {"access_token": "", "repository": "org/repo"}
+
+    def test_single_page(self, mock_authed_get):
+        """Verify the only page is returned if the response has no `last` link"""
+        first_page = MockResponse([{"id": 1}])
+        mock_authed_get.return_value = first_page
+
+        pages = list(GithubClient(self.config).authed_get_all_pages_reversed("commit_comments", "https://api.github.com/repos/org/repo/comments"))
+
+        self.assertEqual(pages, [first_page])
+        self.assertEqual(mock_authed_get.call_count, 1)
+
+    def test_pages_from_last(self, mock_authed_get):
+        """Verify the pages are returned from the last page and the first page is not requested again"""
+        first_page = MockResponse([{"id": 1}], {"next": get_link(2), "last": get_link(3)})
+        second_page = MockResponse([{"id": 2}], {"prev": get_link(1), "next": get_link(3)})
+        last_page = MockResponse([{"id": 3}], {"prev": get_link(2)})
+        mock_authed_get.side_effect = [first_page, last_page, second_page]
+
+        pages = list(GithubClient(self.config).authed_get_all_pages_reversed("commit_comments", "https://api.github.com/repos/org/repo/comments"))
+
+        self.assertEqual(pages, [last_page, second_page, first_page])
+        self.assertEqual(mock_authed_get.call_count, 3)
+        self.assertEqual(mock_authed_get.mock_calls[1], mock.call("commit_comments", get_link(3)["url"], {}, "", True))
+
+    def test_stop_reading_pages(self, mock_authed_get):
+        """Verify the pages before the page at which the caller stops are not requested"""
+        first_page = MockResponse([{"id": 1}], {"next": get_link(2), "last": get_link(3)})
+        last_page = MockResponse([{"id": 3}], {"prev": get_link(2)})
+        mock_authed_get.side_effect = [first_page, last_page]
+
+        for page in GithubClient(self.config).authed_get_all_pages_reversed("commit_comments", "https://api.github.com/repos/org/repo/comments"):
+            break
+
+        self.assertEqual(page, last_page)
+        self.assertEqual(mock_authed_get.call_count, 2)
+
+    def test_pages_from_url(self, mock_authed_get):
+        """Verify the pages are returned from the page of the url to the first page if `from_last_page` is False"""
+        second_page = MockResponse([{"id": 2}], {"prev": get_link(1), "next": get_link(3), "last": get_link(3)})
+        first_page = MockResponse([{"id": 1}], {"next": get_link(2), "last": get_link(3)})
+        mock_authed_get.side_effect = [second_page, first_page]
+
+        pages = list(GithubClient(self.config).authed_get_all_pages_reversed("commit_comments", get_link(2)["url"], from_last_page = False))
+
+        self.assertEqual(pages, [second_page, first_page])
+        self.assertEqual(mock_authed_get.mock_calls[1], mock.call("commit_comments", get_link(1)["url"], {}, "", True))
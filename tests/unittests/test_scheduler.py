@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from tap_github.scheduler import (RequestScheduler, get_request_scheduler, get_request_priority, request_priority,
+                                  CHILD_REQUESTS, INCREMENTAL_REQUESTS, FULL_TABLE_REQUESTS, DEFAULT_PRIORITY)
+
+def get_response(remaining, reset):
+    """Return a response with the rate limit headers"""
+    return mock.Mock(headers = {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(reset)})
+
+class TestRequestScheduler(unittest.TestCase):
+    """
+    Test the scheduler of the requests.
+    """
+
+    def send_request(self, scheduler, priority, sent_requests):
+        """Send a request with the priority from a new thread"""
+        def send():
+            with request_priority(*priority):
+                with scheduler.request():
+                    sent_requests.append(priority)
+        thread = threading.Thread(target = send)
+        thread.start()
+        return thread
+
+    def wait_for(self, condition):
+        """Wait until the condition is true"""
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_priority_order(self):
+        """Verify the waiting requests are sent by class, then by the staleness of the repository"""
+        scheduler = RequestScheduler(max_concurrent_requests = 1)
+        sent_requests = []
+        priorities = [(FULL_TABLE_REQUESTS, 100), (INCREMENTAL_REQUESTS, 200), (INCREMENTAL_REQUESTS, 100), (CHILD_REQUESTS, 300)]
+
+        with scheduler.request():
+            threads = [self.send_request(scheduler, priority, sent_requests) for priority in priorities]
+            self.wait_for(lambda: len(scheduler.waiting) == len(priorities))
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sent_requests, [(CHILD_REQUESTS, 300), (INCREMENTAL_REQUESTS, 100), (INCREMENTAL_REQUESTS, 200), (FULL_TABLE_REQUESTS, 100)])
+
+    def test_concurrency_cap(self):
+        """Verify no more than `max_concurrent_requests` requests are sent at the same time"""
+        scheduler = RequestScheduler(max_concurrent_requests = 2)
+        sent_requests = []
+
+        with scheduler.request(), scheduler.request():
+            thread = self.send_request(scheduler, DEFAULT_PRIORITY, sent_requests)
+            self.wait_for(lambda: len(scheduler.waiting) == 1)
+            self.assertEqual(sent_requests, [])
+        thread.join()
+
+        self.assertEqual(len(sent_requests), 1)
+
+    def test_rate_limit_reserve(self):
+        """Verify no request is sent while the requests left are reserved, until the rate limit is reset"""
+        scheduler = RequestScheduler(rate_limit_reserve = 10)
+        scheduler.update_rate_limit(get_response(10, int(time.time()) + 3600))
+        sent_requests = []
+
+        thread = self.send_request(scheduler, DEFAULT_PRIORITY, sent_requests)
+        self.wait_for(lambda: len(scheduler.waiting) == 1)
+        self.assertEqual(sent_requests, [])
+
+        # Verify the request is sent once the rate limit is reset
+        scheduler.update_rate_limit(get_response(5000, int(time.time()) + 3600))
+        thread.join()
+        self.assertEqual(len(sent_requests), 1)
+        self.assertEqual(scheduler.remaining, 4999)
+
+    def test_expired_rate_limit(self):
+        """Verify the requests are sent once the reset time of the rate limit passed"""
+        scheduler = RequestScheduler(rate_limit_reserve = 10)
+        scheduler.update_rate_limit(get_response(0, int(time.time()) - 1))
+
+        with scheduler.request():
+            self.assertEqual(scheduler.running, 1)
+
+    def test_request_priority(self):
+        """Verify the priority of the requests of a block keeps the staleness of the enclosing block"""
+        with request_priority(INCREMENTAL_REQUESTS, 100):
+            with request_priority(CHILD_REQUESTS):
+                self.assertEqual(get_request_priority(), (CHILD_REQUESTS, 100))
+            self.assertEqual(get_request_priority(), (INCREMENTAL_REQUESTS, 100))
+
+    def test_shared_scheduler(self):
+        """Verify the clients with the same access token share the scheduler"""
+        config = {"access_token": "token", "max_concurrent_requests": "4"}
+        self.assertIs(get_request_scheduler(config), get_request_scheduler(dict(config)))
+        self.assertIsNot(get_request_scheduler(config), get_request_scheduler(dict(config, access_token = "other")))
+        self.assertEqual(get_request_scheduler(config).max_concurrent_requests, 4)
@@ -1,6 +1,7 @@
 import unittest
 from unittest import mock
-from tap_github.streams import Comments, Reviews, TeamMemberships, Teams, PullRequests, get_schema, get_child_full_url, get_bookmark
+from tap_github.streams import Assignees, Comments, Reviews, TeamMemberships, Teams, PullRequests, PRCommits, PaginationCheckpoint, SyncContext, CompiledStream, get_schema, get_child_full_url, get_bookmark
+import singer
 from parameterized import parameterized
 
 
@@ -11,10 +12,10 @@ class TestGetSchema(unittest.TestCase):
 
     def test_get_schema(self):
         """Verify function returns expected schema"""
-        catalog = [
-            {"tap_stream_id": "comments"},
-            {"tap_stream_id": "events"},
-        ]
+        catalog = {
+            "comments": {"tap_stream_id": "comments"},
+            "events": {"tap_stream_id": "events"},
+        }
         expected_schema = {"tap_stream_id": "comments"}
 
         # Verify returned schema is same as exected schema
@@ -179,3 +180,162 @@ class TestGetChildUrl(unittest.TestCase):
         child_stream = stream_class()
         full_url = get_child_full_url(self.domain, child_stream, param, parent_id, grand_parent_id)
         self.assertEqual(expected_url, full_url)
+
+        # Verify the url from the template compiled in the catalog entry of the stream
+        compiled_stream = CompiledStream(child_stream.tap_stream_id, {"schema": {}, "metadata": []})
+        self.assertEqual(compiled_stream.get_child_url(self.domain, param, parent_id, grand_parent_id), expected_url)
+
+
+class TestCompiledStream(unittest.TestCase):
+    """
+    Test the catalog entry of a stream compiled by the sync plan.
+    """
+
+    def test_parent_id(self):
+        """Verify the ids of the parent record passed in the url of the stream"""
+        compiled_stream = CompiledStream("team_memberships", {"schema": {}, "metadata": []})
+
+        self.assertEqual(compiled_stream.get_parent_id({"login": "demo-user-1", "id": 1}), ("demo-user-1",))
+        self.assertEqual(compiled_stream.metadata_map, {})
+
+    @mock.patch("tap_github.streams.singer.Transformer")
+    def test_one_transformer_for_child_records(self, mock_transformer):
+        """Verify that the child records are transformed by the transformer of the stream sync"""
+        client = mock.Mock(config = {}, base_url = "https://api.github.com")
+        client.authed_get_all_pages.return_value = [MockResponse([{"id": 1, "updated_at": "2022-01-02T00:00:00Z"},
+                                                                  {"id": 2, "updated_at": "2022-01-03T00:00:00Z"}])]
+        transformer = mock.Mock()
+        transformer.transform.side_effect = lambda record, schema, metadata: record
+        catalog = {"review_comments": CompiledStream("review_comments", {"schema": {}, "metadata": []})}
+
+        PullRequests().get_child_records(client, catalog, "review_comments", (5,), "org/test-repo", {}, "2022-01-01T00:00:00Z",
+                                         None, ["review_comments"], ["review_comments"], parent_record = {"id": 1, "number": 5},
+                                         transformer = transformer)
+
+        # Verify no transformer is created for the child records
+        self.assertEqual(transformer.transform.call_count, 2)
+        self.assertFalse(mock_transformer.called)
+
+
+class TestPRCommitsHeadShaCache(unittest.TestCase):
+    """
+    Test the head SHA cache of the `pr_commits` stream
+    """
+
+    client = mock.Mock(config = {"pr_commits_cache_size": 2})
+
+    def test_unchanged_head_sha(self):
+        """Verify that a pull request is skipped if its head SHA is already cached"""
+        state = {"bookmarks": {"pr_commits": {"org/test-repo": {"since": "2022-01-01T00:00:00Z", "head_shas": {"1": "abc"}}}}}
+        test_stream = PRCommits()
+
+        self.assertTrue(test_stream.is_parent_unchanged(self.client, state, "org/test-repo", {"id": 1, "head": {"sha": "abc"}}))
+        self.assertFalse(test_stream.is_parent_unchanged(self.client, state, "org/test-repo", {"id": 1, "head": {"sha": "def"}}))
+        self.assertFalse(test_stream.is_parent_unchanged(self.client, state, "org/test-repo", {"id": 2, "head": {"sha": "abc"}}))
+
+    def test_update_cache_evicts_closed_and_oldest(self):
+        """Verify that closed pull requests and the oldest entries above the cache size are evicted"""
+        state = {"bookmarks": {"pr_commits": {"org/test-repo": {"since": "2022-01-01T00:00:00Z", "head_shas": {"1": "a", "2": "b"}}}}}
+        test_stream = PRCommits()
+
+        test_stream.update_parent_cache(self.client, state, "org/test-repo", {"id": 2, "state": "closed", "head": {"sha": "b"}})
+        test_stream.update_parent_cache(self.client, state, "org/test-repo", {"id": 3, "state": "open", "head": {"sha": "c"}})
+        test_stream.update_parent_cache(self.client, state, "org/test-repo", {"id": 4, "state": "open", "head": {"sha": "d"}})
+
+        # Verify the bookmark is kept and only the latest open pull requests are cached
+        self.assertEqual(state["bookmarks"]["pr_commits"]["org/test-repo"],
+                         {"since": "2022-01-01T00:00:00Z", "head_shas": {"3": "c", "4": "d"}})
+
+    @mock.patch("tap_github.streams.get_schema")
+    def test_child_records_skipped(self, mock_get_schema):
+        """Verify that `pr_commits` are not requested for a pull request with an unchanged head SHA"""
+        client = mock.Mock(config = {}, base_url = "https://api.github.com")
+        state = {"bookmarks": {"pr_commits": {"org/test-repo": {"head_shas": {"1": "abc"}}}}}
+
+        PullRequests().get_child_records(client, [], "pr_commits", (5,), "org/test-repo", state, "2022-01-01T00:00:00Z",
+                                         None, ["pr_commits"], ["pr_commits"], parent_record = {"id": 1, "number": 5, "head": {"sha": "abc"}})
+
+        # Verify no API call is made
+        self.assertFalse(client.authed_get_all_pages.called)
+
+
+class TestPaginationCheckpoint(unittest.TestCase):
+    """
+    Test `PaginationCheckpoint` that decides when the cursor of an incremental stream is saved.
+    """
+
+    def test_default_pages(self):
+        """Verify that a checkpoint is due every 10 pages by default"""
+        checkpoint = PaginationCheckpoint({})
+
+        self.assertEqual([checkpoint.is_due(100) for _ in range(20)].count(True), 2)
+
+    def test_record_interval(self):
+        """Verify that a checkpoint is due once `checkpoint_interval_records` records are read"""
+        checkpoint = PaginationCheckpoint({"checkpoint_interval_records": 250})
+
+        self.assertEqual([checkpoint.is_due(100) for _ in range(6)], [False, False, True, False, False, True])
+
+    @mock.patch("tap_github.streams.time.monotonic", side_effect = [0, 30, 61, 70])
+    def test_time_interval(self, mock_monotonic):
+        """Verify that a checkpoint is due once `checkpoint_interval_seconds` seconds passed since the last one"""
+        checkpoint = PaginationCheckpoint({"checkpoint_interval_seconds": 60})
+
+        self.assertEqual([checkpoint.is_due(1) for _ in range(2)], [False, True])
+
+
+class MockResponse():
+    """Mock response object class."""
+    def __init__(self, json_data):
+        self.json_data = json_data
+
+    def json(self):
+        return self.json_data
+
+
+class TestRecordPipeline(unittest.TestCase):
+    """
+    Test the stages of the record pipeline of the stream class.
+    """
+
+    def get_context(self, selected_stream_ids):
+        """Return the sync context of a repository"""
+        context = SyncContext(None, {}, [], "org/repo", "2019-01-01T00:00:00Z", selected_stream_ids, selected_stream_ids)
+        context.stream_catalog = CompiledStream("assignees", {"schema": {}, "metadata": []})
+        context.transformer = singer.Transformer()
+        return context
+
+    def test_pipeline_stages(self):
+        """Verify that the records are decorated with the repository, filtered and transformed"""
+        context = self.get_context(["assignees"])
+        pages = [MockResponse([{"id": 1, "login": "user"}])]
+
+        records = list(Assignees().get_record_pipeline(pages, context))
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].record, {"id": 1, "login": "user", "_sdc_repository": "org/repo"})
+        self.assertTrue(records[0].write)
+        self.assertIsNotNone(records[0].rec)
+
+    def test_unselected_stream(self):
+        """Verify that the records of an unselected stream are not transformed"""
+        context = self.get_context([])
+        pages = [MockResponse([{"id": 1}])]
+
+        records = list(Assignees().get_record_pipeline(pages, context))
+
+        self.assertFalse(records[0].write)
+        self.assertIsNone(records[0].rec)
+
+    def test_stop_after_page(self):
+        """Verify that the fetch stage stops after the page in which all the new records are synced"""
+        context = self.get_context(["assignees"])
+        pages = iter([MockResponse([{"id": 1}, {"id": 2}]), MockResponse([{"id": 3}])])
+
+        records = Assignees().fetch_records(pages, context)
+        next(records)
+        context.synced_all_records = True
+
+        self.assertEqual([item.record["id"] for item in records], [2])
+        self.assertEqual(next(pages).json(), [{"id": 3}])
+
@@ -1,6 +1,14 @@
+import io
+import json
+import os
+import tempfile
 import unittest
 from unittest import mock
-from tap_github.sync import sync, write_schemas, translate_state
+from parameterized import parameterized
+import singer
+from tap_github.client import GithubException
+from tap_github.sync import sync, write_schemas, translate_state, filter_shard, merge_bookmarks, SyncPlan
+from tap_github.deadline import RUN_DEADLINE, DeadlineReached, RepoDeadlineReached
 
 
 
@@ -131,6 +139,73 @@ class TestSyncFunctions(unittest.TestCase):
         # Verify updated_currently_syncing_repo was not called
         self.assertFalse(mock_update_curr_sync.called)
 
+@mock.patch("singer.write_version")
+@mock.patch("singer.write_state")
+@mock.patch("tap_github.sync.write_schemas")
+@mock.patch("tap_github.streams.FullTableStream.sync_endpoint", side_effect = lambda **kwargs: kwargs["state"])
+class TestActivateVersion(unittest.TestCase):
+    """
+    Test the table versions of full table streams in the `sync` function
+    """
+
+    mock_catalog = {"streams": [get_stream_catalog("assignees", True)]}
+
+    def get_client(self, not_accessible_repos = ()):
+        client = mock.Mock()
+        client.extract_repos_from_config.return_value = (["org/repo1", "org/repo2"], set())
+        client.not_accessible_repos = set(not_accessible_repos)
+        return client
+
+    def test_version_activated_after_all_repos(self, mock_full_table, mock_write_schemas, mock_write_state, mock_write_version):
+        """Verify that the same version is saved for all the repositories and activated once"""
+        sync(self.get_client(), {'start_date': "", 'activate_version': True}, {}, self.mock_catalog)
+        state = mock_write_state.call_args[0][0]
+
+        version = state["bookmarks"]["assignees"]["org/repo1"]["version"]
+        self.assertEqual(state["bookmarks"]["assignees"]["org/repo2"]["version"], version)
+        mock_write_version.assert_called_once_with("assignees", version)
+
+    def test_version_not_activated_for_not_accessible_repo(self, mock_full_table, mock_write_schemas, mock_write_state, mock_write_version):
+        """Verify that the version is not activated if a repository was not accessible"""
+        sync(self.get_client(["assignees"]), {'start_date': "", 'activate_version': True}, {}, self.mock_catalog)
+
+        self.assertFalse(mock_write_version.called)
+
+    def test_version_of_resumed_pass(self, mock_full_table, mock_write_schemas, mock_write_state, mock_write_version):
+        """Verify that a resumed pass keeps the version of the interrupted pass, and activates it once all the repositories are synced"""
+        state = {"resume": {"table_version": 5, "completed": {"org/repo1": ["assignees"]}}}
+        sync(self.get_client(), {'start_date': "", 'activate_version': True}, state, self.mock_catalog)
+        state = mock_write_state.call_args[0][0]
+
+        self.assertEqual(mock_full_table.call_count, 1)
+        self.assertEqual(state["bookmarks"]["assignees"]["org/repo2"]["version"], 5)
+        mock_write_version.assert_called_once_with("assignees", 5)
+        self.assertNotIn("resume", state)
+
+    def test_version_not_activated_for_stopped_repo(self, mock_full_table, mock_write_schemas, mock_write_state, mock_write_version):
+        """Verify that the version is not activated and is kept for the next sync if a repository was stopped by its deadline"""
+        def sync_endpoint(**kwargs):
+            if kwargs["repo_path"] == "org/repo1":
+                raise RepoDeadlineReached("The sync of the repository org/repo1 is stopped as max_repo_runtime_seconds is reached.")
+            return kwargs["state"]
+        mock_full_table.side_effect = sync_endpoint
+
+        sync(self.get_client(), {'start_date': "", 'activate_version': True, 'max_repo_runtime_seconds': 3600}, {}, self.mock_catalog)
+        state = mock_write_state.call_args[0][0]
+
+        self.assertFalse(mock_write_version.called)
+        version = state["bookmarks"]["assignees"]["org/repo2"]["version"]
+        self.assertEqual(state["resume"], {"table_version": version, "in_flight": {"org/repo1": ["assignees"]},
+                                           "completed": {"org/repo2": ["assignees"]}})
+
+    def test_activate_version_disabled(self, mock_full_table, mock_write_schemas, mock_write_state, mock_write_version):
+        """Verify that no version is saved or activated without `activate_version` in the config"""
+        sync(self.get_client(), {'start_date': ""}, {}, self.mock_catalog)
+        state = mock_write_state.call_args[0][0]
+
+        self.assertNotIn("bookmarks", state)
+        self.assertFalse(mock_write_version.called)
+
 # Projects parent and child streams were deprecated by Github. Test commented out 07/21/25
 # @mock.patch("singer.write_schema")
 # class TestWriteSchemas(unittest.TestCase):
@@ -536,3 +611,337 @@ class TestTranslateState(unittest.TestCase):
             }
         }
         assert actual == expected
+
+
+class TestSyncPlan(unittest.TestCase):
+    """
+    Test the sync plan compiled from the catalog and the config.
+    """
+    catalog = {"streams": [
+        get_stream_catalog("pull_requests", True),
+        get_stream_catalog("review_comments", True),
+        get_stream_catalog("teams"),
+        get_stream_catalog("team_members", True)
+    ]}
+
+    def test_stream_trees(self):
+        """Verify the streams synced on their own along with the streams selected in their tree"""
+        plan = SyncPlan(self.catalog, {"review_comments_sync_mode": "repository"})
+
+        self.assertEqual(set(plan.stream_trees), {"pull_requests", "review_comments", "teams"})
+        self.assertNotIn("review_comments", plan.stream_trees["pull_requests"]["selected_stream_ids"])
+        self.assertEqual(plan.stream_trees["review_comments"]["selected_stream_ids"], ["pull_requests", "review_comments", "team_members"])
+        self.assertEqual(plan.streams_to_sync_for_orgs, {"teams", "team_members"})
+        self.assertEqual(plan.catalog["teams"], self.catalog["streams"][2])
+
+    def test_compiled_catalog(self):
+        """Verify the metadata map and the url template compiled in the catalog entries of the plan"""
+        plan = SyncPlan(self.catalog, {})
+
+        self.assertEqual(plan.catalog["review_comments"].metadata_map, {(): {"selected": True}})
+        self.assertEqual(plan.catalog["review_comments"].url_template, "{base_url}/repos/{repo_path}/pulls/{}/comments?sort=updated_at&direction=desc")
+        self.assertIsNone(plan.catalog["pull_requests"].url_template)
+
+    def test_tree_streams(self):
+        """Verify the streams synced as a part of each stream synced on its own"""
+        plan = SyncPlan(self.catalog, {})
+        self.assertEqual(plan.stream_trees["pull_requests"]["streams"], ["pull_requests", "review_comments"])
+
+        # Verify a detached stream is not a part of its parent
+        plan = SyncPlan(self.catalog, {"review_comments_sync_mode": "repository"})
+        self.assertEqual(plan.stream_trees["pull_requests"]["streams"], ["pull_requests"])
+        self.assertEqual(plan.stream_trees["review_comments"]["streams"], ["review_comments"])
+
+    def test_to_dict(self):
+        """Verify the printable plan"""
+        plan = SyncPlan(self.catalog, {}).to_dict()
+
+        self.assertEqual(plan["repository_streams"], ["pull_requests", "review_comments"])
+        self.assertEqual(plan["organization_streams"], ["team_members", "teams"])
+        self.assertEqual(plan["streams"]["pull_requests"]["children"], ["review_comments"])
+        self.assertFalse(plan["streams"]["teams"]["selected"])
+        self.assertFalse(plan["streams"]["review_comments"]["synced_on_its_own"])
+
+
+def sync_repo_endpoint(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync):
+    """Write a record and the bookmark of the repository"""
+    singer.write_record("commits", {"sha": repo_path})
+    singer.write_bookmark(state, "commits", repo_path, {"since": "2022-01-01T00:00:00Z"})
+    singer.write_state(state)
+    return state
+
+
+@mock.patch("tap_github.sync.GithubClient")
+@mock.patch("tap_github.streams.IncrementalStream.sync_endpoint", side_effect = sync_repo_endpoint)
+class TestParallelRepos(unittest.TestCase):
+    """
+    Test the sync of the repositories with a pool of workers.
+    """
+    config = {"start_date": "2021-01-01T00:00:00Z", "max_parallel_repos": 3}
+    catalog = {"streams": [get_stream_catalog("commits", True)]}
+    repositories = ["org/repo{}".format(index) for index in range(6)]
+
+    def sync_repos(self, mock_client):
+        """Sync the repositories and return the written messages"""
+        mock_client.return_value.config = self.config
+        client = mock.Mock()
+        client.extract_repos_from_config.return_value = (self.repositories, set())
+        state = {"bookmarks": {"commits": {"org/old-repo": {"since": "2020-01-01T00:00:00Z"}}}}
+
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout:
+            sync(client, self.config, state, self.catalog)
+
+        return [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+
+    def test_records_of_all_repos(self, mock_sync_endpoint, mock_client):
+        """Verify that every repository is synced once with its own client"""
+        messages = self.sync_repos(mock_client)
+
+        records = [message["record"]["sha"] for message in messages if message["type"] == "RECORD"]
+        self.assertEqual(sorted(records), self.repositories)
+        self.assertEqual(mock_client.call_count, len(self.repositories))
+
+    def test_merged_state(self, mock_sync_endpoint, mock_client):
+        """Verify that every state written by a worker keeps the bookmarks of the other repositories"""
+        messages = self.sync_repos(mock_client)
+
+        states = [message["value"] for message in messages if message["type"] == "STATE"]
+        for state in states:
+            self.assertIn("org/old-repo", state["bookmarks"]["commits"])
+
+        # Verify the last state holds the bookmarks of all the repositories
+        self.assertEqual(set(states[-1]["bookmarks"]["commits"]), set(self.repositories + ["org/old-repo"]))
+
+    def test_worker_state_of_repo(self, mock_sync_endpoint, mock_client):
+        """Verify that every worker only gets the bookmarks of its repository"""
+        self.sync_repos(mock_client)
+
+        for call in mock_sync_endpoint.call_args_list:
+            self.assertEqual(list(call[1]["state"]["bookmarks"]["commits"]), [call[1]["repo_path"]])
+
+
+
+def sync_stream_endpoint(self, client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync):
+    """Write a record and the bookmark of the stream for the repository"""
+    singer.write_record(self.tap_stream_id, {"id": repo_path})
+    singer.write_bookmark(state, self.tap_stream_id, repo_path, {"since": "2022-01-01T00:00:00Z"})
+    singer.write_state(state)
+    return state
+
+
+@mock.patch("tap_github.sync.GithubClient")
+@mock.patch("tap_github.streams.IncrementalStream.sync_endpoint", autospec = True, side_effect = sync_stream_endpoint)
+class TestParallelStreams(unittest.TestCase):
+    """
+    Test the sync of the streams of a repository with a pool of workers.
+    """
+    catalog = {"streams": [get_stream_catalog("commits", True), get_stream_catalog("events", True)]}
+    repositories = ["org/repo1", "org/repo2"]
+
+    def sync_streams(self, mock_client, config):
+        """Sync the streams of the repositories and return the written messages"""
+        mock_client.return_value.config = config
+        mock_client.return_value.not_accessible_repos = set()
+        client = mock.Mock(config = config, not_accessible_repos = set())
+        client.extract_repos_from_config.return_value = (self.repositories, set())
+        state = {"bookmarks": {"commits": {"org/old-repo": {"since": "2020-01-01T00:00:00Z"}}}}
+
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout:
+            sync(client, config, state, self.catalog)
+
+        return [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+
+    @parameterized.expand([
+        ["sequential_repos", {"start_date": "2021-01-01T00:00:00Z", "max_parallel_streams": 2}],
+        ["parallel_repos", {"start_date": "2021-01-01T00:00:00Z", "max_parallel_streams": 2, "max_parallel_repos": 2}],
+    ])
+    def test_merged_state(self, mock_sync_endpoint, mock_client, name, config):
+        """Verify that every state written keeps the bookmarks of the other streams and repositories"""
+        messages = self.sync_streams(mock_client, config)
+
+        records = [(message["stream"], message["record"]["id"]) for message in messages if message["type"] == "RECORD"]
+        self.assertEqual(sorted(records), [(stream, repo) for stream in ["commits", "events"] for repo in self.repositories])
+        # Verify every stream of every repository is synced with its own client
+        self.assertEqual(mock_client.call_count, 4 + config.get("max_parallel_repos", 0))
+
+        states = [message["value"] for message in messages if message["type"] == "STATE"]
+        for state in states:
+            self.assertIn("org/old-repo", state["bookmarks"]["commits"])
+
+        # Verify the last state holds the bookmarks of all the streams of all the repositories
+        self.assertEqual(set(states[-1]["bookmarks"]["commits"]), set(self.repositories + ["org/old-repo"]))
+        self.assertEqual(set(states[-1]["bookmarks"]["events"]), set(self.repositories))
+
+        # Verify every worker only gets the bookmarks of its stream of its repository
+        for call in mock_sync_endpoint.call_args_list:
+            self.assertEqual({stream_id: list(stream_bookmarks) for stream_id, stream_bookmarks in call[1]["state"]["bookmarks"].items()},
+                             {call[0][0].tap_stream_id: [call[1]["repo_path"]]})
+
+
+def sync_until_deadline_endpoint(self, client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync):
+    """Write the bookmark of the stream for the repository, and reach the deadline of the run in the events stream"""
+    if self.tap_stream_id == "events":
+        raise DeadlineReached("The sync is stopped as max_runtime_seconds is reached.")
+    return sync_stream_endpoint(self, client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync)
+
+
+@mock.patch("tap_github.sync.GithubClient")
+class TestResumeState(unittest.TestCase):
+    """
+    Test the streams in flight and completed saved in the state, and the sync resumed from them.
+    """
+    catalog = {"streams": [get_stream_catalog("commits", True), get_stream_catalog("events", True)]}
+    repositories = ["org/repo1", "org/repo2"]
+
+    def sync_streams(self, mock_client, config, state):
+        """Sync the streams of the repositories and return the last written state"""
+        mock_client.return_value.config = config
+        mock_client.return_value.not_accessible_repos = set()
+        client = mock.Mock(config = config, not_accessible_repos = set())
+        client.extract_repos_from_config.return_value = (self.repositories, set())
+
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout:
+            sync(client, config, state, self.catalog)
+
+        return json.loads(mock_stdout.getvalue().splitlines()[-1])["value"]
+
+    @parameterized.expand([
+        ["sequential", {"start_date": "2021-01-01T00:00:00Z"}],
+        ["parallel_streams", {"start_date": "2021-01-01T00:00:00Z", "max_parallel_streams": 2}],
+        ["parallel_repos", {"start_date": "2021-01-01T00:00:00Z", "max_parallel_streams": 2, "max_parallel_repos": 2}],
+    ])
+    def test_interrupted_sync(self, mock_client, name, config):
+        """Verify the state of an interrupted sync keeps the streams in flight and completed of every repository"""
+        with mock.patch("tap_github.streams.IncrementalStream.sync_endpoint", autospec = True, side_effect = sync_until_deadline_endpoint):
+            state = self.sync_streams(mock_client, config, {})
+
+        self.assertEqual(state["resume"]["in_flight"]["org/repo1"], ["events"])
+        self.assertEqual(state["resume"]["completed"]["org/repo1"], ["commits"])
+
+    @parameterized.expand([
+        ["sequential", {"start_date": "2021-01-01T00:00:00Z"}],
+        ["parallel_streams", {"start_date": "2021-01-01T00:00:00Z", "max_parallel_streams": 2}],
+        ["parallel_repos", {"start_date": "2021-01-01T00:00:00Z", "max_parallel_streams": 2, "max_parallel_repos": 2}],
+    ])
+    def test_resumed_sync(self, mock_client, name, config):
+        """Verify the resumed sync skips the streams completed by the interrupted sync, and ends the pass"""
+        state = {"resume": {"in_flight": {"org/repo2": ["events"]},
+                            "completed": {"org/repo1": ["commits", "events"], "org/repo2": ["commits"]}}}
+        with mock.patch("tap_github.streams.IncrementalStream.sync_endpoint", autospec = True, side_effect = sync_stream_endpoint) as mock_sync_endpoint:
+            state = self.sync_streams(mock_client, config, state)
+
+        synced = [(call[0][0].tap_stream_id, call[1]["repo_path"]) for call in mock_sync_endpoint.call_args_list]
+        self.assertEqual(synced, [("events", "org/repo2")])
+        self.assertNotIn("resume", state)
+
+    def test_merge_worker_items(self, mock_client):
+        """Verify the items of a worker only change the items of the streams of the worker"""
+        state = {"resume": {"in_flight": {"org/repo1": ["commits", "events"]}, "completed": {"org/repo1": ["issues"]}}}
+        worker_state = {"resume": {"completed": {"org/repo1": ["commits", "issues"]}}}
+        merge_bookmarks(state, worker_state, "org/repo1", ["commits"])
+
+        self.assertEqual(state, {"resume": {"in_flight": {"org/repo1": ["events"]}, "completed": {"org/repo1": ["commits", "issues"]}}})
+
+
+class TestShards(unittest.TestCase):
+    """
+    Test the split of the repositories across the shards.
+    """
+    repositories = ["org{}/repo{}".format(index % 3, index) for index in range(30)]
+    organizations = {"org0", "org1", "org2"}
+
+    def test_disjoint_shards(self):
+        """Verify every repository is synced by exactly one shard and the organizations by the first shard"""
+        shards = [filter_shard({"shard_index": index, "shard_count": 3}, self.repositories, self.organizations) for index in range(3)]
+
+        self.assertEqual(sorted(repo for repositories, _ in shards for repo in repositories), sorted(self.repositories))
+        self.assertTrue(all(repositories for repositories, _ in shards))
+        self.assertEqual([set(organizations) for _, organizations in shards], [self.organizations, set(), set()])
+
+    def test_same_shard_on_every_node(self):
+        """Verify a repository is in the same shard whatever the order or the other repositories"""
+        config = {"shard_index": "1", "shard_count": "3"}
+        repositories, _ = filter_shard(config, self.repositories, self.organizations)
+        reordered_repositories, _ = filter_shard(config, list(reversed(self.repositories[5:])), self.organizations)
+
+        self.assertEqual(sorted(reordered_repositories), sorted(set(repositories) - set(self.repositories[:5])))
+
+    def test_no_shard(self):
+        """Verify all the repositories are synced without the shard config"""
+        self.assertEqual(filter_shard({}, self.repositories, self.organizations), (self.repositories, self.organizations))
+
+    def test_invalid_shard_index(self):
+        """Verify an exception is raised for a shard index out of the shards"""
+        with self.assertRaises(GithubException) as e:
+            filter_shard({"shard_index": 3, "shard_count": 3}, self.repositories, self.organizations)
+
+        self.assertEqual(str(e.exception), "Please provide a shard_index from 0 to 2.")
+
+    def test_activate_version_with_shared_table_version(self):
+        """Verify an exception is raised for versioned full table loads with shards, unless the shards share the table version"""
+        config = {"shard_index": 0, "shard_count": 3, "activate_version": True}
+        with self.assertRaises(GithubException):
+            filter_shard(config, self.repositories, self.organizations)
+
+        repositories, _ = filter_shard(dict(config, table_version = 1700000000000), self.repositories, self.organizations)
+        self.assertTrue(repositories)
+
+
+@mock.patch("tap_github.streams.IncrementalStream.sync_endpoint", side_effect = sync_repo_endpoint)
+class TestWorkQueueSync(unittest.TestCase):
+    """
+    Test the sync of the work items claimed from a work queue.
+    """
+    catalog = {"streams": [get_stream_catalog("commits", True)]}
+    repositories = ["org/repo1", "org/repo2"]
+
+    def sync_process(self, config):
+        """Sync as one tap process and return the written messages"""
+        client = mock.Mock(config = config, not_accessible_repos = set())
+        client.extract_repos_from_config.return_value = (self.repositories, {"org"})
+        with mock.patch("sys.stdout", new_callable = io.StringIO) as mock_stdout:
+            sync(client, config, {}, self.catalog)
+
+        return [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+
+    def test_items_synced_once(self, mock_sync_endpoint):
+        """Verify every item is synced once per sync, and the next sync starts from the bookmarks committed in the queue"""
+        start_bookmarks = []
+        def sync_endpoint(**kwargs):
+            start_bookmarks.append(kwargs["state"].get("bookmarks", {}).get("commits", {}).get(kwargs["repo_path"]))
+            return sync_repo_endpoint(**kwargs)
+        mock_sync_endpoint.side_effect = sync_endpoint
+
+        with tempfile.TemporaryDirectory() as directory:
+            config = {"start_date": "2021-01-01T00:00:00Z", "work_queue_path": os.path.join(directory, "queue.db")}
+            self.sync_process(config)
+            messages = self.sync_process(config)
+
+        self.assertEqual(start_bookmarks, [None, None, {"since": "2022-01-01T00:00:00Z"}, {"since": "2022-01-01T00:00:00Z"}])
+        self.assertEqual(set(messages[-1]["value"]["bookmarks"]["commits"]), set(self.repositories))
+
+    def test_lost_lease_abandoned(self, mock_sync_endpoint):
+        """Verify the item whose lease is lost is abandoned without its bookmarks committed, and the next item is synced"""
+        def sync_endpoint(**kwargs):
+            if kwargs["repo_path"] == "org/repo1":
+                # The heartbeat lost the lease of the item
+                RUN_DEADLINE.stop_repo("org/repo1", "the lease of its commits work item was taken by another process")
+                RUN_DEADLINE.check("org/repo1")
+            return sync_repo_endpoint(**kwargs)
+        mock_sync_endpoint.side_effect = sync_endpoint
+
+        with tempfile.TemporaryDirectory() as directory:
+            config = {"start_date": "2021-01-01T00:00:00Z", "work_queue_path": os.path.join(directory, "queue.db")}
+            with mock.patch("tap_github.work_queue.WorkQueue.complete") as mock_complete:
+                messages = self.sync_process(config)
+
+        mock_complete.assert_called_once_with("org/repo2", "commits", mock.ANY)
+        self.assertEqual(messages[-1]["value"], {"bookmarks": {"commits": {"org/repo2": {"since": "2022-01-01T00:00:00Z"}}}})
+        self.assertFalse(RUN_DEADLINE.is_reached("org/repo1"))
+
+    def test_activate_version_not_supported(self, mock_sync_endpoint):
+        """Verify an exception is raised for versioned full table loads with a work queue"""
+        with tempfile.TemporaryDirectory() as directory:
+            config = {"start_date": "2021-01-01T00:00:00Z", "work_queue_path": os.path.join(directory, "queue.db"), "activate_version": True}
+            with self.assertRaises(GithubException):
+                self.sync_process(config)
@@ -1,12 +1,14 @@
 import unittest
 from unittest import mock
 from tap_github.client import GithubClient
-from tap_github.streams import Commits, Events, PullRequests, StarGazers, Teams
+from tap_github.deadline import RUN_DEADLINE, DeadlineReached
+from tap_github.streams import get_record_hash, Assignees, Commits, CommitComments, Events, IssueLabels, Issues, PullRequests, Releases, ReviewComments, StarGazers, Teams
 
 class MockResponse():
     """Mock response object class."""
-    def __init__(self, json_data):
+    def __init__(self, json_data, links = None):
         self.json_data = json_data
+        self.links = links or {}
     
     def json(self):
         return self.json_data
@@ -29,7 +31,7 @@ class TestSyncEndpoints(unittest.TestCase):
                                                            {"id": 2, "created_at": "2019-01-04T00:00:00Z"}]),
                                               MockResponse([{"id": 3, "created_at": "2019-01-03T00:00:00Z"},
                                                            {"id": 4, "created_at": "2019-01-02T00:00:00Z"}])]
-        expected_state = {'bookmarks': {'events': {'tap-github': {'since': '2019-01-04T00:00:00Z'}}}}
+        expected_state = {'bookmarks': {'events': {'tap-github': {'since': '2019-01-04T00:00:00Z', 'boundary_keys': ['[2]']}}}}
         test_client = GithubClient(self.config)
         final_state = test_stream.sync_endpoint(test_client, {}, self.catalog, "tap-github", "2018-01-02T00:00:00Z", ["events"], ['events'])
         
@@ -48,13 +50,14 @@ class TestSyncEndpoints(unittest.TestCase):
 
         test_stream = Events()
         mock_get_schema.return_value = self.catalog
-        mock_authed_all_pages.return_value = [MockResponse([{"id": 1, "created_at": "2019-01-01T00:00:00Z"},
-                                                           {"id": 2, "created_at": "2019-01-04T00:00:00Z"}]),
-                                              MockResponse([{"id": 3, "created_at": "2019-01-03T00:00:00Z"},
-                                                           {"id": 4, "created_at": "2019-01-02T00:00:00Z"}])]
+        # Events are returned in the descending order of `created_at`
+        mock_authed_all_pages.return_value = [MockResponse([{"id": 2, "created_at": "2019-01-04T00:00:00Z"},
+                                                           {"id": 3, "created_at": "2019-01-03T00:00:00Z"}]),
+                                              MockResponse([{"id": 4, "created_at": "2019-01-02T00:00:00Z"},
+                                                           {"id": 1, "created_at": "2019-01-01T00:00:00Z"}])]
         mock_state = {'bookmarks': {'events': {'tap-github': {'since': '2019-01-02T00:00:00Z'}}}}
         
-        expected_state = {'bookmarks': {'events': {'tap-github': {'since': '2019-01-04T00:00:00Z'}}}}
+        expected_state = {'bookmarks': {'events': {'tap-github': {'since': '2019-01-04T00:00:00Z', 'boundary_keys': ['[2]']}}}}
         test_client = GithubClient(self.config)
         final_state = test_stream.sync_endpoint(test_client, mock_state, self.catalog, "tap-github", "2018-01-02T00:00:00Z", ["events"], ['events'])
         
@@ -69,6 +72,128 @@ class TestSyncEndpoints(unittest.TestCase):
         mock_write_records.assert_called_with(mock.ANY, {'id': 4, 'created_at': '2019-01-02T00:00:00Z', '_sdc_repository': 'tap-github'},time_extracted = mock.ANY)
 
 
+    @mock.patch("singer.write_record")
+    def test_descending_stream_stops_at_bookmark(self, mock_write_records, mock_authed_all_pages, mock_verify_access, mock_get_schema):
+        """Verify that pages after the first record older than the bookmark are not requested for a descending stream."""
+
+        test_stream = Events()
+        mock_get_schema.return_value = self.catalog
+        pages = [MockResponse([{"id": 3, "created_at": "2019-01-03T00:00:00Z"},
+                               {"id": 2, "created_at": "2019-01-01T00:00:00Z"}]),
+                 MockResponse([{"id": 1, "created_at": "2018-12-01T00:00:00Z"}])]
+        pages_iterator = iter(pages)
+        mock_authed_all_pages.return_value = pages_iterator
+        mock_state = {'bookmarks': {'events': {'tap-github': {'since': '2019-01-02T00:00:00Z'}}}}
+
+        test_client = GithubClient(self.config)
+        final_state = test_stream.sync_endpoint(test_client, mock_state, self.catalog, "tap-github", "2018-01-02T00:00:00Z", ["events"], ['events'])
+
+        # Verify only the record after the bookmark is written and the second page is not read
+        self.assertEqual(mock_write_records.call_count, 1)
+        self.assertEqual(next(pages_iterator), pages[1])
+        self.assertEqual(final_state, {'bookmarks': {'events': {'tap-github': {'since': '2019-01-03T00:00:00Z', 'boundary_keys': ['[3]']}}}})
+
+    @mock.patch("tap_github.client.GithubClient.authed_get_all_pages_reversed")
+    @mock.patch("singer.write_record")
+    def test_ascending_stream_from_last_page(self, mock_write_records, mock_authed_all_pages_reversed, mock_authed_all_pages, mock_verify_access, mock_get_schema):
+        """Verify that an ascending stream is read from the last page and stops after the page older than the bookmark."""
+
+        test_stream = CommitComments()
+        mock_get_schema.return_value = self.catalog
+        pages = [MockResponse([{"id": 4, "created_at": "2019-01-03T00:00:00Z", "updated_at": "2019-01-03T00:00:00Z"},
+                               {"id": 5, "created_at": "2019-01-04T00:00:00Z", "updated_at": "2019-01-04T00:00:00Z"}]),
+                 MockResponse([{"id": 2, "created_at": "2019-01-01T00:00:00Z", "updated_at": "2019-01-01T00:00:00Z"},
+                               {"id": 3, "created_at": "2019-01-02T00:00:00Z", "updated_at": "2019-01-02T00:00:00Z"}]),
+                 MockResponse([{"id": 1, "created_at": "2018-12-01T00:00:00Z", "updated_at": "2018-12-01T00:00:00Z"}])]
+        pages_iterator = iter(pages)
+        mock_authed_all_pages_reversed.return_value = pages_iterator
+        mock_state = {'bookmarks': {'commit_comments': {'tap-github': {'since': '2019-01-02T00:00:00Z'}}}}
+
+        test_client = GithubClient({**self.config, "commit_comments_reverse_pagination": "true"})
+        final_state = test_stream.sync_endpoint(test_client, mock_state, self.catalog, "tap-github", "2018-01-02T00:00:00Z", ["commit_comments"], ['commit_comments'])
+
+        # Verify the records after the bookmark are written and the first page is not read
+        self.assertEqual(mock_write_records.call_count, 3)
+        self.assertEqual(next(pages_iterator), pages[2])
+        self.assertFalse(mock_authed_all_pages.called)
+        self.assertEqual(final_state, {'bookmarks': {'commit_comments': {'tap-github': {'since': '2019-01-04T00:00:00Z', 'boundary_keys': ['[5]']}}}})
+
+    @mock.patch("tap_github.client.GithubClient.authed_get_all_pages_reversed")
+    @mock.patch("singer.write_record")
+    def test_commit_comments_all_pages(self, mock_write_records, mock_authed_all_pages_reversed, mock_authed_all_pages, mock_verify_access, mock_get_schema):
+        """Verify that all the pages of commit comments are read by default, so the edits of older comments are synced."""
+
+        test_stream = CommitComments()
+        mock_get_schema.return_value = self.catalog
+        mock_authed_all_pages.return_value = [
+            MockResponse([{"id": 1, "created_at": "2018-12-01T00:00:00Z", "updated_at": "2019-01-03T00:00:00Z"}]),
+            MockResponse([{"id": 2, "created_at": "2019-01-01T00:00:00Z", "updated_at": "2019-01-01T00:00:00Z"}])]
+        mock_state = {'bookmarks': {'commit_comments': {'tap-github': {'since': '2019-01-02T00:00:00Z'}}}}
+
+        test_client = GithubClient(self.config)
+        final_state = test_stream.sync_endpoint(test_client, mock_state, self.catalog, "tap-github", "2018-01-02T00:00:00Z", ["commit_comments"], ['commit_comments'])
+
+        # Verify the edit of the comment created before the bookmark is written
+        self.assertFalse(mock_authed_all_pages_reversed.called)
+        self.assertEqual(mock_write_records.call_count, 1)
+        self.assertEqual(final_state, {'bookmarks': {'commit_comments': {'tap-github': {'since': '2019-01-03T00:00:00Z', 'boundary_keys': ['[1]']}}}})
+
+    @mock.patch("tap_github.client.GithubClient.authed_get_all_pages_reversed")
+    @mock.patch("singer.write_record")
+    def test_incremental_stargazers(self, mock_write_records, mock_authed_all_pages_reversed, mock_authed_all_pages, mock_verify_access, mock_get_schema):
+        """Verify that only the stars after the bookmark are written and the bookmark is the latest `starred_at`."""
+
+        test_stream = StarGazers()
+        mock_get_schema.return_value = self.catalog
+        mock_authed_all_pages_reversed.return_value = [
+            MockResponse([{"user": {"id": 3}, "starred_at": "2019-01-03T00:00:00Z"}, {"user": {"id": 4}, "starred_at": "2019-01-04T00:00:00Z"}]),
+            MockResponse([{"user": {"id": 1}, "starred_at": "2019-01-01T00:00:00Z"}, {"user": {"id": 2}, "starred_at": "2019-01-02T00:00:00Z"}])]
+        mock_state = {'bookmarks': {'stargazers': {'tap-github': {'since': '2019-01-02T00:00:00Z'}}}}
+
+        test_client = GithubClient(self.config)
+        final_state = test_stream.sync_endpoint(test_client, mock_state, self.catalog, "tap-github", "2018-01-02T00:00:00Z", ["stargazers"], ['stargazers'])
+
+        # Verify the stars after the bookmark are written with the user id
+        self.assertEqual([call[1][1]["user_id"] for call in mock_write_records.mock_calls], [3, 4, 2])
+        mock_authed_all_pages_reversed.assert_called_with(mock.ANY, "https://api.github.com/repos/tap-github/stargazers",
+                                                          {'Accept': 'application/vnd.github.v3.star+json'}, stream='stargazers', from_last_page=True)
+        self.assertEqual(final_state, {'bookmarks': {'stargazers': {'tap-github': {'since': '2019-01-04T00:00:00Z', 'boundary_keys': ['[4]']}}}})
+
+    @mock.patch("singer.write_record")
+    def test_skip_records_at_bookmark(self, mock_write_records, mock_authed_all_pages, mock_verify_access, mock_get_schema):
+        """Verify that the records written in the previous sync at the bookmark value are not written again."""
+
+        test_stream = Events()
+        mock_get_schema.return_value = self.catalog
+        mock_authed_all_pages.return_value = [MockResponse([{"id": 3, "created_at": "2019-01-04T00:00:00Z"},
+                                                           {"id": 2, "created_at": "2019-01-02T00:00:00Z"},
+                                                           {"id": 1, "created_at": "2019-01-02T00:00:00Z"}])]
+        mock_state = {'bookmarks': {'events': {'tap-github': {'since': '2019-01-02T00:00:00Z', 'boundary_keys': ['[1]']}}}}
+
+        test_client = GithubClient(self.config)
+        final_state = test_stream.sync_endpoint(test_client, mock_state, self.catalog, "tap-github", "2018-01-02T00:00:00Z", ["events"], ['events'])
+
+        # Verify the record with the saved key at the bookmark value is skipped
+        self.assertEqual([call[1][1]["id"] for call in mock_write_records.mock_calls], [3, 2])
+        self.assertEqual(final_state, {'bookmarks': {'events': {'tap-github': {'since': '2019-01-04T00:00:00Z', 'boundary_keys': ['[3]']}}}})
+
+    @mock.patch("singer.write_record")
+    def test_keep_boundary_keys_without_new_records(self, mock_write_records, mock_authed_all_pages, mock_verify_access, mock_get_schema):
+        """Verify that the keys of the records at the bookmark value are kept when the bookmark does not move."""
+
+        test_stream = Events()
+        mock_get_schema.return_value = self.catalog
+        mock_authed_all_pages.return_value = [MockResponse([{"id": 2, "created_at": "2019-01-02T00:00:00Z"},
+                                                           {"id": 1, "created_at": "2019-01-02T00:00:00Z"}])]
+        mock_state = {'bookmarks': {'events': {'tap-github': {'since': '2019-01-02T00:00:00Z', 'boundary_keys': ['[1]']}}}}
+
+        test_client = GithubClient(self.config)
+        final_state = test_stream.sync_endpoint(test_client, mock_state, self.catalog, "tap-github", "2018-01-02T00:00:00Z", ["events"], ['events'])
+
+        # Verify the new record at the bookmark value is written and both keys are saved
+        self.assertEqual([call[1][1]["id"] for call in mock_write_records.mock_calls], [2])
+        self.assertEqual(final_state, {'bookmarks': {'events': {'tap-github': {'since': '2019-01-02T00:00:00Z', 'boundary_keys': ['[1]', '[2]']}}}})
+
 @mock.patch("tap_github.streams.get_schema")
 @mock.patch("tap_github.client.GithubClient.verify_access_for_repo", return_value = None)
 @mock.patch("tap_github.client.GithubClient.authed_get_all_pages")
@@ -84,16 +209,16 @@ class TestFullTable(unittest.TestCase):
         """Verify that get_child_records() is not called for streams which do not have child streams"""
 
         test_client = GithubClient(self.config)
-        test_stream = StarGazers()
+        test_stream = Assignees()
         mock_get_schema.return_value = self.catalog
-        mock_authed_get_all_pages.return_value = [MockResponse([{"user": {"id": 1}}, {"user": {"id": 2}}]),
-                                            MockResponse([{"user": {"id": 4}}, {"user": {"id": 3}}])]
-        test_stream.sync_endpoint(test_client, {}, self.catalog, "tap-github", "", ["stargazers"], ["stargazers"])
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 1}, {"id": 2}]),
+                                            MockResponse([{"id": 4}, {"id": 3}])]
+        test_stream.sync_endpoint(test_client, {}, self.catalog, "tap-github", "", ["assignees"], ["assignees"])
 
         # Verify that the authed_get_all_pages() is called with the expected url
-        mock_authed_get_all_pages.assert_called_with(mock.ANY, "https://api.github.com/repos/tap-github/stargazers", mock.ANY, stream='stargazers')
+        mock_authed_get_all_pages.assert_called_with(mock.ANY, "https://api.github.com/repos/tap-github/assignees", mock.ANY, stream='assignees')
         
-        # Verify that the get_child_records() is not called as Stargazers doesn't have a child stream
+        # Verify that the get_child_records() is not called as Assignees doesn't have a child stream
         self.assertFalse(mock_get_child_records.called)
 
     @mock.patch("tap_github.streams.Stream.get_child_records")
@@ -144,6 +269,34 @@ class TestFullTable(unittest.TestCase):
         self.assertEqual(mock_authed_get_all_pages.mock_calls[1], exp_call_2)
         self.assertEqual(mock_authed_get_all_pages.mock_calls[2], exp_call_3)
 
+    @mock.patch("singer.write_record")
+    def test_team_memberships_from_roles(self, mock_write_record, mock_authed_get_all_pages, mock_verify_access, mock_get_schema):
+        """Verify that team members are listed once per role and team memberships are built without per-member calls"""
+
+        test_client = GithubClient(dict(self.config, team_memberships_sync_mode = "role"))
+        test_stream = Teams()
+        mock_get_schema.return_value = self.catalog
+
+        mock_authed_get_all_pages.side_effect = [
+                [MockResponse([{"id": 1, "slug": "stitch-dev", "url": "https://api.github.com/organizations/1/team/1"}])],
+                [MockResponse([{"login": "log1"}])],
+                [MockResponse([{"login": "log2"}, {"login": "log3"}])]
+            ]
+
+        test_stream.sync_endpoint(test_client, {}, self.catalog, "tap-github", "", ["team_memberships"], ["teams","team_members", "team_memberships"])
+
+        # Verify that the team members are listed once per role only
+        self.assertEqual(mock_authed_get_all_pages.call_count, 3)
+        self.assertEqual(mock_authed_get_all_pages.mock_calls[1],
+                         mock.call(mock.ANY, "https://api.github.com/orgs/tap-github/teams/stitch-dev/members?role=maintainer", stream='team_members'))
+        self.assertEqual(mock_authed_get_all_pages.mock_calls[2],
+                         mock.call(mock.ANY, "https://api.github.com/orgs/tap-github/teams/stitch-dev/members?role=member", stream='team_members'))
+
+        # Verify that the team memberships are built from the team members
+        mock_write_record.assert_any_call("team_memberships", {"url": "https://api.github.com/organizations/1/team/1/memberships/log1", "role": "maintainer",
+                                                               "state": "active", "login": "log1", "_sdc_repository": "tap-github"}, time_extracted = mock.ANY)
+        self.assertEqual(mock_write_record.call_count, 3)
+
 @mock.patch("tap_github.streams.get_schema")
 @mock.patch("tap_github.client.GithubClient.verify_access_for_repo", return_value = None)
 @mock.patch("tap_github.client.GithubClient.authed_get_all_pages")
@@ -288,3 +441,322 @@ class TestIncrementalOrderedStream(unittest.TestCase):
         # Verify that the API calls are done as expected with the correct url
         self.assertEqual(mock_authed_get_all_pages.mock_calls[0], exp_call_1)
         self.assertEqual(mock_authed_get_all_pages.mock_calls[1], exp_call_2)
+
+
+@mock.patch("tap_github.streams.get_schema")
+@mock.patch("tap_github.client.GithubClient.authed_get")
+@mock.patch("tap_github.client.GithubClient.authed_get_all_pages")
+class TestRepositoryLevelReviewComments(unittest.TestCase):
+    """
+    Test `sync_endpoint` of the `review_comments` stream synced from the repository-level endpoint.
+    """
+    config = {"access_token": "", "repository": "singer-io/tap-github"}
+    catalog = {"schema": {}, "metadata": {}}
+
+    @mock.patch("singer.write_record")
+    def test_pr_id_from_pr_number(self, mock_write_record, mock_authed_get_all_pages, mock_authed_get, mock_get_schema):
+        """Verify that the repository-level endpoint is paged from the bookmark and `pr_id` is filled from the pull request number"""
+        test_client = GithubClient(self.config)
+        test_stream = ReviewComments()
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get.return_value = MockResponse({"id": 300, "number": 3})
+        mock_authed_get_all_pages.side_effect = [
+            [MockResponse([{"id": 11, "updated_at": "2022-07-06T00:00:00Z", "pull_request_url": "https://api.github.com/repos/tap-github/pulls/1"},
+                           {"id": 12, "updated_at": "2022-07-05T00:00:00Z", "pull_request_url": "https://api.github.com/repos/tap-github/pulls/3"},
+                           {"id": 13, "updated_at": "2022-06-01T00:00:00Z", "pull_request_url": "https://api.github.com/repos/tap-github/pulls/1"}])],
+            iter([MockResponse([{"id": 100, "number": 1}, {"id": 200, "number": 2}])])
+        ]
+        state = {"bookmarks": {"review_comments": {"tap-github": {"since": "2022-07-01T00:00:00Z"}}}}
+
+        final_state = test_stream.sync_endpoint(test_client, state, self.catalog, "tap-github", "2022-01-01T00:00:00Z", ["review_comments"], ["review_comments"])
+
+        # Verify the repository-level endpoint is called with the bookmark of the stream
+        self.assertEqual(mock_authed_get_all_pages.mock_calls[0],
+                         mock.call(mock.ANY, "https://api.github.com/repos/tap-github/pulls/comments?sort=updated&direction=desc&since=2022-07-01T00:00:00Z", stream='review_comments'))
+
+        # Verify records older than the bookmark are not written and `pr_id` is filled for the others
+        self.assertEqual([call[1][1]["pr_id"] for call in mock_write_record.mock_calls], [100, 300])
+
+        # Verify the pull request missing from the list is requested on its own
+        mock_authed_get.assert_called_once_with(mock.ANY, "https://api.github.com/repos/tap-github/pulls/3", stream="pull_requests")
+        self.assertEqual(final_state["bookmarks"]["review_comments"]["tap-github"]["since"], "2022-07-06T00:00:00Z")
+
+    def test_pull_requests_listed_since_bookmark(self, mock_authed_get_all_pages, mock_authed_get, mock_get_schema):
+        """Verify that the pull requests are listed only till the bookmark, and an older pull request is requested from the comment's url"""
+        test_client = GithubClient(self.config)
+        test_stream = ReviewComments()
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get.return_value = MockResponse({"id": 900, "number": 9})
+        pr_pages = iter([MockResponse([{"id": 100, "number": 1, "updated_at": "2022-07-06T00:00:00Z"},
+                                       {"id": 200, "number": 2, "updated_at": "2022-06-01T00:00:00Z"}]),
+                         MockResponse([{"id": 900, "number": 9, "updated_at": "2022-05-01T00:00:00Z"}])])
+        mock_authed_get_all_pages.side_effect = [
+            [MockResponse([{"id": 11, "updated_at": "2022-07-06T00:00:00Z", "pull_request_url": "https://api.github.com/repos/tap-github/pulls/9"}])],
+            pr_pages
+        ]
+        state = {"bookmarks": {"review_comments": {"tap-github": {"since": "2022-07-01T00:00:00Z"}}}}
+
+        with mock.patch("singer.write_record") as mock_write_record:
+            test_stream.sync_endpoint(test_client, state, self.catalog, "tap-github", "2022-01-01T00:00:00Z", ["review_comments"], ["review_comments"])
+
+        # Verify the pull requests not updated since the bookmark are not listed
+        self.assertEqual(len(list(pr_pages)), 1)
+        mock_authed_get.assert_called_once_with(mock.ANY, "https://api.github.com/repos/tap-github/pulls/9", stream="pull_requests")
+        self.assertEqual(mock_write_record.call_args[0][1]["pr_id"], 900)
+
+
+@mock.patch("tap_github.streams.get_schema")
+@mock.patch("tap_github.client.GithubClient.authed_get_all_pages")
+class TestIncrementalReleases(unittest.TestCase):
+    """
+    Test `sync_endpoint` of the `releases` stream.
+    """
+    config = {"access_token": "", "repository": "singer-io/tap-github"}
+    catalog = {"schema": {}, "metadata": {}}
+
+    @mock.patch("singer.write_record")
+    def test_stop_at_bookmark(self, mock_write_record, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that the releases created before the bookmark are not written and the next pages are not read"""
+        test_client = GithubClient(self.config)
+        mock_get_schema.return_value = self.catalog
+        pages = [MockResponse([{"id": 3, "created_at": "2022-07-06T00:00:00Z"}, {"id": 2, "created_at": "2022-06-01T00:00:00Z"}]),
+                 MockResponse([{"id": 1, "created_at": "2022-05-01T00:00:00Z"}])]
+        pages_iterator = iter(pages)
+        mock_authed_get_all_pages.return_value = pages_iterator
+        state = {"bookmarks": {"releases": {"tap-github": {"since": "2022-07-01T00:00:00Z"}}}}
+
+        final_state = Releases().sync_endpoint(test_client, state, self.catalog, "tap-github", "2022-01-01T00:00:00Z", ["releases"], ["releases"])
+
+        # Verify only the release created after the bookmark is written
+        self.assertEqual(mock_write_record.call_count, 1)
+        self.assertEqual(next(pages_iterator), pages[1])
+        self.assertEqual(final_state["bookmarks"]["releases"]["tap-github"]["since"], "2022-07-06T00:00:00Z")
+
+    @mock.patch("singer.write_record")
+    def test_skip_releases_at_bookmark(self, mock_write_record, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that the release written in the previous sync at the bookmark value is not written again"""
+        test_client = GithubClient(self.config)
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 2, "created_at": "2022-07-06T00:00:00Z"},
+                                                                {"id": 1, "created_at": "2022-07-01T00:00:00Z"}])]
+        state = {"bookmarks": {"releases": {"tap-github": {"since": "2022-07-01T00:00:00Z", "boundary_keys": ["[1]"]}}}}
+
+        final_state = Releases().sync_endpoint(test_client, state, self.catalog, "tap-github", "2022-01-01T00:00:00Z", ["releases"], ["releases"])
+
+        # Verify only the new release is written
+        self.assertEqual([call[1][1]["id"] for call in mock_write_record.mock_calls], [2])
+        self.assertEqual(final_state["bookmarks"]["releases"]["tap-github"], {"since": "2022-07-06T00:00:00Z", "boundary_keys": ["[2]"]})
+
+    @mock.patch("tap_github.client.GithubClient.authed_get")
+    @mock.patch("singer.write_record")
+    def test_published_draft(self, mock_write_record, mock_authed_get, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that a draft created before the bookmark is written again once it is published"""
+        test_client = GithubClient(self.config)
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 2, "created_at": "2022-07-06T00:00:00Z", "draft": True},
+                                                                {"id": 1, "created_at": "2022-06-01T00:00:00Z", "draft": False}])]
+        state = {"bookmarks": {"releases": {"tap-github": {"since": "2022-07-01T00:00:00Z"}}}}
+
+        state = Releases().sync_endpoint(test_client, state, self.catalog, "tap-github", "2022-01-01T00:00:00Z", ["releases"], ["releases"])
+
+        # Verify the draft is kept in the bookmark
+        self.assertEqual(state["bookmarks"]["releases"]["tap-github"]["drafts"], [2])
+        self.assertFalse(mock_authed_get.called)
+
+        # The draft is published after the bookmark, without a new release
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 3, "created_at": "2022-07-11T00:00:00Z", "draft": False}])]
+        mock_authed_get.return_value = MockResponse({"id": 2, "created_at": "2022-07-06T00:00:00Z", "draft": False, "published_at": "2022-07-10T00:00:00Z"})
+
+        state = Releases().sync_endpoint(test_client, state, self.catalog, "tap-github", "2022-01-01T00:00:00Z", ["releases"], ["releases"])
+
+        # Verify the published draft is written again and forgotten
+        mock_authed_get.assert_called_once_with(mock.ANY, "https://api.github.com/repos/tap-github/releases/2",
+                                                stream = "releases", should_skip_404 = False)
+        self.assertEqual([call[1][1]["id"] for call in mock_write_record.mock_calls], [2, 3, 2])
+        self.assertEqual(mock_write_record.mock_calls[-1][1][1]["published_at"], "2022-07-10T00:00:00Z")
+        self.assertNotIn("drafts", state["bookmarks"]["releases"]["tap-github"])
+
+
+@mock.patch("tap_github.streams.get_schema")
+@mock.patch("tap_github.client.GithubClient.authed_get_all_pages")
+@mock.patch("singer.write_record")
+class TestChangeDetection(unittest.TestCase):
+    """
+    Test `sync_endpoint` of full table streams with change detection.
+    """
+    config = {"access_token": "", "repository": "singer-io/tap-github", "change_detection": True}
+    catalog = {"schema": {}, "metadata": {}}
+
+    def test_write_only_changed_records(self, mock_write_record, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that only new or changed records are written and the hashes of all records are saved"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.side_effect = [[MockResponse([{"id": 1, "name": "bug"}, {"id": 2, "name": "feature"}])],
+                                                 [MockResponse([{"id": 1, "name": "bug"}, {"id": 2, "name": "enhancement"}, {"id": 3, "name": "docs"}])]]
+        state = {}
+
+        IssueLabels().sync_endpoint(GithubClient(self.config), state, self.catalog, "tap-github", "", ["issue_labels"], ["issue_labels"])
+        self.assertEqual(mock_write_record.call_count, 2)
+
+        mock_write_record.reset_mock()
+        IssueLabels().sync_endpoint(GithubClient(self.config), state, self.catalog, "tap-github", "", ["issue_labels"], ["issue_labels"])
+
+        # Verify only the changed and the new record are written in the second sync
+        self.assertEqual([call[1][1]["id"] for call in mock_write_record.mock_calls], [2, 3])
+        self.assertEqual(set(state["bookmarks"]["issue_labels"]["tap-github"]["record_hashes"]), {"[1]", "[2]", "[3]"})
+
+    def test_deleted_records(self, mock_write_record, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that a record with `_sdc_deleted_at` is written for the keys which disappeared"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 1, "name": "bug"}])]
+        state = {"bookmarks": {"issue_labels": {"tap-github": {"record_hashes": {"[1]": "0", "[2]": "0"}}}}}
+
+        IssueLabels().sync_endpoint(GithubClient(dict(self.config, change_detection_deletes = True)), state, self.catalog,
+                                    "tap-github", "", ["issue_labels"], ["issue_labels"])
+
+        mock_write_record.assert_called_with("issue_labels", {"id": 2, "_sdc_repository": "tap-github", "_sdc_deleted_at": mock.ANY})
+        self.assertEqual(mock_write_record.call_count, 2)
+
+    def test_change_detection_disabled(self, mock_write_record, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that all records are written and no hashes are saved without change detection"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 1, "name": "bug"}])]
+        state = {"bookmarks": {"issue_labels": {"tap-github": {"record_hashes": {"[1]": "0"}}}}}
+        config = dict(self.config)
+        del config["change_detection"]
+
+        IssueLabels().sync_endpoint(GithubClient(config), state, self.catalog, "tap-github", "", ["issue_labels"], ["issue_labels"])
+
+        self.assertEqual(mock_write_record.call_count, 1)
+        self.assertEqual(state["bookmarks"]["issue_labels"]["tap-github"]["record_hashes"], {"[1]": "0"})
+
+
+    @mock.patch("singer.write_message")
+    def test_versioned_records(self, mock_write_message, mock_write_record, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that records are written with the table version and all records are written with `activate_version`"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 1, "name": "bug"}])]
+        state = {"bookmarks": {"issue_labels": {"tap-github": {"record_hashes": {"[1]": get_record_hash({"id": 1, "name": "bug", "_sdc_repository": "tap-github"})},
+                                                               "version": 1234}}}}
+
+        IssueLabels().sync_endpoint(GithubClient(dict(self.config, activate_version = True)), state, self.catalog,
+                                    "tap-github", "", ["issue_labels"], ["issue_labels"])
+
+        # Verify the unchanged record is written with the version
+        self.assertFalse(mock_write_record.called)
+        self.assertEqual(mock_write_message.call_count, 1)
+        self.assertEqual(mock_write_message.call_args[0][0].version, 1234)
+
+
+@mock.patch("tap_github.streams.get_schema")
+@mock.patch("tap_github.client.GithubClient.authed_get_all_pages")
+@mock.patch("singer.write_state")
+@mock.patch("singer.write_record")
+class TestPaginationCursor(unittest.TestCase):
+    """
+    Test the cursor saved in the state to resume an interrupted sync of an incremental stream.
+    """
+    config = {"access_token": "", "repository": "singer-io/tap-github", "pagination_checkpoint_pages": 1}
+    catalog = {"schema": {}, "metadata": {}}
+    next_url = "https://api.github.com/repos/tap-github/commits?since=2019-01-01T00:00:00Z&page=2"
+
+    def test_checkpoint_next_page(self, mock_write_record, mock_write_state, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that the url of the next page and the max bookmark are saved in the state after a page"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"sha": "a", "commit": {"committer": {"date": "2019-01-03T00:00:00Z"}}}],
+                                                               {"next": {"url": self.next_url}})]
+        state = {"bookmarks": {"commits": {"tap-github": {"since": "2019-01-01T00:00:00Z"}}}}
+        mock_write_state.side_effect = Exception("interrupted")
+
+        with self.assertRaises(Exception):
+            Commits().sync_endpoint(GithubClient(self.config), state, self.catalog, "tap-github", "2018-01-01T00:00:00Z", ["commits"], ["commits"])
+
+        # Verify the cursor is written in the state before the sync is interrupted
+        self.assertEqual(state["bookmarks"]["commits"]["tap-github"]["cursor"],
+                         {"url": self.next_url, "since": "2019-01-01T00:00:00Z", "max_bookmark": "2019-01-03T00:00:00Z"})
+
+    def test_resume_from_cursor(self, mock_write_record, mock_write_state, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that the sync starts from the saved page and keeps the max bookmark of the interrupted sync"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"sha": "b", "commit": {"committer": {"date": "2019-01-02T00:00:00Z"}}}])]
+        cursor = {"url": self.next_url, "since": "2019-01-01T00:00:00Z", "max_bookmark": "2019-01-03T00:00:00Z"}
+        state = {"bookmarks": {"commits": {"tap-github": {"since": "2019-01-01T00:00:00Z", "cursor": cursor}}}}
+
+        final_state = Commits().sync_endpoint(GithubClient(self.config), state, self.catalog, "tap-github", "2018-01-01T00:00:00Z", ["commits"], ["commits"])
+
+        mock_authed_get_all_pages.assert_called_with(mock.ANY, self.next_url, mock.ANY, stream="commits")
+        self.assertEqual(mock_write_record.call_count, 1)
+        # Verify the cursor is removed and the bookmark is the max bookmark of both syncs
+        self.assertEqual(final_state["bookmarks"]["commits"]["tap-github"], {"since": "2019-01-03T00:00:00Z"})
+
+    def test_no_cursor_for_updated_order(self, mock_write_record, mock_write_state, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that no cursor is saved or used for an endpoint sorted by the update time, which is synced again from the bookmark"""
+        mock_get_schema.return_value = self.catalog
+        issues_url = Issues().build_url("https://api.github.com", "tap-github", "2019-01-01T00:00:00Z")
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 1, "updated_at": "2019-01-03T00:00:00Z"}],
+                                                               {"next": {"url": issues_url + "&page=2"}})]
+        cursor = {"url": issues_url + "&page=5", "since": "2019-01-01T00:00:00Z", "max_bookmark": "2019-01-03T00:00:00Z"}
+        state = {"bookmarks": {"issues": {"tap-github": {"since": "2019-01-01T00:00:00Z", "cursor": cursor}}}}
+
+        with mock.patch.object(RUN_DEADLINE, "stop_time", 0), self.assertRaises(DeadlineReached):
+            Issues().sync_endpoint(GithubClient(self.config), state, self.catalog, "tap-github", "2018-01-01T00:00:00Z", ["issues"], ["issues"])
+
+        # Verify the sync starts from the bookmark and stops without a cursor of its own
+        mock_authed_get_all_pages.assert_called_with(mock.ANY, issues_url, stream="issues")
+        self.assertEqual(state["bookmarks"]["issues"]["tap-github"], {"since": "2019-01-01T00:00:00Z", "cursor": cursor})
+
+    def test_stop_at_deadline(self, mock_write_record, mock_write_state, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that the sync stops after the page read when the deadline of the run is reached, with the cursor saved"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"sha": "a", "commit": {"committer": {"date": "2019-01-03T00:00:00Z"}}}],
+                                                               {"next": {"url": self.next_url}}),
+                                                  MockResponse([{"sha": "b", "commit": {"committer": {"date": "2019-01-02T00:00:00Z"}}}])]
+        state = {"bookmarks": {"commits": {"tap-github": {"since": "2019-01-01T00:00:00Z"}}}}
+        config = dict(self.config, pagination_checkpoint_pages = 100)
+
+        with mock.patch.object(RUN_DEADLINE, "stop_time", 0), self.assertRaises(DeadlineReached):
+            Commits().sync_endpoint(GithubClient(config), state, self.catalog, "tap-github", "2018-01-01T00:00:00Z", ["commits"], ["commits"])
+
+        self.assertEqual(mock_write_record.call_count, 1)
+        # Verify the bookmark is not advanced and the next sync continues from the next page
+        self.assertEqual(state["bookmarks"]["commits"]["tap-github"],
+                         {"since": "2019-01-01T00:00:00Z", "cursor": {"url": self.next_url, "since": "2019-01-01T00:00:00Z", "max_bookmark": "2019-01-03T00:00:00Z"}})
+
+    def test_stop_before_child_records(self, mock_write_record, mock_write_state, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that the child records of the parent records left are not synced once the deadline is reached, and the bookmark is not advanced"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 1, "number": 1, "updated_at": "2019-01-03T00:00:00Z"},
+                                                                {"id": 2, "number": 2, "updated_at": "2019-01-02T00:00:00Z"}])]
+        state = {"bookmarks": {"pull_requests": {"tap-github": {"since": "2019-01-01T00:00:00Z"}}}}
+
+        with mock.patch.object(RUN_DEADLINE, "stop_time", 0), self.assertRaises(DeadlineReached):
+            PullRequests().sync_endpoint(GithubClient(self.config), state, self.catalog, "tap-github", "2018-01-01T00:00:00Z",
+                                         ["pull_requests", "reviews"], ["pull_requests", "reviews"])
+
+        # Verify only the page of the parent stream is read
+        self.assertEqual(mock_authed_get_all_pages.call_count, 1)
+        self.assertEqual(mock_write_record.call_count, 1)
+        self.assertEqual(state["bookmarks"]["pull_requests"]["tap-github"], {"since": "2019-01-01T00:00:00Z"})
+
+    def test_stop_full_table_at_deadline(self, mock_write_record, mock_write_state, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that a full table stream stops before its next page when the deadline of the run is reached"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = iter([MockResponse([{"id": 1}], {"next": {"url": "https://api.github.com/repos/tap-github/assignees?page=2"}}),
+                                                       MockResponse([{"id": 2}])])
+
+        with mock.patch.object(RUN_DEADLINE, "stop_time", 0), self.assertRaises(DeadlineReached):
+            Assignees().sync_endpoint(GithubClient(self.config), {}, self.catalog, "tap-github", "", ["assignees"], ["assignees"])
+
+        self.assertEqual(mock_write_record.call_count, 1)
+
+    def test_ignore_cursor_of_other_bookmark(self, mock_write_record, mock_write_state, mock_authed_get_all_pages, mock_get_schema):
+        """Verify that the cursor is not used if the sync started from another bookmark"""
+        mock_get_schema.return_value = self.catalog
+        mock_authed_get_all_pages.return_value = [MockResponse([])]
+        cursor = {"url": self.next_url, "since": "2018-01-01T00:00:00Z", "max_bookmark": "2019-01-03T00:00:00Z"}
+        state = {"bookmarks": {"commits": {"tap-github": {"since": "2019-01-01T00:00:00Z", "cursor": cursor}}}}
+
+        Commits().sync_endpoint(GithubClient(self.config), state, self.catalog, "tap-github", "2018-01-01T00:00:00Z", ["commits"], ["commits"])
+
+        mock_authed_get_all_pages.assert_called_with(mock.ANY, "https://api.github.com/repos/tap-github/commits?since=2019-01-01T00:00:00Z",
+                                                     mock.ANY, stream="commits")
+
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from tap_github.deadline import RUN_DEADLINE, RepoDeadlineReached
+from tap_github.work_queue import WorkQueue
+
+class TestWorkQueue(unittest.TestCase):
+    """
+    Test the work items shared by the tap processes in a SQLite file.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "queue.db")
+        self.items = [("org/repo1", "commits"), ("org/repo2", "commits")]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_items_claimed_once(self):
+        """Verify every work item is claimed by only one process"""
+        first_queue, second_queue = WorkQueue(self.path), WorkQueue(self.path)
+        first_queue.add_items(self.items)
+        second_queue.add_items(self.items)
+
+        self.assertEqual(first_queue.claim(), ("org/repo1", "commits", {}))
+        self.assertEqual(second_queue.claim(), ("org/repo2", "commits", {}))
+        self.assertIsNone(first_queue.claim())
+
+    def test_expired_lease(self):
+        """Verify an item is claimed by another process once its lease expired, and not renewed by its first process"""
+        first_queue, second_queue = WorkQueue(self.path, lease_seconds = 60), WorkQueue(self.path)
+        first_queue.add_items(self.items[:1])
+        first_queue.claim()
+        self.assertTrue(first_queue.renew("org/repo1", "commits"))
+
+        with mock.patch("time.time", return_value = 2e10):
+            self.assertEqual(second_queue.claim(), ("org/repo1", "commits", {}))
+        self.assertFalse(first_queue.renew("org/repo1", "commits"))
+
+        # Verify the bookmarks of the first process are not committed
+        first_queue.complete("org/repo1", "commits", {"commits": {"since": "2021-01-01T00:00:00Z"}})
+        second_queue.complete("org/repo1", "commits", {"commits": {"since": "2022-01-01T00:00:00Z"}})
+        with mock.patch("time.time", return_value = 2e10):
+            next_queue = WorkQueue(self.path)
+            next_queue.start_round()
+        self.assertEqual(next_queue.claim(), ("org/repo1", "commits", {"commits": {"since": "2022-01-01T00:00:00Z"}}))
+
+    def test_new_round_after_all_items_done(self):
+        """Verify the items are pending again with their bookmarks only for a process started after the round is finished"""
+        work_queue, late_queue = WorkQueue(self.path), WorkQueue(self.path)
+        self.assertEqual(work_queue.start_round(), 1)
+        work_queue.add_items(self.items)
+        key, stream_id, _ = work_queue.claim()
+        work_queue.complete(key, stream_id, {"commits": {"since": "2022-01-01T00:00:00Z"}})
+
+        # Verify a process joining while an item is not done joins the same round
+        self.assertEqual(WorkQueue(self.path).start_round(), 1)
+        self.assertEqual(work_queue.claim(), ("org/repo2", "commits", {}))
+        work_queue.complete("org/repo2", "commits", {})
+        self.assertIsNone(work_queue.claim())
+
+        # Verify a process started before the round is finished does not sync the items again
+        self.assertEqual(late_queue.start_round(), 1)
+        late_queue.add_items(self.items)
+        self.assertIsNone(late_queue.claim())
+
+        with mock.patch("time.time", return_value = 2e10):
+            next_queue = WorkQueue(self.path)
+            self.assertEqual(next_queue.start_round(), 2)
+            next_queue.add_items(self.items)
+            self.assertEqual(next_queue.claim(), ("org/repo1", "commits", {"commits": {"since": "2022-01-01T00:00:00Z"}}))
+
+        # Verify adding the items does not start a new round
+        late_queue.add_items(self.items)
+        self.assertEqual(late_queue.claim(), ("org/repo2", "commits", {}))
+
+    def test_heartbeat(self):
+        """Verify the lease is renewed while the item is synced"""
+        work_queue = WorkQueue(self.path, lease_seconds = 0.03)
+        work_queue.add_items(self.items[:1])
+        work_queue.claim()
+
+        with mock.patch.object(work_queue, "renew", return_value = True) as mock_renew:
+            with work_queue.heartbeat("org/repo1", "commits"):
+                time.sleep(0.1)
+
+        mock_renew.assert_called_with("org/repo1", "commits")
+
+    def test_heartbeat_lost_lease(self):
+        """Verify the deadline of the key is reached once the lease is lost, until the end of the block"""
+        work_queue = WorkQueue(self.path, lease_seconds = 0.03)
+
+        with mock.patch.object(work_queue, "renew", return_value = False):
+            with work_queue.heartbeat("org/repo1", "commits"):
+                time.sleep(0.1)
+                with self.assertRaises(RepoDeadlineReached):
+                    RUN_DEADLINE.check("org/repo1")
+                RUN_DEADLINE.check("org/repo2")
+
+        self.assertFalse(RUN_DEADLINE.is_reached("org/repo1"))